@@ -1,3 +1,4 @@
 SELECT Respondent_ID,Verbatim AS Feedback FROM QP_DA.eNPSSurveyData
 WHERE Month = 1 AND Year = 2026 -- Change the Month and year according to the requirement
+-- AND Respondent_ID > 0 -- Late responses only: replace 0 with IncrementalState(...).watermark(task, period) of the last run
 ;
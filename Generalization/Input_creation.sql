@@ -46,6 +46,8 @@ LEFT JOIN
 	)SS
 ON CS.Respondent_ID = SS.Respondent_ID
 WHERE Month = 12 AND Year = 2025 -- Change the Month and Year according to the requirement
+-- No Respondent_ID watermark here: every group must be complete for its fingerprint; the upload script
+-- keeps only the Unique_IDs whose feedback set changed (incremental_state_file)
 ;
 
 /*
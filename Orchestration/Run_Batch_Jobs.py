@@ -0,0 +1,46 @@
+import logging
+
+from akasapulse.clients import AwsClients
+from akasapulse.orchestrator import DEFAULT_STATE_PATH, manifest_job_spec, run_batch_jobs, resume_batch_jobs
+from akasapulse.upload import batch_runner
+
+logger = logging.getLogger(__name__)
+
+# Runs the Sentiments, Categorization and Generalization jobs at the same time.
+# Prepare each input with process_feedback_batch_local(..., submit_job=False, cleanup_files=False)
+# and list the manifests it printed here (a retry batch manifest works too).
+# `python -m akasapulse jobs run <manifest> ...` / `jobs resume` does the same from the command line.
+manifest_files = {
+    "temp-batch-inference-sentiment": None,       # e.g. r"./batch_temp/feedback-input-<timestamp>-<id>.jsonl.manifest.json"
+    "temp-batch-inference": None,                 # Categorization (or the combined job, leaving Sentiments None)
+    "temp-batch-inference-generalization": None,
+}
+s3_bucket = 'akasa-bedrock'
+role_arn = 'arn:aws:iam::891377165721:role/Amazon-Bedrock-Batchinference-Role'
+model_id = "apac.amazon.nova-pro-v1:0"
+# Progress of every job; after a crash, re-run this script with resume = True
+state_file = DEFAULT_STATE_PATH
+resume = False
+
+aws_credentials = {
+    'aws_access_key_id': 'A',
+    'aws_secret_access_key': 'Um',
+    'aws_session_token': 'IQoJb3J',
+    'region_name': 'ap-south-1'
+}
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    runner = batch_runner(AwsClients(aws_credentials), role_arn, model_id, state_file)
+
+    if resume:
+        results = resume_batch_jobs(runner)
+    else:
+        specs = [manifest_job_spec(manifest, s3_bucket, prefix) for prefix, manifest in manifest_files.items() if manifest]
+        results = run_batch_jobs(runner, specs)
+
+    # Each finished job carries its manifest_file: pass it to akasapulse.outputs.extract_job, or point
+    # the extraction script's manifest_file at it
+    for name, result in results.items():
+        print(f"{name}: {result['status'] if isinstance(result, dict) else result}")
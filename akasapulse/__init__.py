@@ -0,0 +1,4 @@
+"""
+Shared helpers for the AkasaPulse Sentiments, Categorization and
+Generalization batch-inference pipelines.
+"""
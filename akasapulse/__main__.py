@@ -0,0 +1,5 @@
+from akasapulse.cli import main
+
+# Output files are extracted in worker processes, which re-import this module on Windows
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,315 @@
+"""
+Streaming writers for Bedrock batch-input JSONL files.
+
+Batch requests are generated lazily from a DataFrame (or from an iterable of
+DataFrame chunks, e.g. ``pd.read_csv(..., chunksize=50_000)``) and written one
+line at a time, either to a local file or straight into an S3 multipart
+upload. Only one record (plus at most a few upload parts) is held in memory at
+any time, so peak memory no longer grows with the number of rows.
+"""
+import json
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# S3 requires every part except the last one to be at least 5 MiB
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+
+
+def iter_frames(data):
+    """
+    Yield DataFrames from either a single DataFrame or an iterable of chunks
+
+    Args:
+        data: pd.DataFrame or an iterable of pd.DataFrame chunks
+
+    Yields:
+        pd.DataFrame
+    """
+    if hasattr(data, "itertuples"):
+        yield data
+    else:
+        yield from data
+
+
+def iter_rows(data, columns):
+    """
+    Stream the selected columns row by row without materialising the frame
+
+    Args:
+        data: pd.DataFrame or an iterable of pd.DataFrame chunks
+        columns (list): Column names to read, in order
+
+    Yields:
+        tuple: One value per requested column
+    """
+    for frame in iter_frames(data):
+        yield from frame[list(columns)].itertuples(index=False, name=None)
+
+
+def build_batch_request(record_id, user_message, max_tokens, temperature=0, top_p=0.1):
+    """
+    Build a single Bedrock batch-inference record
+
+    Args:
+        record_id (str): Value used as recordId (Respondent_ID / Unique_ID)
+        user_message (str): Prompt text for the user turn
+        max_tokens (int): maxTokens for the inference config
+        temperature (float): Sampling temperature
+        top_p (float): Nucleus sampling parameter
+
+    Returns:
+        dict: Batch request item
+    """
+    return {
+        "recordId": record_id,
+        "modelInput": {
+            "messages": [
+                {"role": "user", "content": [{"text": user_message}]}
+            ],
+            "inferenceConfig": {
+                "maxTokens": max_tokens,
+                "temperature": temperature,
+                "topP": top_p
+            }
+        }
+    }
+
+
+def encode_line(request):
+    """
+    Serialise one batch request as a newline-terminated UTF-8 line.
+    ``request`` may be a dict or a line already serialised with
+    ``akasapulse.prompts.encode_batch_request``.
+    """
+    if not isinstance(request, str):
+        request = json.dumps(request)
+    return (request + "\n").encode("utf-8")
+
+
+def iter_jsonl_lines(requests):
+    """Serialise batch requests lazily as newline-terminated UTF-8 lines."""
+    for request in requests:
+        yield encode_line(request)
+
+
+_RECORD_ID_PREFIX = '{"recordId": '
+_decoder = json.JSONDecoder()
+
+
+def record_id_of(request):
+    """
+    recordId of a request dict or serialised line, without decoding the
+    (large) prompt when the line starts with the recordId key.
+    """
+    if not isinstance(request, str):
+        return request["recordId"]
+    if request.startswith(_RECORD_ID_PREFIX):
+        return _decoder.raw_decode(request, len(_RECORD_ID_PREFIX))[0]
+    return json.loads(request)["recordId"]
+
+
+def write_jsonl(requests, file_path):
+    """
+    Stream batch requests into a local JSONL file
+
+    Args:
+        requests: Iterable of batch request dicts or serialised lines
+        file_path (str): Destination path
+
+    Returns:
+        int: Number of records written
+    """
+    count = 0
+    with open(file_path, "wb") as f:
+        for line in iter_jsonl_lines(requests):
+            f.write(line)
+            count += 1
+    return count
+
+
+class S3MultipartWriter:
+    """
+    Binary file-like writer that streams into an S3 multipart upload
+
+    Parts are uploaded on a small thread pool while the caller keeps writing,
+    so record generation overlaps with the network transfer. At most
+    ``max_pending_parts`` parts are buffered at once; ``write`` blocks when
+    that limit is reached, which keeps memory bounded by
+    ``part_size * max_pending_parts``.
+
+    Payloads smaller than one part are sent with a single ``put_object``.
+    On error the multipart upload is aborted so no orphaned parts are billed.
+    """
+
+    def __init__(self, s3_client, bucket_name, s3_key, part_size=DEFAULT_PART_SIZE,
+                 max_workers=4, max_pending_parts=None):
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f"part_size must be at least {MIN_PART_SIZE} bytes")
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.s3_key = s3_key
+        self.part_size = part_size
+        self.bytes_written = 0
+        self._buffer = bytearray()
+        self._upload_id = None
+        self._futures = []
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._slots = threading.BoundedSemaphore(max_pending_parts or max_workers + 1)
+        self._closed = False
+
+    @property
+    def s3_uri(self):
+        return f"s3://{self.bucket_name}/{self.s3_key}"
+
+    def write(self, data):
+        self._buffer.extend(data)
+        self.bytes_written += len(data)
+        while len(self._buffer) >= self.part_size:
+            chunk = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            self._submit_part(chunk)
+        return len(data)
+
+    def _submit_part(self, chunk):
+        if self._upload_id is None:
+            response = self.s3_client.create_multipart_upload(Bucket=self.bucket_name, Key=self.s3_key)
+            self._upload_id = response["UploadId"]
+        part_number = len(self._futures) + 1
+        self._slots.acquire()
+        self._futures.append(self._executor.submit(self._upload_part, part_number, chunk))
+
+    def _upload_part(self, part_number, chunk):
+        try:
+            response = self.s3_client.upload_part(
+                Bucket=self.bucket_name,
+                Key=self.s3_key,
+                UploadId=self._upload_id,
+                PartNumber=part_number,
+                Body=chunk
+            )
+            return {"PartNumber": part_number, "ETag": response["ETag"]}
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Flush the remaining buffer and complete the upload."""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            if self._upload_id is None:
+                self.s3_client.put_object(Bucket=self.bucket_name, Key=self.s3_key, Body=bytes(self._buffer))
+            else:
+                if self._buffer:
+                    self._submit_part(bytes(self._buffer))
+                parts = [future.result() for future in self._futures]
+                self.s3_client.complete_multipart_upload(
+                    Bucket=self.bucket_name,
+                    Key=self.s3_key,
+                    UploadId=self._upload_id,
+                    MultipartUpload={"Parts": parts}
+                )
+            self._buffer = bytearray()
+        except Exception:
+            self.abort()
+            raise
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def abort(self):
+        """Abort the multipart upload and discard any uploaded parts."""
+        self._closed = True
+        for future in self._futures:
+            future.cancel()
+        self._executor.shutdown(wait=True)
+        if self._upload_id is not None:
+            try:
+                self.s3_client.abort_multipart_upload(
+                    Bucket=self.bucket_name, Key=self.s3_key, UploadId=self._upload_id
+                )
+            except Exception as e:
+                logger.warning("Could not abort multipart upload %s: %s", self._upload_id, e)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+def stream_jsonl_to_s3(requests, s3_client, bucket_name, s3_key, part_size=DEFAULT_PART_SIZE, max_workers=4):
+    """
+    Stream batch requests straight into S3 without a local file
+
+    Args:
+        requests: Iterable of batch request dicts or serialised lines
+        s3_client: S3 client
+        bucket_name (str): S3 bucket name
+        s3_key (str): Destination key
+        part_size (int): Multipart part size in bytes
+        max_workers (int): Concurrent part uploads
+
+    Returns:
+        tuple: (s3_uri, number of records written)
+    """
+    count = 0
+    with S3MultipartWriter(s3_client, bucket_name, s3_key, part_size=part_size, max_workers=max_workers) as writer:
+        for line in iter_jsonl_lines(requests):
+            writer.write(line)
+            count += 1
+    logger.info("Streamed %d records (%d bytes) to %s", count, writer.bytes_written, writer.s3_uri)
+    return writer.s3_uri, count
+
+
+def batch_input_filename(prefix="feedback-input"):
+    """Timestamped, collision-free batch input filename."""
+    timestamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    job_id = str(uuid.uuid4())[:8]
+    return f"{prefix}-{timestamp}-{job_id}.jsonl"
+
+
+def local_batch_input_path(output_dir="./batch_temp", prefix="feedback-input"):
+    """Create ``output_dir`` if needed and return a fresh batch input path in it."""
+    os.makedirs(output_dir, exist_ok=True)
+    return os.path.join(output_dir, batch_input_filename(prefix))
+
+
+def manifest_path(input_file):
+    """Sidecar manifest path for a batch input file."""
+    return f"{input_file}.manifest.json"
+
+
+def write_input_manifest(input_file, **metadata):
+    """
+    Write job metadata (task, prompt_version, record count, ...) next to the input file
+
+    Args:
+        input_file (str): Batch input JSONL path
+        **metadata: JSON-serialisable values to record
+
+    Returns:
+        str: Manifest path
+    """
+    path = manifest_path(input_file)
+    metadata.setdefault("input_file", os.path.basename(input_file))
+    metadata.setdefault("created_at", datetime.now().isoformat(timespec="seconds"))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2)
+    return path
+
+
+def read_input_manifest(path):
+    """Load a manifest written by ``write_input_manifest``."""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
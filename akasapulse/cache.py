@@ -0,0 +1,235 @@
+"""
+Persistent, content-addressed cache of model answers.
+
+Entries are keyed by ``sha256(normalized feedback | prompt version | model id)``
+so a verbatim that was already classified with the same prompt and model
+never costs another request. The cache lives in a single SQLite file.
+
+Flow:
+    1. ``filter_rows`` runs while the batch input is generated. Hits are
+       written to a ``*-cached.jsonl.out`` file in the same shape Bedrock
+       produces, so the extraction scripts read them like any other output.
+       Misses are recorded as *pending* against the job.
+    2. After the job finishes, the extraction script calls ``resolve_pending``
+       with the extracted records, which stores the new answers.
+
+Entries can be evicted by age and by count (least recently used first), and
+hit/miss counters are kept both for the session and cumulatively.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+
+from akasapulse.text import normalize_feedback
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = "./batch_temp/result_cache.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    output TEXT NOT NULL,
+    prompt_version TEXT,
+    model_id TEXT,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+CREATE TABLE IF NOT EXISTS pending (
+    job_id TEXT NOT NULL,
+    record_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    prompt_version TEXT,
+    model_id TEXT,
+    PRIMARY KEY (job_id, record_id)
+);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def cache_key(feedback_text, prompt_version, model_id):
+    """Content address of one feedback for a given prompt version and model."""
+    payload = "\x1f".join((normalize_feedback(feedback_text), prompt_version, model_id))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cached_output_record(record_id, output):
+    """A cache hit in the ``.jsonl.out`` record shape."""
+    return {
+        "recordId": record_id,
+        "modelOutput": {"output": {"message": {"content": [{"text": output}]}}},
+        "cached": True
+    }
+
+
+class ResultCache:
+    """
+    SQLite-backed result cache
+
+    Args:
+        path (str): SQLite file path
+        max_entries (int): Keep at most this many entries (None for no limit)
+        max_age_days (float): Drop entries not used for this long (None for no limit)
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=None, max_age_days=None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self._flushed = {"hits": 0, "misses": 0}
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(_SCHEMA)
+        self.evict()
+
+    def get(self, key):
+        """Cached output for ``key`` or None; refreshes the entry's last-used time."""
+        row = self._conn.execute("SELECT output FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._conn.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+        return row[0]
+
+    def put(self, key, output, prompt_version=None, model_id=None):
+        """Insert or replace one entry."""
+        now = time.time()
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, output, prompt_version, model_id, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, output, prompt_version, model_id, now, now)
+            )
+
+    def filter_rows(self, rows, prompt_version, model_id, job_id, hits_path):
+        """
+        Drop rows whose answer is cached; yield only the ones that must be sent
+
+        Hits are written to ``hits_path`` as ``.jsonl.out`` records. Misses are
+        registered as pending for ``job_id`` so ``resolve_pending`` can store
+        their answers later.
+
+        Args:
+            rows: Iterable of (record_id, feedback_text)
+            prompt_version (str): Version ID of the compiled prompt
+            model_id (str): Bedrock model ID
+            job_id (str): Identifier of this batch job (the input base name)
+            hits_path (str): Destination of the cached ``.jsonl.out`` records
+
+        Yields:
+            tuple: (record_id, feedback_text) for every cache miss
+        """
+        with open(hits_path, "w", encoding="utf-8") as hits_file:
+            for record_id, feedback_text in rows:
+                key = cache_key(feedback_text, prompt_version, model_id)
+                output = self.get(key)
+                if output is not None:
+                    hits_file.write(json.dumps(cached_output_record(str(record_id), output)) + "\n")
+                    continue
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO pending (job_id, record_id, key, prompt_version, model_id) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (job_id, str(record_id), key, prompt_version, model_id)
+                )
+                yield record_id, feedback_text
+        self._conn.commit()
+        self._bump_counters()
+
+    def resolve_pending(self, job_id, records, id_column="Respondent_ID", is_valid=None):
+        """
+        Store the answers of a finished job for its pending cache misses
+
+        Args:
+            job_id (str): Job identifier passed to ``filter_rows``
+            records: Iterable of dicts with ``id_column`` and ``Model_Output``
+            id_column (str): Key holding the recordId
+            is_valid (callable): Optional check; outputs failing it are not cached
+
+        Returns:
+            int: Number of entries stored
+        """
+        pending = {
+            record_id: (key, prompt_version, model_id)
+            for record_id, key, prompt_version, model_id in self._conn.execute(
+                "SELECT record_id, key, prompt_version, model_id FROM pending WHERE job_id = ?", (job_id,)
+            )
+        }
+        stored = 0
+        now = time.time()
+        with self._conn:
+            for record in records:
+                entry = pending.get(str(record[id_column]))
+                output = record.get("Model_Output")
+                if entry is None or output is None or (is_valid and not is_valid(output)):
+                    continue
+                key, prompt_version, model_id = entry
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO results (key, output, prompt_version, model_id, created_at, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, output, prompt_version, model_id, now, now)
+                )
+                stored += 1
+            self._conn.execute("DELETE FROM pending WHERE job_id = ?", (job_id,))
+        logger.info("Cached %d new answers for job %s", stored, job_id)
+        return stored
+
+    def evict(self, max_entries=None, max_age_days=None):
+        """
+        Remove stale entries, then the least recently used ones above the size limit
+
+        Returns:
+            int: Number of entries removed
+        """
+        max_entries = max_entries if max_entries is not None else self.max_entries
+        max_age_days = max_age_days if max_age_days is not None else self.max_age_days
+        removed = 0
+        with self._conn:
+            if max_age_days is not None:
+                cutoff = time.time() - max_age_days * 86400
+                removed += self._conn.execute("DELETE FROM results WHERE last_used < ?", (cutoff,)).rowcount
+            if max_entries is not None:
+                removed += self._conn.execute(
+                    "DELETE FROM results WHERE key IN ("
+                    "SELECT key FROM results ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (max_entries,)
+                ).rowcount
+        return removed
+
+    def _bump_counters(self):
+        """Add this session's not-yet-persisted hits/misses to the cumulative counters."""
+        with self._conn:
+            for name, value in (("hits", self.hits), ("misses", self.misses)):
+                self._conn.execute(
+                    "INSERT INTO counters (name, value) VALUES (?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                    (name, value - self._flushed[name])
+                )
+                self._flushed[name] = value
+
+    def stats(self):
+        """Session and cumulative hit/miss counters plus the entry count."""
+        totals = dict(self._conn.execute("SELECT name, value FROM counters"))
+        entries = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return {
+            "session_hits": self.hits,
+            "session_misses": self.misses,
+            "total_hits": totals.get("hits", 0),
+            "total_misses": totals.get("misses", 0),
+            "entries": entries
+        }
+
+    def close(self):
+        self._bump_counters()
+        self._conn.close()
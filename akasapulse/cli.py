@@ -0,0 +1,225 @@
+"""
+Command line entry point: ``python -m akasapulse <task> <stage>``.
+
+    python -m akasapulse sentiment upload --input feedback_batch_processing.xlsx
+    python -m akasapulse categorization extract --manifest ./batch_temp/<input>.jsonl.manifest.json
+    python -m akasapulse combined run --input feedback_batch_processing.xlsx --pack-size 10
+    python -m akasapulse generalization upload --input df.xlsx --map-reduce --no-submit
+    python -m akasapulse jobs run ./batch_temp/<a>.manifest.json ./batch_temp/<b>.manifest.json
+    python -m akasapulse jobs resume
+
+Stages:
+
+upload   builds the batch input, then runs the Bedrock job unless
+         ``--no-submit`` is given.
+extract  writes the final tables from the downloaded outputs.
+run      does both in one process with the same clients.
+
+``jobs run`` / ``jobs resume`` run prepared inputs side by side, as
+``Orchestration/Run_Batch_Jobs.py`` does.
+
+AWS credentials come from boto3's default chain (environment variables,
+``--profile`` or the instance role) and are never passed on the command line.
+Only argparse is imported at start-up; pandas, boto3 and the pipeline
+modules are imported by the command that runs, so ``--help`` is instant.
+"""
+import argparse
+import contextlib
+import logging
+
+from akasapulse.tasks import DEFAULT_BATCH_DIR, DEFAULT_BUCKET, DEFAULT_MODEL_ID, DEFAULT_ROLE_ARN, TASKS
+
+STAGES = ("upload", "extract", "run")
+
+
+def _aws_arguments(parser):
+    parser.add_argument("--profile", help="Named AWS profile (default credential chain if not given)")
+    parser.add_argument("--region", default="ap-south-1")
+    parser.add_argument("--bucket", default=DEFAULT_BUCKET)
+    parser.add_argument("--role-arn", default=DEFAULT_ROLE_ARN)
+    parser.add_argument("--model-id", default=DEFAULT_MODEL_ID)
+    parser.add_argument("--state-file", help="Job progress file (akasapulse.orchestrator.DEFAULT_STATE_PATH if not given)")
+
+
+def _store_arguments(parser):
+    parser.add_argument("--cache-file", help="Result cache (SQLite)")
+    parser.add_argument("--metrics-file", help="Token metrics store (SQLite)")
+    parser.add_argument("--incremental-state", help="Incremental state (SQLite); requires --period")
+    parser.add_argument("--period", help="Month of the input, e.g. 2026-01")
+
+
+def _upload_arguments(parser):
+    parser.add_argument("--input", help="Input sheet (.xlsx, .parquet or .csv)")
+    parser.add_argument("--feedback-column", help="Feedback column (the task's default if not given)")
+    parser.add_argument("--requeue-file", help="Requeue file written by the extraction stage")
+    parser.add_argument("--checkpoint-dir", help="Generalization pre-aggregation checkpoint folder")
+    parser.add_argument("--output-dir", default=DEFAULT_BATCH_DIR, help="Folder for the input shards and the outputs")
+    parser.add_argument("--pack-size", type=int, help="Feedbacks per request")
+    parser.add_argument("--dedup-threshold", type=float, help="Collapse near-duplicate feedbacks at this similarity")
+    parser.add_argument("--preclassify", action="store_true", help="Answer blank and generic feedbacks locally")
+    parser.add_argument("--preclassify-min-confidence", type=float, default=0.9)
+    parser.add_argument("--adaptive-max-tokens", action="store_true", help="maxTokens from --metrics-file history")
+    parser.add_argument("--map-reduce", action="store_true", help="Generalization: split large Unique_IDs")
+    parser.add_argument("--max-feedbacks", type=int, help="Feedbacks per request in map-reduce mode")
+    parser.add_argument("--stream-upload", action="store_true", help="Stream the input straight to S3")
+    parser.add_argument("--input-files", nargs="+", help="Pre-built input files (e.g. a retry batch) to submit as-is")
+    parser.add_argument("--resume-job", help="Finish an interrupted job recorded in the state file")
+    parser.add_argument("--no-submit", action="store_true", help="Only write the input shards and the manifest")
+    parser.add_argument("--keep-files", action="store_true", help="Keep the local input shards")
+
+
+def _extract_arguments(parser, with_inputs=True):
+    if with_inputs:
+        parser.add_argument("--manifest", help="Manifest written next to the batch input")
+        parser.add_argument("--output-files", nargs="+", help="Downloaded .jsonl.out files, without a manifest")
+        parser.add_argument("--output-dir", help="Folder holding the downloaded outputs (the manifest's folder by default)")
+    parser.add_argument("--extracted-dir", help="Per-file Parquet folder (the task's default if not given)")
+    parser.add_argument("--results-dir", default=".", help="Folder receiving the output tables")
+    parser.add_argument("--previous-output", help="Output of the run a retry batch completes")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m akasapulse", description=__doc__.splitlines()[1])
+    parser.add_argument("-v", "--verbose", action="store_true", help="Debug logging")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    for task in TASKS:
+        task_parser = commands.add_parser(task, help=f"{task} pipeline")
+        stages = task_parser.add_subparsers(dest="stage", required=True)
+        upload = stages.add_parser("upload", help="Build the batch input and run the job")
+        _upload_arguments(upload)
+        _store_arguments(upload)
+        _aws_arguments(upload)
+        extract = stages.add_parser("extract", help="Write the final tables from the downloaded outputs")
+        _extract_arguments(extract)
+        _store_arguments(extract)
+        run = stages.add_parser("run", help="upload, then extract the finished job")
+        _upload_arguments(run)
+        _extract_arguments(run, with_inputs=False)
+        _store_arguments(run)
+        _aws_arguments(run)
+
+    jobs = commands.add_parser("jobs", help="Run prepared inputs side by side")
+    job_stages = jobs.add_subparsers(dest="stage", required=True)
+    run_jobs = job_stages.add_parser("run", help="Submit the inputs of these manifests and wait for them")
+    run_jobs.add_argument("manifests", nargs="+")
+    run_jobs.add_argument("--keep-s3", action="store_true", help="Keep the jobs' S3 objects")
+    _aws_arguments(run_jobs)
+    resume_jobs = job_stages.add_parser("resume", help="Finish every unfinished job in the state file")
+    resume_jobs.add_argument("--keep-s3", action="store_true", help="Keep the jobs' S3 objects")
+    _aws_arguments(resume_jobs)
+    return parser
+
+
+def _open_stores(args, stack):
+    """Open the SQLite stores named on the command line; they are closed with ``stack``."""
+    stores = {}
+    if args.cache_file:
+        from akasapulse.cache import ResultCache
+
+        stores["cache"] = stack.enter_context(contextlib.closing(ResultCache(args.cache_file)))
+    if args.metrics_file:
+        from akasapulse.metrics import MetricsStore
+
+        stores["metrics"] = stack.enter_context(contextlib.closing(MetricsStore(args.metrics_file)))
+    if args.incremental_state:
+        from akasapulse.incremental import IncrementalState
+
+        if not args.period:
+            raise SystemExit("--incremental-state requires --period")
+        stores["incremental_state"] = stack.enter_context(contextlib.closing(IncrementalState(args.incremental_state)))
+    return stores
+
+
+def _runner(args, clients=None):
+    from akasapulse.clients import AwsClients
+    from akasapulse.orchestrator import DEFAULT_STATE_PATH
+    from akasapulse.upload import batch_runner
+
+    clients = clients or AwsClients(region_name=args.region, profile_name=args.profile)
+    return batch_runner(clients, args.role_arn, args.model_id, args.state_file or DEFAULT_STATE_PATH)
+
+
+def _upload(args, stores):
+    from akasapulse.upload import read_input, prepare_input, process_feedback_batch_local
+
+    df = None
+    if not (args.input_files or args.resume_job):
+        if not args.input:
+            raise SystemExit("--input is required unless --input-files or --resume-job is given")
+        df = prepare_input(read_input(args.input), args.task, requeue_file=args.requeue_file,
+                           incremental_state=stores.get("incremental_state"), period=args.period,
+                           checkpoint_dir=args.checkpoint_dir)
+    options = {}
+    if args.max_feedbacks:
+        options["max_feedbacks"] = args.max_feedbacks
+    if args.preclassify:
+        from akasapulse.preclassify import PreClassifier
+
+        options["preclassifier"] = PreClassifier(args.task, min_confidence=args.preclassify_min_confidence)
+    return process_feedback_batch_local(
+        df, args.task, args.bucket, args.role_arn, runner=_runner(args), feedback_column=args.feedback_column,
+        cleanup_files=not args.keep_files, stream_upload=args.stream_upload, pack_size=args.pack_size,
+        cache=stores.get("cache"), dedup_threshold=args.dedup_threshold, input_files=args.input_files,
+        map_reduce=args.map_reduce, submit_job=not args.no_submit, resume_job=args.resume_job,
+        metrics=stores.get("metrics"), adaptive_max_tokens=args.adaptive_max_tokens,
+        model_id=args.model_id, output_dir=args.output_dir, **options
+    )
+
+
+def _extract(args, stores, job=None):
+    from akasapulse.outputs import extract_job, extract_task
+
+    options = dict(extracted_dir=args.extracted_dir, results_dir=args.results_dir, previous_output=args.previous_output,
+                   cache=stores.get("cache"), metrics=stores.get("metrics"),
+                   incremental_state=stores.get("incremental_state"), period=args.period)
+    if job is not None:
+        return extract_job(job, **options)
+    if not (args.manifest or args.output_files):
+        raise SystemExit("--manifest or --output-files is required")
+    return extract_task(args.task, output_files=args.output_files, manifest_file=args.manifest,
+                        output_dir=args.output_dir, **options)
+
+
+def _jobs(args):
+    from akasapulse.batch_io import read_input_manifest
+    from akasapulse.orchestrator import manifest_job_spec, run_batch_jobs, resume_batch_jobs
+    from akasapulse.tasks import task_settings
+
+    runner = _runner(args)
+    if args.stage == "resume":
+        results = resume_batch_jobs(runner, cleanup=not args.keep_s3)
+    else:
+        specs = [manifest_job_spec(manifest, args.bucket, task_settings(read_input_manifest(manifest)["task"])["s3_prefix"])
+                 for manifest in args.manifests]
+        results = run_batch_jobs(runner, specs, cleanup=not args.keep_s3)
+    failed = 0
+    for name, result in results.items():
+        print(f"{name}: {result['status'] if isinstance(result, dict) else result}")
+        failed += not isinstance(result, dict)
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+    if args.command == "jobs":
+        return _jobs(args)
+
+    args.task = args.command
+    if args.stage == "run" and args.no_submit:
+        raise SystemExit("run submits the job; use upload --no-submit to only prepare the input")
+    with contextlib.ExitStack() as stack:
+        stores = _open_stores(args, stack)
+        if args.stage == "extract":
+            _extract(args, stores)
+            return 0
+        job = _upload(args, stores)
+        if not isinstance(job, dict):
+            # The upload or the job failed; the message was printed
+            return 1
+        if args.stage == "upload" and args.no_submit:
+            print(f"Input ready for `python -m akasapulse jobs run`: {job.get('manifest_file') or job['input_s3_uri']}")
+        if args.stage == "run":
+            _extract(args, stores, job)
+    return 0
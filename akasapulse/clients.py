@@ -0,0 +1,55 @@
+"""
+AWS clients shared by every stage of a run.
+
+The scripts used to build a new Bedrock and S3 client inside each
+``process_feedback_batch_local`` call. ``AwsClients`` creates each client on
+first use and hands the same one back afterwards, so a scheduler can run
+upload, job and extraction stages of several tasks with one set of clients.
+boto3 is imported only when the first client is needed.
+"""
+import threading
+
+DEFAULT_REGION = "ap-south-1"
+
+
+class AwsClients:
+    """
+    Lazily created, shared boto3 clients
+
+    Args:
+        credentials (dict): ``aws_access_key_id``, ``aws_secret_access_key``,
+            ``aws_session_token`` and optionally ``region_name``; when not given,
+            boto3's default chain (environment, profile, instance role) is used
+        region_name (str): Region used when ``credentials`` does not name one
+        profile_name (str): Named AWS profile, instead of ``credentials``
+    """
+
+    def __init__(self, credentials=None, region_name=DEFAULT_REGION, profile_name=None):
+        self.credentials = dict(credentials or {})
+        self.region_name = self.credentials.pop("region_name", None) or region_name
+        self.profile_name = profile_name
+        self._session = None
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def client(self, service_name):
+        """The shared client for ``service_name`` ("s3", "bedrock", ...)."""
+        with self._lock:
+            client = self._clients.get(service_name)
+            if client is None:
+                if self._session is None:
+                    import boto3
+
+                    self._session = boto3.session.Session(
+                        region_name=self.region_name, profile_name=self.profile_name, **self.credentials
+                    )
+                client = self._clients[service_name] = self._session.client(service_name)
+            return client
+
+    @property
+    def s3(self):
+        return self.client("s3")
+
+    @property
+    def bedrock(self):
+        return self.client("bedrock")
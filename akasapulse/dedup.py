@@ -0,0 +1,225 @@
+"""
+Collapse exact and near-duplicate feedbacks before they are submitted.
+
+Two passes, both linear in the number of rows:
+
+1. Exact: rows are grouped on ``dedup_key`` (``normalize_feedback`` with
+   filler words dropped), so "Good!", "good" and "Very good." become one group.
+2. Near: every distinct key gets a MinHash signature over character 4-grams,
+   and locality-sensitive hashing (banding) proposes candidate pairs (each
+   key against the first key in its bucket). A candidate is merged only if
+   the exact 4-gram Jaccard similarity between the two cluster
+   representatives reaches ``threshold``, so every member is close to its
+   representative and no all-vs-all comparison is ever made. Character
+   similarity alone would merge "salary is good" with "salary is not good",
+   so the two keys must also contain the same negation and contrast words;
+   spelling, spacing, order and repetition may differ.
+
+One representative per cluster is sent; ``fan_out_records`` copies its answer
+to every Respondent_ID in the cluster after extraction.
+"""
+import zlib
+
+import numpy as np
+
+from akasapulse.text import normalize_feedback
+
+DEFAULT_THRESHOLD = 0.85
+DEFAULT_NUM_PERM = 64
+SHINGLE_SIZE = 4
+
+# Words that carry no meaning for classification; negations are deliberately kept
+FILLER_WORDS = frozenset({
+    "a", "an", "the", "very", "really", "so", "just", "quite", "please", "kindly",
+    "um", "uh", "hmm", "ok", "okay", "well", "actually", "basically"
+})
+
+# Words that flip or qualify the meaning; keys that differ in any of them are never merged
+NEGATION_WORDS = frozenset({
+    "not", "no", "never", "none", "nothing", "nobody", "nor", "neither", "cannot", "cant", "dont", "doesnt",
+    "didnt", "isnt", "arent", "wasnt", "werent", "wont", "wouldnt", "shouldnt", "couldnt", "havent", "hasnt",
+    "without", "lack", "lacks", "but", "however", "although", "though", "except", "yet", "unless"
+})
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+
+
+def dedup_key(text):
+    """Normalised feedback with filler words removed."""
+    return " ".join(word for word in normalize_feedback(text).split() if word not in FILLER_WORDS)
+
+
+def _shingles(key):
+    """crc32 hashes of the character 4-grams of ``key`` (the key itself if shorter)."""
+    padded = f" {key} "
+    if len(padded) <= SHINGLE_SIZE:
+        grams = {padded}
+    else:
+        grams = {padded[i:i + SHINGLE_SIZE] for i in range(len(padded) - SHINGLE_SIZE + 1)}
+    return np.unique(np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams)))
+
+
+def _same_negations(left_key, right_key):
+    """True if two keys contain the same negation / contrast words."""
+    return set(left_key.split()) & NEGATION_WORDS == set(right_key.split()) & NEGATION_WORDS
+
+
+def _jaccard(left, right):
+    """Exact Jaccard similarity of two sorted unique shingle arrays."""
+    common = len(np.intersect1d(left, right, assume_unique=True))
+    return common / (len(left) + len(right) - common)
+
+
+def _choose_bands(num_perm, threshold):
+    """Band count whose LSH threshold (1/b)^(1/r) is closest to ``threshold``."""
+    best = None
+    for bands in range(1, num_perm + 1):
+        if num_perm % bands:
+            continue
+        rows = num_perm // bands
+        error = abs((1 / bands) ** (1 / rows) - threshold)
+        if best is None or error < best[0]:
+            best = (error, bands)
+    return best[1]
+
+
+class _UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i, j):
+        root_i, root_j = self.find(i), self.find(j)
+        if root_i != root_j:
+            # Keep the lower index as root so the earliest row stays representative
+            self.parent[max(root_i, root_j)] = min(root_i, root_j)
+
+
+def minhash_signatures(keys, num_perm=DEFAULT_NUM_PERM, seed=1):
+    """
+    MinHash signatures for a list of keys
+
+    Args:
+        keys (list): Strings (or precomputed shingle arrays) to sign
+        num_perm (int): Number of hash permutations
+        seed (int): RNG seed for the permutation coefficients
+
+    Returns:
+        np.ndarray: (len(keys), num_perm) uint64 signatures
+    """
+    rng = np.random.default_rng(seed)
+    # a, b and the crc32 shingle hashes are all below 2**32, so a * x < 2**64 never wraps in uint64,
+    # and (a * x mod p) + b < 2**62: every step is exact arithmetic of ((a * x + b) mod p)
+    a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+    signatures = np.empty((len(keys), num_perm), dtype=np.uint64)
+    for i, key in enumerate(keys):
+        shingles = (key if isinstance(key, np.ndarray) else _shingles(key))[:, None]
+        shingles = shingles & np.uint64(0xFFFFFFFF)
+        signatures[i] = (((shingles * a) % _MERSENNE_PRIME + b) % _MERSENNE_PRIME).min(axis=0)
+    return signatures
+
+
+def collapse_duplicates(rows, threshold=DEFAULT_THRESHOLD, num_perm=DEFAULT_NUM_PERM, seed=1):
+    """
+    Group exact and near-duplicate feedbacks and keep one representative each
+
+    Args:
+        rows: Iterable of (respondent_id, feedback_text)
+        threshold (float): Minimum 4-gram Jaccard similarity for a near-duplicate;
+            1.0 disables the near pass and only collapses exact duplicates; near-duplicates must
+            also have the same negation and contrast words (see ``NEGATION_WORDS``)
+        num_perm (int): MinHash permutations
+        seed (int): RNG seed
+
+    Returns:
+        tuple: (representatives as a list of (respondent_id, feedback_text),
+                clusters as {representative_id: [member ids incl. itself]} for clusters of 2+,
+                report dict with rows / representatives / saved_requests / exact / near counts)
+    """
+    # Pass 1: exact duplicates on the filler-free normalised key
+    key_index = {}
+    keys = []
+    first_row = []
+    members = []
+    total = 0
+    for respondent_id, feedback_text in rows:
+        total += 1
+        respondent_id = str(respondent_id)
+        key = dedup_key(feedback_text)
+        index = key_index.get(key)
+        if index is None:
+            index = key_index[key] = len(keys)
+            keys.append(key)
+            first_row.append((respondent_id, feedback_text))
+            members.append([])
+        members[index].append(respondent_id)
+
+    # Pass 2: near duplicates between distinct keys via MinHash + LSH banding
+    groups = _UnionFind(len(keys))
+    if threshold < 1.0 and len(keys) > 1:
+        shingles = [_shingles(key) for key in keys]
+        signatures = minhash_signatures(shingles, num_perm=num_perm, seed=seed)
+        bands = _choose_bands(num_perm, threshold)
+        rows_per_band = num_perm // bands
+        for band in range(bands):
+            block = np.ascontiguousarray(signatures[:, band * rows_per_band:(band + 1) * rows_per_band])
+            buckets = {}
+            for i in range(len(keys)):
+                # Blank feedback only ever matches other blank feedback (handled in pass 1)
+                if not keys[i]:
+                    continue
+                anchor = buckets.setdefault(block[i].tobytes(), i)
+                if anchor == i:
+                    continue
+                root_anchor, root_i = groups.find(anchor), groups.find(i)
+                if (root_anchor != root_i and _same_negations(keys[root_anchor], keys[root_i])
+                        and _jaccard(shingles[root_anchor], shingles[root_i]) >= threshold):
+                    groups.union(root_anchor, root_i)
+
+    clusters = {}
+    representatives = []
+    root_members = {}
+    for i in range(len(keys)):
+        root_members.setdefault(groups.find(i), []).extend(members[i])
+    for root, ids in root_members.items():
+        representatives.append(first_row[root])
+        if len(ids) > 1:
+            clusters[first_row[root][0]] = ids
+
+    report = {
+        "rows": total,
+        "representatives": len(representatives),
+        "saved_requests": total - len(representatives),
+        "exact_duplicates": total - len(keys),
+        "near_duplicates": len(keys) - len(representatives),
+    }
+    return representatives, clusters, report
+
+
+def fan_out_records(records, clusters, id_column="Respondent_ID"):
+    """
+    Copy each representative's answer to every member of its cluster
+
+    Args:
+        records (list): Extracted records (dicts with ``id_column``)
+        clusters (dict): Representative ID -> member IDs (from the manifest)
+        id_column (str): Key holding the Respondent_ID
+
+    Returns:
+        list: Records with one entry per cluster member
+    """
+    fanned = []
+    for record in records:
+        member_ids = clusters.get(str(record[id_column]))
+        if not member_ids:
+            fanned.append(record)
+            continue
+        for member_id in member_ids:
+            fanned.append({**record, id_column: member_id})
+    return fanned
@@ -0,0 +1,297 @@
+"""
+Streaming extraction of Bedrock ``.jsonl.out`` files into Parquet.
+
+Each output file is read line by line and written to Parquet in bounded
+record batches, so memory stays constant no matter how large the file is.
+Lines that cannot be used are written to a separate ``.errors.jsonl`` file
+with their line number, and the token usage and stop reason of every line to
+``.usage.parquet`` (see ``akasapulse.metrics``). Several shard outputs are processed in parallel, one
+worker process per file. ``iter_parquet`` and ``write_batches`` let the later
+stages work through those files one record batch at a time as well.
+
+Parquet output needs ``pyarrow`` (``pip install pyarrow``).
+"""
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_BATCH_SIZE = 50_000
+
+
+def safe_get_model_text(entry):
+    """
+    Safely extract the model output text from a variety of possible shapes.
+    Expected shape:
+      entry["modelOutput"]["output"]["message"]["content"][0]["text"]
+    But this function tolerates missing keys, None values, or different types.
+    """
+    mo = entry.get("modelOutput")
+    if mo is None:
+        return None
+
+    # If modelOutput is already a string
+    if isinstance(mo, str):
+        return mo
+
+    # Navigate nested dicts safely
+    output = mo.get("output") if isinstance(mo, dict) else None
+    message = output.get("message") if isinstance(output, dict) else None
+    content = message.get("content") if isinstance(message, dict) else None
+
+    # content expected to be a list of dicts with "text"
+    if isinstance(content, list) and len(content) > 0:
+        first = content[0]
+        if isinstance(first, dict):
+            return first.get("text")
+
+    # Fallbacks: some variants may have different layout
+    if isinstance(message, dict) and "text" in message:
+        return message.get("text")
+
+    if isinstance(output, dict) and "text" in output:
+        return output.get("text")
+
+    # Nothing matched
+    return None
+
+
+def get_record_id(entry):
+    """recordId, tolerating the alternative keys seen in older outputs."""
+    return entry.get("recordId") or entry.get("Respondent_ID") or entry.get("respondent_id")
+
+
+def get_usage(entry):
+    """(input_tokens, output_tokens, stop_reason) of an output line, or None if it reports no usage."""
+    mo = entry.get("modelOutput")
+    if not isinstance(mo, dict):
+        return None
+    usage = mo.get("usage") or {}
+    if not usage and "stopReason" not in mo:
+        return None
+    return usage.get("inputTokens"), usage.get("outputTokens"), mo.get("stopReason")
+
+
+def iter_output_records(file_path):
+    """
+    Parse a ``.jsonl.out`` file lazily
+
+    Args:
+        file_path (str): Output file path
+
+    Yields:
+        tuple: (line_number, record_id, model_output, error, usage) where ``error`` is
+            None for a usable line and a message otherwise, and ``usage`` is
+            (input_tokens, output_tokens, stop_reason) or None when the line has none
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                yield line_number, None, None, "Empty line", None
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, None, line[:500], f"JSON decode error: {e}", None
+                continue
+            if not isinstance(entry, dict):
+                yield line_number, None, line[:500], "Line is not a JSON object", None
+                continue
+            record_id = get_record_id(entry)
+            model_output = safe_get_model_text(entry)
+            usage = get_usage(entry)
+            if record_id is None or model_output is None:
+                error = entry.get("error") or "Missing respondent_id or model_output"
+                yield line_number, record_id, model_output, str(error), usage
+            else:
+                yield line_number, str(record_id), model_output, None, usage
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("pyarrow is required for Parquet output (pip install pyarrow)") from e
+    return pyarrow
+
+
+def extract_file(file_path, output_dir, id_column="Respondent_ID", batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Stream one ``.jsonl.out`` file into Parquet plus an errors file and a usage file
+
+    Args:
+        file_path (str): Output file to read
+        output_dir (str): Destination directory
+        id_column (str): Column name for the recordId (Respondent_ID / Unique_ID)
+        batch_size (int): Records buffered before a Parquet row group is written
+
+    Returns:
+        dict: file, parquet, errors_file, usage, records, errors
+    """
+    pa = _require_pyarrow()
+    os.makedirs(output_dir, exist_ok=True)
+    stem = os.path.basename(file_path)
+    parquet_path = os.path.join(output_dir, f"{stem}.parquet")
+    errors_path = os.path.join(output_dir, f"{stem}.errors.jsonl")
+    usage_path = os.path.join(output_dir, f"{stem}.usage.parquet")
+    schema = pa.schema([(id_column, pa.string()), ("Model_Output", pa.string())])
+    usage_schema = pa.schema([
+        (id_column, pa.string()), ("Input_Tokens", pa.int64()), ("Output_Tokens", pa.int64()),
+        ("Output_Chars", pa.int64()), ("Stop_Reason", pa.string())
+    ])
+
+    ids, outputs = [], []
+    usage_rows = {name: [] for name in usage_schema.names}
+    records = errors = 0
+
+    def _flush_usage(writer):
+        writer.write_table(pa.table(usage_rows, schema=usage_schema))
+        for column in usage_rows.values():
+            column.clear()
+
+    with pa.parquet.ParquetWriter(parquet_path, schema) as writer, \
+            pa.parquet.ParquetWriter(usage_path, usage_schema) as usage_writer, \
+            open(errors_path, "w", encoding="utf-8") as errors_file:
+        for line_number, record_id, model_output, error, usage in iter_output_records(file_path):
+            if usage is not None and record_id is not None:
+                usage_rows[id_column].append(str(record_id))
+                usage_rows["Input_Tokens"].append(usage[0])
+                usage_rows["Output_Tokens"].append(usage[1])
+                usage_rows["Output_Chars"].append(len(model_output) if isinstance(model_output, str) else None)
+                usage_rows["Stop_Reason"].append(usage[2])
+                if len(usage_rows[id_column]) >= batch_size:
+                    _flush_usage(usage_writer)
+            if error is not None:
+                errors_file.write(json.dumps({
+                    "file": stem,
+                    "line_number": line_number,
+                    id_column: record_id,
+                    "Model_Output": model_output,
+                    "error": error
+                }) + "\n")
+                errors += 1
+                continue
+            ids.append(record_id)
+            outputs.append(model_output)
+            if len(ids) >= batch_size:
+                writer.write_table(pa.table({id_column: ids, "Model_Output": outputs}, schema=schema))
+                records += len(ids)
+                ids, outputs = [], []
+        if ids:
+            writer.write_table(pa.table({id_column: ids, "Model_Output": outputs}, schema=schema))
+            records += len(ids)
+        if usage_rows[id_column]:
+            _flush_usage(usage_writer)
+
+    return {
+        "file": file_path,
+        "parquet": parquet_path,
+        "errors_file": errors_path,
+        "usage": usage_path,
+        "records": records,
+        "errors": errors
+    }
+
+
+def _extract_file_args(args):
+    return extract_file(*args)
+
+
+def extract_outputs(file_paths, output_dir, id_column="Respondent_ID", batch_size=DEFAULT_BATCH_SIZE, workers=None):
+    """
+    Extract several output files in parallel, one worker process per file
+
+    Args:
+        file_paths (list): ``.jsonl.out`` files (e.g. every shard of a job)
+        output_dir (str): Destination directory
+        id_column (str): Column name for the recordId
+        batch_size (int): Records per Parquet row group
+        workers (int): Worker processes (defaults to the CPU count; 1 runs inline)
+
+    Returns:
+        list: One summary dict per file, in input order (see ``extract_file``)
+    """
+    jobs = [(path, output_dir, id_column, batch_size) for path in file_paths]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        summaries = [_extract_file_args(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            summaries = list(executor.map(_extract_file_args, jobs))
+
+    for summary in summaries:
+        print(f"Extracted {summary['records']} records ({summary['errors']} errors) from {summary['file']}")
+    return summaries
+
+
+def read_extracted(summaries, columns=None):
+    """Load the Parquet files written by ``extract_outputs`` into one DataFrame."""
+    import pandas as pd
+
+    frames = [pd.read_parquet(summary["parquet"], columns=columns) for summary in summaries]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)
+
+
+def iter_parquet(paths, columns=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Read Parquet files one record batch at a time
+
+    Args:
+        paths (list): Parquet files, e.g. ``summary["parquet"]`` of every ``extract_outputs`` summary
+        columns (list): Columns to read (all if not given)
+        batch_size (int): Rows per batch
+
+    Yields:
+        pd.DataFrame: Up to ``batch_size`` rows
+    """
+    pa = _require_pyarrow()
+    for path in paths:
+        for batch in pa.parquet.ParquetFile(path).iter_batches(batch_size=batch_size, columns=columns):
+            yield batch.to_pandas()
+
+
+def write_batches(frames, path, columns):
+    """
+    Write DataFrames to one Parquet file as they are produced, one row group per frame
+
+    Args:
+        frames: Iterable of DataFrames holding ``columns``
+        path (str): Destination
+        columns (list): Columns to write, all stored as strings (the extraction stages only carry text)
+
+    Returns:
+        int: Rows written
+    """
+    pa = _require_pyarrow()
+    schema = pa.schema([(column, pa.string()) for column in columns])
+    rows = 0
+    with pa.parquet.ParquetWriter(path, schema) as writer:
+        for frame in frames:
+            if len(frame):
+                writer.write_table(pa.Table.from_pandas(frame[list(columns)], schema=schema, preserve_index=False))
+                rows += len(frame)
+    return rows
+
+
+def read_usage(summaries, id_column="Respondent_ID"):
+    """Load the token usage and stop reasons written by ``extract_outputs`` into one DataFrame."""
+    import pandas as pd
+
+    frames = [pd.read_parquet(summary["usage"]) for summary in summaries]
+    if not frames:
+        return pd.DataFrame(columns=[id_column, "Input_Tokens", "Output_Tokens", "Output_Chars", "Stop_Reason"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def read_extraction_errors(summaries):
+    """Load every ``.errors.jsonl`` written by ``extract_outputs`` into one DataFrame."""
+    import pandas as pd
+
+    rows = []
+    for summary in summaries:
+        with open(summary["errors_file"], "r", encoding="utf-8") as f:
+            rows.extend(json.loads(line) for line in f)
+    return pd.DataFrame(rows)
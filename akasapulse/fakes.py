@@ -0,0 +1,264 @@
+"""
+In-memory stand-ins for the S3 and Bedrock clients used by the pipelines.
+
+They implement just the calls the pipelines make, with the same request and
+response shapes as boto3, so the orchestrator, the sharded uploads and the
+multipart writer can be exercised offline:
+
+    s3 = FakeS3Client()
+    bedrock = FakeBedrockClient(s3, responder=lambda record: "Sentiment: Positive")
+    runner = BatchJobRunner(bedrock, s3, role_arn="arn:...", model_id="...", sleep=lambda s: None)
+
+``FakeBedrockClient`` moves a job from ``Submitted`` through ``InProgress``
+to its final status over a few ``get_model_invocation_job`` calls and, on
+completion, writes ``<output uri>/<job id>/<input file>.out`` for every
+input file the way Bedrock does, answered by ``responder`` or by an
+``akasapulse.simulator.SimulatedModel``.
+"""
+import io
+import json
+import threading
+import uuid
+from datetime import datetime
+
+from botocore.exceptions import ClientError
+
+from akasapulse.simulator import output_record
+
+
+def _client_error(code, message, operation):
+    return ClientError({"Error": {"Code": code, "Message": message}}, operation)
+
+
+def _split(s3_uri):
+    bucket, _, key = s3_uri[len("s3://"):].partition("/")
+    return bucket, key
+
+
+class _Paginator:
+    def __init__(self, method):
+        self._method = method
+
+    def paginate(self, **params):
+        token = None
+        while True:
+            page = self._method(**params, **({"ContinuationToken": token} if token else {}))
+            yield page
+            if not page.get("IsTruncated"):
+                return
+            token = page["NextContinuationToken"]
+
+
+class FakeS3Client:
+    """
+    Thread-safe in-memory S3 client
+
+    Args:
+        page_size (int): Keys per ``list_objects_v2`` page
+        fail_keys (set): Keys whose upload raises ``ClientError`` (to test failure paths)
+    """
+
+    def __init__(self, page_size=1000, fail_keys=None):
+        self.objects = {}
+        self.page_size = page_size
+        self.fail_keys = set(fail_keys or ())
+        self._uploads = {}
+        self._lock = threading.Lock()
+
+    def _put(self, bucket, key, body, operation):
+        if key in self.fail_keys:
+            raise _client_error("InternalError", f"Injected failure for {key}", operation)
+        with self._lock:
+            self.objects[(bucket, key)] = bytes(body)
+
+    def _get(self, bucket, key, operation):
+        with self._lock:
+            if (bucket, key) not in self.objects:
+                raise _client_error("NoSuchKey", f"{key} does not exist", operation)
+            return self.objects[(bucket, key)]
+
+    def upload_file(self, Filename, Bucket, Key, **kwargs):
+        with open(Filename, "rb") as f:
+            self._put(Bucket, Key, f.read(), "PutObject")
+
+    def download_file(self, Bucket, Key, Filename, **kwargs):
+        body = self._get(Bucket, Key, "GetObject")
+        with open(Filename, "wb") as f:
+            f.write(body)
+
+    def put_object(self, Bucket, Key, Body=b"", **kwargs):
+        self._put(Bucket, Key, Body.encode("utf-8") if isinstance(Body, str) else Body, "PutObject")
+        return {"ETag": uuid.uuid4().hex}
+
+    def get_object(self, Bucket, Key, **kwargs):
+        body = self._get(Bucket, Key, "GetObject")
+        return {"Body": io.BytesIO(body), "ContentLength": len(body)}
+
+    def list_objects_v2(self, Bucket, Prefix="", ContinuationToken=None, **kwargs):
+        with self._lock:
+            keys = sorted(key for bucket, key in self.objects if bucket == Bucket and key.startswith(Prefix))
+        start = int(ContinuationToken or 0)
+        page = keys[start:start + self.page_size]
+        response = {
+            "KeyCount": len(page),
+            "IsTruncated": start + self.page_size < len(keys),
+            "Contents": [{"Key": key, "Size": len(self.objects[(Bucket, key)])} for key in page],
+        }
+        if response["IsTruncated"]:
+            response["NextContinuationToken"] = str(start + self.page_size)
+        return response
+
+    def get_paginator(self, operation_name):
+        return _Paginator(getattr(self, operation_name))
+
+    def delete_object(self, Bucket, Key, **kwargs):
+        with self._lock:
+            self.objects.pop((Bucket, Key), None)
+        return {}
+
+    def delete_objects(self, Bucket, Delete, **kwargs):
+        for obj in Delete["Objects"]:
+            self.delete_object(Bucket, obj["Key"])
+        return {"Deleted": [{"Key": obj["Key"]} for obj in Delete["Objects"]]}
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        upload_id = uuid.uuid4().hex
+        with self._lock:
+            self._uploads[upload_id] = {}
+        return {"UploadId": upload_id, "Bucket": Bucket, "Key": Key}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, **kwargs):
+        if Key in self.fail_keys:
+            raise _client_error("InternalError", f"Injected failure for {Key}", "UploadPart")
+        etag = uuid.uuid4().hex
+        with self._lock:
+            self._uploads[UploadId][PartNumber] = (etag, bytes(Body))
+        return {"ETag": etag}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload, **kwargs):
+        with self._lock:
+            parts = self._uploads.pop(UploadId)
+        body = b"".join(parts[part["PartNumber"]][1] for part in MultipartUpload["Parts"])
+        self._put(Bucket, Key, body, "CompleteMultipartUpload")
+        return {"Bucket": Bucket, "Key": Key}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId, **kwargs):
+        with self._lock:
+            self._uploads.pop(UploadId, None)
+        return {}
+
+
+def default_responder(record):
+    """Answer every request with an empty JSON object."""
+    return "{}"
+
+
+class FakeBedrockClient:
+    """
+    In-memory Bedrock batch-inference client writing its outputs to a ``FakeS3Client``
+
+    Args:
+        s3 (FakeS3Client): Store holding the job inputs and receiving the outputs
+        responder: ``f(record) -> str`` answer text for one input record
+        polls_until_done (int): ``get_model_invocation_job`` calls before the job finishes
+        final_status (str): Status the jobs end with (``Completed``, ``Failed``, ...)
+        drop_every (int): Leave out every n-th record (as a partially completed job does)
+        model (SimulatedModel): Produces whole output records instead of ``responder``
+            (malformed answers, record errors, ...)
+        poll_errors (list): Exceptions raised by the next ``get_model_invocation_job`` calls, one per call
+            (throttling, endpoint timeouts, ...)
+    """
+
+    def __init__(self, s3, responder=default_responder, polls_until_done=2, final_status="Completed", drop_every=None,
+                 model=None, poll_errors=None):
+        self.s3 = s3
+        self.responder = responder
+        self.model = model
+        self.polls_until_done = polls_until_done
+        self.final_status = final_status
+        self.drop_every = drop_every
+        self.poll_errors = list(poll_errors or ())
+        self.jobs = {}
+        self.created = 0
+        self._lock = threading.Lock()
+
+    def create_model_invocation_job(self, jobName, roleArn, modelId, inputDataConfig, outputDataConfig,
+                                    clientRequestToken=None, **kwargs):
+        with self._lock:
+            for job in self.jobs.values():
+                if clientRequestToken and job["clientRequestToken"] == clientRequestToken:
+                    return {"jobArn": job["jobArn"]}
+            job_id = uuid.uuid4().hex[:12]
+            job_arn = f"arn:aws:bedrock:ap-south-1:000000000000:model-invocation-job/{job_id}"
+            self.jobs[job_arn] = {
+                "jobArn": job_arn,
+                "jobName": jobName,
+                "clientRequestToken": clientRequestToken,
+                "roleArn": roleArn,
+                "modelId": modelId,
+                "status": "Submitted",
+                "submitTime": datetime.now(),
+                "inputDataConfig": inputDataConfig,
+                "outputDataConfig": outputDataConfig,
+                "polls": 0,
+            }
+            self.created += 1
+        return {"jobArn": job_arn}
+
+    def get_model_invocation_job(self, jobIdentifier):
+        with self._lock:
+            if self.poll_errors:
+                raise self.poll_errors.pop(0)
+            if jobIdentifier not in self.jobs:
+                raise _client_error("ResourceNotFoundException", f"{jobIdentifier} not found", "GetModelInvocationJob")
+            job = self.jobs[jobIdentifier]
+            job["polls"] += 1
+            if job["status"] in ("Submitted", "InProgress"):
+                if job["polls"] >= self.polls_until_done:
+                    self._finish(job)
+                else:
+                    job["status"] = "InProgress"
+            return {k: v for k, v in job.items() if k not in ("polls", "clientRequestToken")}
+
+    def list_model_invocation_jobs(self, nameContains=None, **kwargs):
+        with self._lock:
+            summaries = [
+                {"jobArn": job["jobArn"], "jobName": job["jobName"], "status": job["status"]}
+                for job in self.jobs.values()
+                if not nameContains or nameContains in job["jobName"]
+            ]
+        return {"invocationJobSummaries": summaries}
+
+    def stop_model_invocation_job(self, jobIdentifier):
+        with self._lock:
+            self.jobs[jobIdentifier]["status"] = "Stopped"
+        return {}
+
+    def _finish(self, job):
+        if self.final_status == "Failed":
+            job.update(status="Failed", message="Injected failure")
+            return
+        input_bucket, input_key = _split(job["inputDataConfig"]["s3InputDataConfig"]["s3Uri"])
+        output_uri = job["outputDataConfig"]["s3OutputDataConfig"]["s3Uri"].rstrip("/")
+        output_bucket, output_prefix = _split(f"{output_uri}/{job['jobArn'].rsplit('/', 1)[-1]}/")
+        pages = self.s3.get_paginator("list_objects_v2").paginate(Bucket=input_bucket, Prefix=input_key)
+        keys = [obj["Key"] for page in pages for obj in page.get("Contents", []) if obj["Key"].endswith(".jsonl")]
+        processed = 0
+        for key in keys:
+            lines = self.s3.get_object(Bucket=input_bucket, Key=key)["Body"].read().decode("utf-8").splitlines()
+            out = []
+            for i, line in enumerate(lines, 1):
+                if self.drop_every and i % self.drop_every == 0:
+                    continue
+                request = json.loads(line)
+                if self.model is not None:
+                    record = self.model.output_record(request)
+                else:
+                    record = output_record(request, self.responder(request))
+                out.append(json.dumps(record))
+            processed += len(out)
+            filename = key.rsplit("/", 1)[-1]
+            self.s3.put_object(Bucket=output_bucket, Key=f"{output_prefix}{filename}.out", Body="\n".join(out) + "\n")
+        self.s3.put_object(Bucket=output_bucket, Key=f"{output_prefix}manifest.json.out",
+                           Body=json.dumps({"processedRecordCount": processed}))
+        job.update(status=self.final_status, endTime=datetime.now())
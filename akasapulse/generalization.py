@@ -0,0 +1,198 @@
+"""
+Pre-aggregation of the Generalization input.
+
+The Generalization prompt receives, per ``Unique_ID``, a map
+``{feedback: {category_id: sentiment}}`` built from the long
+(Unique_ID, Feedback, Category_ID, Sentiments) sheet. ``aggregate_feedback``
+builds it directly with sorted, vectorised groupby operations. There is no
+dict-to-string serialisation, Excel round-trip or regex re-parse, and the
+result matches what the script used to produce:
+
+- feedback groups are ordered by (Unique_ID, Feedback), categories by first
+  appearance, and a repeated Category_ID keeps its last sentiment;
+- feedback keys are sanitised (trimmed, whitespace collapsed, "€" -> "EUR");
+  when two feedbacks sanitise to the same key the later one wins but keeps
+  the earlier position.
+
+The intermediate long table can be checkpointed to Parquet so a large month
+is only aggregated once. A fingerprint of the input (its period and a hash of
+the columns used) is written next to it, and the checkpoint is rebuilt when the
+next run's input does not match it.
+"""
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+PAIRS_CHECKPOINT = "generalization_pairs.parquet"
+CHECKPOINT_FINGERPRINT = "generalization_pairs.fingerprint.json"
+
+# build_pairs keyword -> default column name
+_INPUT_COLUMNS = {
+    "id_column": "Unique_ID",
+    "feedback_column": "Feedback",
+    "category_column": "Category_ID",
+    "sentiment_column": "Sentiments",
+}
+
+_PAIR_COLUMNS = ["Unique_ID", "Feedback_Key", "Category_ID", "Sentiment"]
+
+
+def sanitize_keys(feedback):
+    """Clean feedback key text (paragraphs, bullet points, etc.) for a whole Series."""
+    return (
+        feedback.astype(str)
+                .str.strip()
+                .str.replace(r"\s+", " ", regex=True)
+                .str.replace("€", "EUR", regex=False)
+    )
+
+
+def build_pairs(df, id_column="Unique_ID", feedback_column="Feedback",
+                category_column="Category_ID", sentiment_column="Sentiments"):
+    """
+    Resolve the long sheet into ordered (Unique_ID, Feedback_Key, Category_ID, Sentiment) rows
+
+    Args:
+        df (pd.DataFrame): One row per (Unique_ID, Feedback, Category_ID)
+        id_column (str): Group column
+        feedback_column (str): Verbatim column
+        category_column (str): Category ID column
+        sentiment_column (str): Sentiment column (1 / 0 / -1)
+
+    Returns:
+        tuple: (pairs DataFrame in payload order, list of Unique_IDs without any usable pair)
+    """
+    data = df[[id_column, feedback_column, category_column, sentiment_column]].dropna(
+        subset=[id_column, feedback_column]
+    )
+    data.columns = ["Unique_ID", "Feedback", "Category_ID", "Sentiment"]
+    all_ids = pd.unique(data["Unique_ID"]).tolist()
+
+    usable = data["Category_ID"].notna() & data["Sentiment"].notna()
+    if not usable.all():
+        logger.warning("Dropped %d rows without Category_ID or Sentiments", int((~usable).sum()))
+    data = data[usable].assign(
+        _row=np.flatnonzero(usable.to_numpy()),
+        Category_ID=lambda d: d["Category_ID"].astype(np.int64),
+        Sentiment=lambda d: d["Sentiment"].astype(np.int64)
+    )
+
+    # One entry per (Unique_ID, Feedback, Category_ID): position of the first row, value of the last
+    pairs = (
+        data.groupby(["Unique_ID", "Feedback", "Category_ID"], sort=False)
+            .agg(_row=("_row", "min"), Sentiment=("Sentiment", "last"))
+            .reset_index()
+            .sort_values(["Unique_ID", "Feedback", "_row"], kind="stable", ignore_index=True)
+    )
+
+    # Feedbacks that sanitise to the same key: the last (in sorted order) wins, the first keeps its slot
+    pairs["Feedback_Key"] = sanitize_keys(pairs["Feedback"])
+    pairs["_feedback"] = pairs.groupby(["Unique_ID", "Feedback"], sort=False).ngroup()
+    by_key = pairs.groupby(["Unique_ID", "Feedback_Key"], sort=False)["_feedback"]
+    pairs["_slot"] = by_key.transform("min")
+    pairs = pairs[pairs["_feedback"] == by_key.transform("max")]
+    pairs = pairs.sort_values(["Unique_ID", "_slot", "_row"], kind="stable", ignore_index=True)
+
+    empty_ids = sorted(set(all_ids) - set(pairs["Unique_ID"].tolist()))
+    return pairs[_PAIR_COLUMNS], empty_ids
+
+
+def build_payloads(pairs, empty_ids=()):
+    """
+    Fold ordered pairs into one ``{feedback: {category_id: sentiment}}`` payload per Unique_ID
+
+    Args:
+        pairs (pd.DataFrame): Output of ``build_pairs``
+        empty_ids: Unique_IDs that get an empty payload
+
+    Returns:
+        pd.DataFrame: Unique_ID, Feedback_Output (dict), Feedback_Count
+    """
+    payloads = {}
+    current_id = current = None
+    for unique_id, key, category_id, sentiment in zip(
+        pairs["Unique_ID"].tolist(), pairs["Feedback_Key"].tolist(),
+        pairs["Category_ID"].tolist(), pairs["Sentiment"].tolist()
+    ):
+        if unique_id != current_id:
+            current_id = unique_id
+            current = payloads[unique_id] = {}
+        current.setdefault(key, {})[category_id] = sentiment
+    for unique_id in empty_ids:
+        payloads[unique_id] = {}
+
+    result = pd.DataFrame({
+        "Unique_ID": list(payloads),
+        "Feedback_Output": list(payloads.values())
+    })
+    result = result.sort_values("Unique_ID", kind="stable", ignore_index=True)
+    result["Feedback_Count"] = result["Feedback_Output"].map(len)
+    return result
+
+
+def input_fingerprint(df, period=None, **columns):
+    """
+    Identify the input a checkpoint was built from
+
+    Args:
+        df (pd.DataFrame): Long sheet passed to ``build_pairs``
+        period (str): Month of the input, e.g. "2026-01"
+        **columns: Column overrides passed to ``build_pairs``
+
+    Returns:
+        dict: period, rows and a SHA-256 of the four input columns (names and values, in row order)
+    """
+    names = [columns.get(keyword, default) for keyword, default in _INPUT_COLUMNS.items()]
+    hashes = pd.util.hash_pandas_object(df[names].astype(str), index=False).to_numpy()
+    digest = hashlib.sha256(json.dumps(names).encode("utf-8"))
+    digest.update(hashes.tobytes())
+    return {"period": period, "rows": len(df), "content_hash": digest.hexdigest()}
+
+
+def _read_fingerprint(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def aggregate_feedback(df, checkpoint_dir=None, period=None, **columns):
+    """
+    Build the Generalization input (one row per Unique_ID) from the long sheet
+
+    Args:
+        df (pd.DataFrame): One row per (Unique_ID, Feedback, Category_ID)
+        checkpoint_dir (str): If set, the resolved pairs are written to
+            ``generalization_pairs.parquet`` there and reused on the next run
+            with the same input
+        period (str): Month of the input; part of the checkpoint's fingerprint
+        **columns: Column overrides passed to ``build_pairs``
+
+    Returns:
+        pd.DataFrame: Unique_ID, Feedback_Output (dict), Feedback_Count
+    """
+    checkpoint = os.path.join(checkpoint_dir, PAIRS_CHECKPOINT) if checkpoint_dir else None
+    fingerprint_path = os.path.join(checkpoint_dir, CHECKPOINT_FINGERPRINT) if checkpoint_dir else None
+    fingerprint = input_fingerprint(df, period, **columns) if checkpoint else None
+    if checkpoint and os.path.exists(checkpoint) and _read_fingerprint(fingerprint_path) == fingerprint:
+        logger.info("Loading pre-aggregation checkpoint %s", checkpoint)
+        pairs = pd.read_parquet(checkpoint)
+        empty_ids = pairs.attrs.get("empty_ids", [])
+    else:
+        if checkpoint and os.path.exists(checkpoint):
+            logger.info("Pre-aggregation checkpoint %s was built from another input, rebuilding it", checkpoint)
+        pairs, empty_ids = build_pairs(df, **columns)
+        if checkpoint:
+            os.makedirs(checkpoint_dir, exist_ok=True)
+            pairs.attrs["empty_ids"] = list(empty_ids)
+            pairs.to_parquet(checkpoint, index=False)
+            # Written last: a crash in between leaves no matching fingerprint, so the pairs are rebuilt
+            with open(fingerprint_path, "w", encoding="utf-8") as f:
+                json.dump(fingerprint, f, indent=2)
+    return build_payloads(pairs, empty_ids)
@@ -0,0 +1,159 @@
+"""
+Incremental month processing: only new or changed records are sent again.
+
+Survey responses for a month keep arriving after the first run. Instead of
+re-sending the whole month, an ``IncrementalState`` (one SQLite file) keeps,
+per task and period, every record that was sent: its fingerprint, when it
+was sent and whether its answer came back.
+
+1. ``select_changes`` runs on the extracted sheet before the batch input is
+   built. A record is kept when it was never answered or its fingerprint
+   changed, and is marked *sent* with the time.
+   - Sentiments / Categorization: one record per Respondent_ID, fingerprint
+     of its feedback text.
+   - Generalization: one record per Unique_ID group, fingerprint of the
+     group's whole (Feedback, Category, Sentiment) set, so a group is
+     recomputed only when a late response or a re-classification touches it.
+2. ``mark_done`` runs in the extraction script with the Respondent_IDs /
+   Unique_IDs that got a usable answer. Records that were sent but never
+   answered (failed job, unrepaired answer) are selected again next time.
+
+Merge the new answers into the month's earlier output with the extraction
+scripts' ``previous_output``. ``watermark`` gives the highest Respondent_ID
+answered so far, for narrowing the ``Input_Creation.sql`` query of the
+per-respondent tasks.
+"""
+import logging
+import os
+import sqlite3
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INCREMENTAL_PATH = "./batch_temp/incremental_state.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    task TEXT NOT NULL,
+    period TEXT NOT NULL,
+    record_id TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    status TEXT NOT NULL,
+    sent_at REAL,
+    done_at REAL,
+    PRIMARY KEY (task, period, record_id)
+);
+"""
+
+
+def fingerprints(df, id_column, columns):
+    """
+    Order-independent content hash of every record (or group of rows) in ``df``
+
+    Args:
+        df (pd.DataFrame): Rows to fingerprint
+        id_column (str): Record key; rows sharing it are hashed together
+        columns (list): Columns that make up the content
+
+    Returns:
+        pd.Series: record_id (str) -> 16-digit hex fingerprint
+    """
+    import pandas as pd
+
+    hashes = pd.util.hash_pandas_object(df[list(columns)].astype(str), index=False)
+    # uint64 sums wrap around, so the group hash does not depend on row order
+    combined = hashes.groupby(df[id_column].astype(str).to_numpy()).sum()
+    return combined.map("{:016x}".format)
+
+
+class IncrementalState:
+    """
+    SQLite-backed record of what was sent and answered, per task and period
+
+    Args:
+        path (str): SQLite file path
+    """
+
+    def __init__(self, path=DEFAULT_INCREMENTAL_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(_SCHEMA)
+
+    def select_changes(self, df, task, period, id_column, columns):
+        """
+        Keep the rows of records not answered yet or whose content changed, and mark them sent
+
+        Args:
+            df (pd.DataFrame): The period's full extract (one row per record, or
+                several per Generalization group)
+            task (str): "sentiment", "categorization" or "generalization"
+            period (str): Survey period, e.g. "2026-01"
+            id_column (str): Respondent_ID / Unique_ID
+            columns (list): Content columns, e.g. ["Feedback"] or
+                ["Feedback", "Category_Name", "Sentiments"]
+
+        Returns:
+            pd.DataFrame: Rows of the selected records, in their original order
+        """
+        current = fingerprints(df, id_column, columns)
+        answered = dict(self._conn.execute(
+            "SELECT record_id, fingerprint FROM records WHERE task = ? AND period = ? AND status = 'done'",
+            (task, period)
+        ))
+        selected = [
+            (record_id, fingerprint) for record_id, fingerprint in zip(current.index, current.to_numpy())
+            if answered.get(record_id) != fingerprint
+        ]
+        changed = sum(1 for record_id, _ in selected if record_id in answered)
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO records (task, period, record_id, fingerprint, status, sent_at) "
+                "VALUES (?, ?, ?, ?, 'sent', ?)",
+                ((task, period, record_id, fingerprint, now) for record_id, fingerprint in selected)
+            )
+        print(f"Incremental {task} {period}: {len(selected)} of {len(current)} records to send "
+              f"({len(selected) - changed} new or unanswered, {changed} changed)")
+        return df[df[id_column].astype(str).isin({record_id for record_id, _ in selected})]
+
+    def mark_done(self, task, period, record_ids):
+        """
+        Record the answers that came back; records sent but not listed stay pending
+
+        Returns:
+            int: Records marked done
+        """
+        now = time.time()
+        with self._conn:
+            marked = self._conn.executemany(
+                "UPDATE records SET status = 'done', done_at = ? "
+                "WHERE task = ? AND period = ? AND record_id = ? AND status = 'sent'",
+                ((now, task, period, str(record_id)) for record_id in record_ids)
+            ).rowcount
+        logger.info("Marked %d %s records of %s done", marked, task, period)
+        return marked
+
+    def watermark(self, task, period):
+        """Highest record ID answered for ``task`` and ``period`` (None before the first run)."""
+        row = self._conn.execute(
+            "SELECT record_id FROM records WHERE task = ? AND period = ? AND status = 'done' "
+            "ORDER BY CAST(record_id AS INTEGER) DESC, record_id DESC LIMIT 1",
+            (task, period)
+        ).fetchone()
+        return row[0] if row else None
+
+    def stats(self, task, period):
+        """Record counts by status and the time of the last send."""
+        counts = dict(self._conn.execute(
+            "SELECT status, COUNT(*) FROM records WHERE task = ? AND period = ? GROUP BY status", (task, period)
+        ))
+        last_sent = self._conn.execute(
+            "SELECT MAX(sent_at) FROM records WHERE task = ? AND period = ?", (task, period)
+        ).fetchone()[0]
+        return {"done": counts.get("done", 0), "pending": counts.get("sent", 0), "last_sent_at": last_sent}
+
+    def close(self):
+        self._conn.close()
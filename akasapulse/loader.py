@@ -0,0 +1,306 @@
+"""
+Bulk, idempotent load of the final tables into the SQL warehouse.
+
+``load_dataframe`` writes a DataFrame through any DB-API connection factory
+(``pymysql.connect``, ``mysql.connector.connect``, ``sqlite3.connect``, ...)
+in transactional chunks of multi-row statements:
+
+upsert              ``INSERT ... ON DUPLICATE KEY UPDATE`` (MySQL) /
+                    ``ON CONFLICT DO UPDATE`` (SQLite) on ``key_columns``,
+                    which need a primary or unique key. Sentiments use it.
+replace-partition   each chunk deletes every row of the partitions it holds
+                    (e.g. all rows of its Respondent_IDs) and inserts the new
+                    ones in the same transaction, so categories or issues that
+                    disappeared from an answer disappear from the table too.
+                    Categorization (per Respondent_ID) and Generalization (per
+                    Unique_ID, whose padded issue rows have no natural key)
+                    use it.
+
+``TABLES`` also maps a task's DataFrame columns to the warehouse's, e.g.
+Categorization's Category_ID / Sentiment become Category_Name / Sentiments.
+
+A chunk never splits a partition and is committed on its own, so a failed
+load can simply be re-run: finished chunks are rewritten with the same rows.
+``max_connections`` caps the number of connections (and so the concurrent
+write transactions) opened against the warehouse pool.
+"""
+import json
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from akasapulse.taxonomy import CATEGORY_NAME
+
+logger = logging.getLogger(__name__)
+
+MODES = ("upsert", "replace-partition")
+DEFAULT_CHUNK_SIZE = 5000           # rows per transaction
+DEFAULT_ROWS_PER_STATEMENT = 500    # rows per multi-row INSERT
+_MAX_PARAMETERS = 30000             # below SQLite's 32766 bound variables per statement
+
+_DIALECTS = {
+    "mysql": {"param": "%s", "update": "{col} = VALUES({col})", "upsert": " ON DUPLICATE KEY UPDATE {updates}"},
+    "sqlite": {"param": "?", "update": "{col} = excluded.{col}", "upsert": " ON CONFLICT ({keys}) DO UPDATE SET {updates}"},
+}
+
+# Final tables of the three pipelines: mode, key / partition columns
+# Load mode and key per pipeline; "columns" renames DataFrame columns to the warehouse's and
+# "values" maps a column's values first (keyed by the DataFrame column)
+TABLES = {
+    "sentiment": {"mode": "upsert", "key_columns": ["Respondent_ID"]},
+    "categorization": {
+        "mode": "replace-partition",
+        "key_columns": ["Respondent_ID"],
+        "columns": {"Category_ID": "Category_Name", "Sentiment": "Sentiments"},
+        "values": {"Category_ID": CATEGORY_NAME},
+    },
+    "generalization": {"mode": "replace-partition", "key_columns": ["Unique_ID"]},
+}
+
+
+class LoadError(RuntimeError):
+    """A chunk could not be written; its transaction was rolled back."""
+
+
+def quote_name(name):
+    """Backtick-quote a (possibly schema-qualified) table or column name."""
+    return ".".join(f"`{part}`" for part in name.split("."))
+
+
+def _python_value(value):
+    """Bindable value: None for NaN / NA, plain ints and floats, JSON for lists and dicts."""
+    if value is None:
+        return None
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if hasattr(value, "item"):
+        value = value.item()
+    try:
+        if value != value:
+            return None
+    except TypeError:
+        return None
+    return value
+
+
+def dataframe_rows(df, columns):
+    """Rows of ``df[columns]`` as tuples of bindable Python values."""
+    return [tuple(_python_value(value) for value in row)
+            for row in df[list(columns)].astype(object).itertuples(index=False, name=None)]
+
+
+def partition_chunks(rows, key_index, chunk_size):
+    """
+    Split rows (sorted by partition) into chunks of about ``chunk_size`` rows that never split a partition
+
+    Args:
+        rows (list): Row tuples, grouped by partition
+        key_index (list): Positions of the partition columns in a row
+        chunk_size (int): Target rows per chunk
+
+    Returns:
+        list: (rows, partition keys) per chunk
+    """
+    chunks = []
+    current, keys = [], []
+    previous = object()
+    for row in rows:
+        key = tuple(row[i] for i in key_index)
+        if key != previous:
+            if len(current) >= chunk_size:
+                chunks.append((current, keys))
+                current, keys = [], []
+            keys.append(key)
+            previous = key
+        current.append(row)
+    if current:
+        chunks.append((current, keys))
+    return chunks
+
+
+def create_table(connection, table, df, key_columns, mode="upsert", dialect="mysql"):
+    """
+    ``CREATE TABLE IF NOT EXISTS`` for ``df``'s columns, with the key the load mode needs
+
+    Integer and float columns become BIGINT / DOUBLE, everything else text
+    (VARCHAR(255) for key columns so MySQL can index them).
+    """
+    definitions = []
+    for column, dtype in df.dtypes.items():
+        if dtype.kind in "iu":
+            sql_type = "BIGINT"
+        elif dtype.kind == "f":
+            sql_type = "DOUBLE"
+        elif column in key_columns:
+            sql_type = "VARCHAR(255)"
+        else:
+            sql_type = "TEXT"
+        definitions.append(f"{quote_name(column)} {sql_type}")
+    keys = ", ".join(quote_name(column) for column in key_columns)
+    if mode == "upsert":
+        definitions.append(f"PRIMARY KEY ({keys})")
+    elif dialect == "mysql":
+        definitions.append(f"INDEX ({keys})")
+    cursor = connection.cursor()
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {quote_name(table)} ({', '.join(definitions)})")
+    if mode != "upsert" and dialect == "sqlite":
+        index = f"{table.split('.')[-1]}_{'_'.join(key_columns)}_idx"
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {quote_name(index)} ON {quote_name(table)} ({keys})")
+    connection.commit()
+
+
+class _Statements:
+    """SQL text of one load, built once per (dialect, table, columns)."""
+
+    def __init__(self, table, columns, key_columns, mode, dialect):
+        if dialect not in _DIALECTS:
+            raise ValueError(f"Unknown dialect {dialect!r}, expected one of {tuple(_DIALECTS)}")
+        spec = _DIALECTS[dialect]
+        self.param = spec["param"]
+        self.width = len(columns)
+        self.key_width = len(key_columns)
+        self.table = quote_name(table)
+        self.prefix = f"INSERT INTO {self.table} ({', '.join(quote_name(c) for c in columns)}) VALUES "
+        self.suffix = ""
+        if mode == "upsert":
+            updates = ", ".join(
+                spec["update"].format(col=quote_name(c)) for c in columns if c not in key_columns
+            ) or ", ".join(spec["update"].format(col=quote_name(c)) for c in key_columns)
+            self.suffix = spec["upsert"].format(keys=", ".join(quote_name(c) for c in key_columns), updates=updates)
+        self.key_names = [quote_name(c) for c in key_columns]
+
+    def insert(self, rows):
+        group = "(" + ", ".join([self.param] * self.width) + ")"
+        return self.prefix + ", ".join([group] * rows) + self.suffix
+
+    def delete(self, keys):
+        if self.key_width == 1:
+            return f"DELETE FROM {self.table} WHERE {self.key_names[0]} IN ({', '.join([self.param] * keys)})"
+        group = "(" + ", ".join([self.param] * self.key_width) + ")"
+        return f"DELETE FROM {self.table} WHERE ({', '.join(self.key_names)}) IN ({', '.join([group] * keys)})"
+
+
+def load_dataframe(connect, table, df, key_columns, mode="upsert", dialect="mysql",
+                   chunk_size=DEFAULT_CHUNK_SIZE, rows_per_statement=DEFAULT_ROWS_PER_STATEMENT,
+                   max_connections=1, create=False):
+    """
+    Write ``df`` into ``table`` idempotently
+
+    Args:
+        connect (callable): Returns a new DB-API connection (one per writer thread, one more for ``create``)
+        table (str): Target table, e.g. ``QP_DA.Category_Sentiment``
+        df (pd.DataFrame): Rows to write; its column names are the table's
+        key_columns (list): Upsert key, or partition columns for ``replace-partition``
+        mode (str): "upsert" or "replace-partition"
+        dialect (str): "mysql" or "sqlite"
+        chunk_size (int): Rows per transaction (a partition is never split)
+        rows_per_statement (int): Rows per multi-row INSERT
+        max_connections (int): Concurrent connections / transactions (keep within the pool's limit;
+            use 1 for SQLite)
+        create (bool): Create the table first if it does not exist
+
+    Returns:
+        dict: table, mode, rows, chunks, seconds, rows_per_second
+
+    Raises:
+        LoadError: A chunk failed; chunks already committed stay written, re-run to finish
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode {mode!r}, expected one of {MODES}")
+    key_columns = list(key_columns)
+    columns = list(df.columns)
+    missing = [column for column in key_columns if column not in columns]
+    if missing:
+        raise ValueError(f"Key columns {missing} are not in the DataFrame")
+
+    start = time.perf_counter()
+    statements = _Statements(table, columns, key_columns, mode, dialect)
+    rows_per_statement = max(1, min(rows_per_statement, _MAX_PARAMETERS // len(columns)))
+    if mode == "replace-partition":
+        df = df.sort_values(key_columns, kind="stable")
+    rows = dataframe_rows(df, columns)
+    key_index = [columns.index(column) for column in key_columns]
+    if mode == "replace-partition":
+        chunks = partition_chunks(rows, key_index, chunk_size)
+    else:
+        chunks = [(rows[i:i + chunk_size], None) for i in range(0, len(rows), chunk_size)]
+
+    if create:
+        connection = connect()
+        try:
+            create_table(connection, table, df, key_columns, mode, dialect)
+        finally:
+            connection.close()
+
+    def _write(connection, index):
+        chunk, keys = chunks[index]
+        cursor = connection.cursor()
+        try:
+            if keys:
+                max_keys = max(1, _MAX_PARAMETERS // len(key_columns))
+                for i in range(0, len(keys), max_keys):
+                    batch = keys[i:i + max_keys]
+                    cursor.execute(statements.delete(len(batch)), [value for key in batch for value in key])
+            for i in range(0, len(chunk), rows_per_statement):
+                batch = chunk[i:i + rows_per_statement]
+                cursor.execute(statements.insert(len(batch)), [value for row in batch for value in row])
+            connection.commit()
+        except Exception as e:
+            connection.rollback()
+            raise LoadError(f"Chunk {index + 1}/{len(chunks)} of {table} rolled back: {e}") from e
+        return len(chunk)
+
+    def _writer(worker, workers):
+        # One connection per writer thread, opened and closed in that thread
+        connection = connect()
+        try:
+            return sum(_write(connection, index) for index in range(worker, len(chunks), workers))
+        finally:
+            connection.close()
+
+    workers = max(1, min(max_connections, len(chunks)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_writer, worker, workers) for worker in range(workers)]
+    written = sum(future.result() for future in futures)
+
+    seconds = time.perf_counter() - start
+    report = {
+        "table": table,
+        "mode": mode,
+        "rows": written,
+        "chunks": len(chunks),
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(written / seconds) if seconds else None,
+    }
+    logger.info("Loaded %s", report)
+    return report
+
+
+def warehouse_frame(task, df):
+    """
+    ``df`` with the warehouse column names and values of ``task``'s final table (see ``TABLES``)
+
+    Raises:
+        ValueError: A mapped column holds a value without a warehouse equivalent (e.g. an unknown Category_ID)
+    """
+    spec = TABLES[task]
+    values = {column: mapping for column, mapping in spec.get("values", {}).items() if column in df.columns}
+    if values:
+        df = df.copy()
+        for column, mapping in values.items():
+            mapped = df[column].map(mapping)
+            unknown = df.loc[mapped.isna() & df[column].notna(), column].unique().tolist()
+            if unknown:
+                raise ValueError(f"{column} values {unknown} have no warehouse equivalent")
+            df[column] = mapped
+    return df.rename(columns=spec.get("columns", {}))
+
+
+def load_task_output(connect, task, table, df, **options):
+    """``load_dataframe`` with the columns, mode and key of a pipeline's final table (see ``TABLES``)."""
+    spec = TABLES[task]
+    return load_dataframe(connect, table, warehouse_frame(task, df), spec["key_columns"], mode=spec["mode"],
+                          **options)
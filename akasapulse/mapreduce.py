@@ -0,0 +1,257 @@
+"""
+Map-reduce Generalization for Unique_IDs with many feedbacks.
+
+A Unique_ID used to be sent as one request holding all of its feedbacks,
+with ``maxTokens = Feedback_Count * 10``, so large departments produced huge,
+slow and sometimes truncated requests. In map-reduce mode every request stays
+bounded, whatever the group size:
+
+map     ``iter_map_requests`` sends small groups unchanged (recordId =
+        Unique_ID). Larger groups are split into chunks of at most
+        ``max_feedbacks`` feedbacks / ``token_budget`` estimated tokens, each
+        summarised by the usual Generalization prompt (recordId
+        ``<Unique_ID>::map-0001``). All chunks run in parallel in the same
+        batch job.
+reduce  ``write_reduce_batch`` (called by the extraction script) groups the
+        chunk answers by Unique_ID and writes the next batch input. Each
+        request merges at most ``max_partials`` partial top-5 summaries,
+        weighted by their feedback counts, with
+        ``GENERALIZATION_REDUCE_PROMPT``. A group with more partials is
+        reduced in several levels (``<Unique_ID>::reduce1-0001``, ...). The
+        last level answers with recordId = Unique_ID in the usual output shape.
+
+Every non-final recordId is listed in the manifest's ``partials``
+(recordId -> Unique_ID, feedback count and level). The extraction script
+keeps partial answers in its output so retries and later passes can be
+merged with ``previous_output``. For each Unique_ID without a final answer
+it reduces the partials of the highest level present, and it reshapes only
+final answers.
+"""
+import json
+import logging
+import os
+
+from akasapulse.batch_io import batch_input_filename, read_input_manifest
+from akasapulse.prompts import GENERALIZATION_PROMPT, GENERALIZATION_REDUCE_PROMPT, encode_batch_request, estimate_tokens
+from akasapulse.sharding import write_shards, write_shard_manifest
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_FEEDBACKS = 150      # feedbacks per map request (the old fixed-maxTokens threshold)
+DEFAULT_TOKEN_BUDGET = 8000      # estimated feedback tokens per map request
+DEFAULT_MAX_PARTIALS = 10        # partial summaries merged per reduce request
+MAP_MAX_TOKENS = 1500
+REDUCE_MAX_TOKENS = 3000
+
+_SEPARATOR = "::"
+
+
+def split_payload(payload, max_feedbacks=DEFAULT_MAX_FEEDBACKS, token_budget=DEFAULT_TOKEN_BUDGET):
+    """
+    Split one ``{feedback: {category_id: sentiment}}`` payload into bounded chunks
+
+    Args:
+        payload (dict): Feedback_Output of one Unique_ID
+        max_feedbacks (int): Maximum feedbacks per chunk
+        token_budget (int): Maximum estimated tokens per chunk (a longer single feedback gets its own chunk)
+
+    Returns:
+        list: Chunk dicts in payload order (one chunk if the payload fits)
+    """
+    chunks = []
+    current = {}
+    tokens = 0
+    for feedback, categories in payload.items():
+        cost = estimate_tokens(f"{feedback!r}: {categories!r}, ")
+        if current and (len(current) >= max_feedbacks or tokens + cost > token_budget):
+            chunks.append(current)
+            current = {}
+            tokens = 0
+        current[feedback] = categories
+        tokens += cost
+    if current or not chunks:
+        chunks.append(current)
+    return chunks
+
+
+def iter_map_requests(rows, prompt=None, partials=None, max_feedbacks=DEFAULT_MAX_FEEDBACKS,
+                      token_budget=DEFAULT_TOKEN_BUDGET, max_tokens_policy=None, group_sizes=None):
+    """
+    Map-pass batch requests: one per small Unique_ID, one per chunk of a large one
+
+    Args:
+        rows: Iterable of (unique_id, feedback_output dict)
+        prompt (CompiledPrompt): Compiled Generalization prompt
+        partials (dict): Filled with chunk recordId -> {"unique_id", "feedbacks", "level"}
+        max_feedbacks (int): Maximum feedbacks per request
+        token_budget (int): Maximum estimated feedback tokens per request
+        max_tokens_policy: ``f(feedbacks) -> maxTokens`` (see ``akasapulse.metrics``), ``MAP_MAX_TOKENS`` if not given
+        group_sizes (dict): Filled with recordId -> feedbacks in the request
+
+    Yields:
+        str: Serialised batch request
+    """
+    prompt = prompt or GENERALIZATION_PROMPT.compile()
+    partials = {} if partials is None else partials
+    group_sizes = {} if group_sizes is None else group_sizes
+    max_tokens_policy = max_tokens_policy or (lambda feedbacks: MAP_MAX_TOKENS)
+    for unique_id, payload in rows:
+        unique_id = str(unique_id)
+        chunks = split_payload(payload, max_feedbacks, token_budget)
+        if len(chunks) == 1:
+            group_sizes[unique_id] = len(payload)
+            yield encode_batch_request(unique_id, prompt.render_json(respondent_id=unique_id, feedback_text=payload),
+                                       max_tokens=max_tokens_policy(len(payload)))
+            continue
+        for index, chunk in enumerate(chunks, start=1):
+            record_id = f"{unique_id}{_SEPARATOR}map-{index:04d}"
+            partials[record_id] = {"unique_id": unique_id, "feedbacks": len(chunk), "level": 0}
+            group_sizes[record_id] = len(chunk)
+            yield encode_batch_request(record_id, prompt.render_json(respondent_id=unique_id, feedback_text=chunk),
+                                       max_tokens=max_tokens_policy(len(chunk)))
+
+
+def iter_reduce_requests(groups, prompt=None, partials=None, max_partials=DEFAULT_MAX_PARTIALS):
+    """
+    Reduce-pass batch requests
+
+    Args:
+        groups (dict): Unique_ID -> (level of its partials, list of (feedback_count, summary dict))
+        prompt (CompiledPrompt): Compiled reduce prompt
+        partials (dict): Filled with intermediate recordId -> {"unique_id", "feedbacks", "level"}
+        max_partials (int): Maximum partial summaries per request
+
+    Yields:
+        str: Serialised batch request
+    """
+    prompt = prompt or GENERALIZATION_REDUCE_PROMPT.compile()
+    partials = {} if partials is None else partials
+    for unique_id, (level, summaries) in groups.items():
+        batches = [summaries[i:i + max_partials] for i in range(0, len(summaries), max_partials)]
+        for index, batch in enumerate(batches, start=1):
+            if len(batches) == 1:
+                record_id = unique_id
+            else:
+                record_id = f"{unique_id}{_SEPARATOR}reduce{level + 1}-{index:04d}"
+                partials[record_id] = {
+                    "unique_id": unique_id, "feedbacks": sum(count for count, _ in batch), "level": level + 1
+                }
+            text = json.dumps(
+                [{"feedback_count": count, "summary": summary} for count, summary in batch], ensure_ascii=False
+            )
+            yield encode_batch_request(record_id, prompt.render_json(respondent_id=unique_id, feedback_text=text),
+                                       max_tokens=REDUCE_MAX_TOKENS)
+
+
+def load_partials(manifest_file):
+    """
+    Partial recordIds of a map-reduce job, including those of the map / reduce /
+    retry jobs it continues (``reduce_of`` / ``retry_of`` manifests in the same folder)
+
+    Returns:
+        dict: recordId -> {"unique_id", "feedbacks", "level"}
+    """
+    partials = {}
+    directory = os.path.dirname(manifest_file)
+    pending = [manifest_file]
+    seen = set()
+    while pending:
+        path = pending.pop()
+        if path in seen or not os.path.exists(path):
+            continue
+        seen.add(path)
+        manifest = read_input_manifest(path)
+        for record_id, info in manifest.get("partials", {}).items():
+            partials.setdefault(record_id, info)
+        pending.extend(os.path.join(directory, manifest[key]) for key in ("reduce_of", "retry_of") if manifest.get(key))
+    return partials
+
+
+def split_partial_records(df, partials, id_column="Unique_ID", output_column="Model_Output"):
+    """
+    Separate final answers from the partial ones still to be reduced
+
+    For every Unique_ID without a final answer, the partials of the highest
+    level present are the ones to reduce next.
+
+    Args:
+        df (pd.DataFrame): Repaired outputs (merged with earlier passes)
+        partials (dict): Output of ``load_partials``
+
+    Returns:
+        tuple: (DataFrame of final answers,
+                dict Unique_ID -> (level, list of (feedback_count, summary dict)),
+                list of Unique_IDs with some partials of that level missing)
+    """
+    ids = df[id_column].astype(str)
+    is_partial = ids.isin(partials)
+    final_ids = set(ids[~is_partial])
+
+    received = {}
+    for record_id, output in zip(ids[is_partial], df.loc[is_partial, output_column]):
+        info = partials[record_id]
+        if info["unique_id"] in final_ids:
+            continue
+        received.setdefault(info["unique_id"], {}).setdefault(info["level"], {})[record_id] = output
+
+    expected = {}
+    for record_id, info in partials.items():
+        expected.setdefault((info["unique_id"], info["level"]), set()).add(record_id)
+
+    groups = {}
+    incomplete = []
+    for unique_id, levels in received.items():
+        level = max(levels)
+        answers = levels[level]
+        if set(answers) != expected[(unique_id, level)]:
+            incomplete.append(unique_id)
+        groups[unique_id] = (level, [
+            (partials[record_id]["feedbacks"], json.loads(answers[record_id])) for record_id in sorted(answers)
+        ])
+    return df[~is_partial].reset_index(drop=True), groups, sorted(incomplete)
+
+
+def write_reduce_batch(manifest_file, df, id_column="Unique_ID", output_column="Model_Output",
+                       max_partials=DEFAULT_MAX_PARTIALS, output_dir=None, allow_incomplete=False):
+    """
+    Write the next reduce pass for the partial answers of a map-reduce job
+
+    Unique_IDs whose partial answers are not all back wait for the retry of
+    the failed ones (extract the retry with ``previous_output`` and they are
+    reduced then); ``allow_incomplete`` reduces them from what is there.
+
+    Args:
+        manifest_file (str): Manifest of the job just extracted
+        df (pd.DataFrame): Repaired outputs of that job, merged with ``previous_output``
+        id_column (str): recordId column
+        output_column (str): Answer column
+        max_partials (int): Partial summaries merged per request
+        output_dir (str): Folder of the new input (defaults to the manifest's folder)
+        allow_incomplete (bool): Also reduce Unique_IDs with missing partial answers
+
+    Returns:
+        tuple: (DataFrame of final answers, reduce manifest path or None if nothing is left to reduce)
+    """
+    final_df, groups, incomplete = split_partial_records(df, load_partials(manifest_file), id_column, output_column)
+    if incomplete and not allow_incomplete:
+        logger.warning("%d Unique_IDs wait for the retry of missing partial answers: %s",
+                       len(incomplete), incomplete[:20])
+        groups = {unique_id: group for unique_id, group in groups.items() if unique_id not in incomplete}
+    elif incomplete:
+        logger.warning("%d Unique_IDs are reduced without all of their partial answers: %s",
+                       len(incomplete), incomplete[:20])
+    if not groups:
+        return final_df, None
+
+    output_dir = output_dir or os.path.dirname(manifest_file) or "."
+    base_name = batch_input_filename(prefix="generalization-reduce")
+    prompt = GENERALIZATION_REDUCE_PROMPT.compile()
+    partials = {}
+    shards = write_shards(iter_reduce_requests(groups, prompt, partials, max_partials), output_dir, base_name)
+    reduce_manifest = write_shard_manifest(
+        output_dir, base_name, shards,
+        task="generalization", prompt_version=prompt.version_id,
+        reduce_of=os.path.basename(manifest_file), partials=partials
+    )
+    print(f"Reduce batch for {len(groups)} Unique_IDs written: {reduce_manifest}")
+    return final_df, reduce_manifest
@@ -0,0 +1,305 @@
+"""
+Token and cost instrumentation with history-calibrated ``maxTokens``.
+
+A ``MetricsStore`` is one SQLite file with one row per request on each side:
+
+1. ``record_requests`` wraps the request stream while the batch input is
+   written and stores, per recordId, the estimated input tokens, the
+   ``maxTokens`` reserved and the group size (1 for a single feedback, the
+   pack size for packed requests, ``Feedback_Count`` for Generalization).
+2. ``record_outputs`` stores what the extraction scripts read back: actual
+   input/output tokens from ``usage``, the output length and ``stopReason``.
+
+``job_summary`` aggregates one job (reserved vs. used output tokens,
+truncations, estimated cost). ``max_tokens_policy`` turns the history into a
+``maxTokens`` per task and group size: a high percentile of the observed
+output tokens per feedback in the group's power-of-two size bucket, plus a
+safety margin, times the group size and never above the model ceiling.
+Buckets with too few samples, or where too many answers were cut off at the
+old limit, keep the default.
+"""
+import json
+import logging
+import math
+import os
+import re
+import sqlite3
+import time
+
+from akasapulse.batch_io import record_id_of
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_METRICS_PATH = "./batch_temp/metrics.sqlite"
+
+# USD per 1,000 tokens (on-demand list price); batch inference is billed at BATCH_DISCOUNT of it
+PRICING = {
+    "apac.amazon.nova-pro-v1:0": {"input": 0.0008, "output": 0.0032},
+}
+BATCH_DISCOUNT = 0.5
+MAX_OUTPUT_TOKENS = 5000
+
+# Characters of a serialised request that are not prompt text (recordId, inferenceConfig, ...)
+_ENVELOPE_CHARS = 160
+_MAX_TOKENS_RE = re.compile(r'"maxTokens": (\d+)')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    task TEXT,
+    prompt_version TEXT,
+    model_id TEXT,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS inputs (
+    job_id TEXT NOT NULL,
+    record_id TEXT NOT NULL,
+    input_tokens INTEGER,
+    max_tokens INTEGER,
+    group_size INTEGER,
+    PRIMARY KEY (job_id, record_id)
+);
+CREATE TABLE IF NOT EXISTS outputs (
+    job_id TEXT NOT NULL,
+    record_id TEXT NOT NULL,
+    input_tokens INTEGER,
+    output_tokens INTEGER,
+    output_chars INTEGER,
+    stop_reason TEXT,
+    PRIMARY KEY (job_id, record_id)
+);
+"""
+
+
+def size_bucket(group_size):
+    """Lower bound of the power-of-two bucket holding ``group_size`` (1, 2, 4, 8, ...)."""
+    group_size = max(int(group_size or 1), 1)
+    return 1 << (group_size.bit_length() - 1)
+
+
+def percentile(values, q):
+    """``q``-th percentile (0-100) of ``values`` by linear interpolation."""
+    values = sorted(values)
+    if not values:
+        return None
+    position = (len(values) - 1) * q / 100
+    low = math.floor(position)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+class MaxTokensPolicy:
+    """
+    ``maxTokens`` for a request of a given group size
+
+    A bucket spans group sizes ``b`` to ``2b - 1``, so it is calibrated in
+    output tokens per feedback and scaled by the request's own group size.
+
+    Args:
+        table (dict): Size bucket -> calibrated output tokens per feedback
+        default: maxTokens (int) or ``f(group_size) -> int`` for uncalibrated buckets
+        floor (int): Smallest calibrated maxTokens
+        ceiling (int): Model output limit
+    """
+
+    def __init__(self, table, default, floor=16, ceiling=MAX_OUTPUT_TOKENS):
+        self.table = dict(table)
+        self.default = default
+        self.floor = floor
+        self.ceiling = ceiling
+
+    def __call__(self, group_size=1):
+        per_feedback = self.table.get(size_bucket(group_size))
+        if per_feedback is not None:
+            tokens = math.ceil(per_feedback * max(int(group_size or 1), 1))
+            return int(min(max(tokens, self.floor), self.ceiling))
+        return self.default(group_size) if callable(self.default) else self.default
+
+    def __repr__(self):
+        return f"MaxTokensPolicy({self.table})"
+
+
+class MetricsStore:
+    """
+    SQLite-backed per-request token metrics
+
+    Args:
+        path (str): SQLite file path
+    """
+
+    def __init__(self, path=DEFAULT_METRICS_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(_SCHEMA)
+
+    def register_job(self, job_id, task, prompt_version=None, model_id=None):
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, task, prompt_version, model_id, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, task, prompt_version, model_id, time.time())
+            )
+
+    def record_requests(self, requests, job_id, group_sizes=None, batch_size=10_000):
+        """
+        Pass batch requests through unchanged, storing their input metrics
+
+        Args:
+            requests: Iterable of batch request dicts or serialised lines
+            job_id (str): Job identifier (the input base name)
+            group_sizes: dict (or ``f(record_id)``) giving the feedbacks per request;
+                looked up when each request is yielded, so a ``RequestPacker.packs``
+                dict that fills up during iteration works
+            batch_size (int): Rows buffered per insert
+
+        Yields:
+            The requests of ``requests``
+        """
+        rows = []
+        for request in requests:
+            line = request if isinstance(request, str) else json.dumps(request)
+            record_id = str(record_id_of(request))
+            match = _MAX_TOKENS_RE.search(line, max(len(line) - 120, 0))
+            if callable(group_sizes):
+                group_size = group_sizes(record_id)
+            elif group_sizes is not None:
+                group_size = group_sizes.get(record_id, 1)
+            else:
+                group_size = 1
+            if isinstance(group_size, (list, tuple)):
+                group_size = len(group_size)
+            rows.append((
+                job_id, record_id, max((len(line) - _ENVELOPE_CHARS) // 4, 1),
+                int(match.group(1)) if match else None, int(group_size or 1)
+            ))
+            if len(rows) >= batch_size:
+                self._insert_inputs(rows)
+                rows = []
+            yield request
+        self._insert_inputs(rows)
+
+    def _insert_inputs(self, rows):
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO inputs (job_id, record_id, input_tokens, max_tokens, group_size) "
+                "VALUES (?, ?, ?, ?, ?)", rows
+            )
+
+    def record_outputs(self, job_id, usage_df, id_column="Respondent_ID"):
+        """
+        Store the usage the extraction read back (see ``akasapulse.extract.read_usage``)
+
+        Rows without usage (cached answers, record errors) are skipped.
+
+        Returns:
+            int: Rows stored
+        """
+        usage_df = usage_df[usage_df["Output_Tokens"].notna()]
+        rows = [
+            (job_id, str(record_id), None if input_tokens != input_tokens else int(input_tokens),
+             int(output_tokens), None if chars != chars else int(chars), stop_reason)
+            for record_id, input_tokens, output_tokens, chars, stop_reason in zip(
+                usage_df[id_column], usage_df["Input_Tokens"], usage_df["Output_Tokens"],
+                usage_df["Output_Chars"], usage_df["Stop_Reason"]
+            )
+        ]
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO outputs (job_id, record_id, input_tokens, output_tokens, output_chars, stop_reason) "
+                "VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+        logger.info("Recorded usage of %d outputs for job %s", len(rows), job_id)
+        return len(rows)
+
+    def job_summary(self, job_id):
+        """
+        Reserved vs. used tokens, truncations and estimated cost of one job
+
+        Returns:
+            dict: Aggregates of the job's inputs and outputs
+        """
+        task, model_id = self._conn.execute(
+            "SELECT task, model_id FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone() or (None, None)
+        requests, estimated_input, reserved = self._conn.execute(
+            "SELECT COUNT(*), SUM(input_tokens), SUM(max_tokens) FROM inputs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        outputs, input_tokens, output_tokens, truncated = self._conn.execute(
+            "SELECT COUNT(*), SUM(input_tokens), SUM(output_tokens), "
+            "SUM(CASE WHEN stop_reason = 'max_tokens' THEN 1 ELSE 0 END) FROM outputs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        summary = {
+            "job_id": job_id,
+            "task": task,
+            "requests": requests,
+            "estimated_input_tokens": estimated_input or 0,
+            "reserved_output_tokens": reserved or 0,
+            "outputs": outputs,
+            "input_tokens": input_tokens or 0,
+            "output_tokens": output_tokens or 0,
+            "truncated": truncated or 0,
+            "output_utilisation": round((output_tokens or 0) / reserved, 3) if reserved else None,
+        }
+        price = PRICING.get(model_id)
+        if price:
+            summary["estimated_cost_usd"] = round(BATCH_DISCOUNT * (
+                (input_tokens or estimated_input or 0) * price["input"] + (output_tokens or 0) * price["output"]
+            ) / 1000, 4)
+        return summary
+
+    def _recent_jobs(self, task, recent_jobs):
+        return [job_id for (job_id,) in self._conn.execute(
+            "SELECT job_id FROM jobs WHERE task = ? ORDER BY created_at DESC LIMIT ?", (task, recent_jobs)
+        )]
+
+    def max_tokens_policy(self, task, default, q=99, margin=1.25, min_samples=200, recent_jobs=10,
+                          ceiling=MAX_OUTPUT_TOKENS, floor=16):
+        """
+        Calibrate the output tokens per feedback of each group-size bucket from the recent jobs of ``task``
+
+        Args:
+            task (str): "sentiment", "categorization" or "generalization"
+            default: maxTokens (int) or ``f(group_size)`` for buckets without enough history
+            q (float): Percentile of the observed output tokens per feedback to cover
+            margin (float): Multiplier applied on top of the percentile
+            min_samples (int): Outputs needed before a bucket is calibrated
+            recent_jobs (int): Jobs of ``task`` taken into account (newest first)
+            ceiling (int): Model output limit
+            floor (int): Smallest maxTokens ever returned
+
+        Returns:
+            MaxTokensPolicy: maxTokens scaled to each request's group size
+        """
+        jobs = self._recent_jobs(task, recent_jobs)
+        samples = {}
+        truncated = {}
+        for start in range(0, len(jobs), 500):
+            chunk = jobs[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for group_size, output_tokens, stop_reason in self._conn.execute(
+                "SELECT i.group_size, o.output_tokens, o.stop_reason FROM outputs o "
+                "JOIN inputs i ON i.job_id = o.job_id AND i.record_id = o.record_id "
+                f"WHERE o.job_id IN ({placeholders})", chunk
+            ):
+                bucket = size_bucket(group_size)
+                samples.setdefault(bucket, []).append(output_tokens / max(group_size or 1, 1))
+                if stop_reason == "max_tokens":
+                    truncated[bucket] = truncated.get(bucket, 0) + 1
+
+        table = {}
+        for bucket, values in samples.items():
+            if len(values) < min_samples:
+                continue
+            if truncated.get(bucket, 0) / len(values) > (100 - q) / 100:
+                # The old limit censored the distribution; the percentile would be too low
+                logger.warning("Bucket %d of %s: %d of %d outputs truncated, keeping the default",
+                               bucket, task, truncated[bucket], len(values))
+                continue
+            table[bucket] = percentile(values, q) * margin
+        logger.info("Output tokens per feedback calibrated for %s from %d jobs: %s", task, len(jobs), table)
+        return MaxTokensPolicy(table, default, floor=floor, ceiling=ceiling)
+
+    def close(self):
+        self._conn.close()
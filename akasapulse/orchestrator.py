@@ -0,0 +1,424 @@
+"""
+Submit Bedrock batch-inference jobs, poll them and download their outputs.
+
+``BatchJobRunner.run`` takes one job spec through its stages, recording each
+one in a JSON state file so an interrupted run picks up where it stopped:
+
+    uploaded   -> input shards are in S3 under the job's own prefix
+    submitted  -> ``create_model_invocation_job`` returned a job ARN
+    completed  -> the job reached a terminal status
+    downloaded -> every ``<shard>.jsonl.out`` is in ``download_dir``
+    done       -> the job's S3 input and output objects were deleted
+
+Jobs are submitted with ``clientRequestToken`` set to the job name and looked
+up by name before submitting, so a crash between submission and the state
+write never starts a second job. Polling backs off geometrically (with a
+little jitter) from ``poll_interval`` up to ``max_poll_interval``; throttling,
+timeouts and dropped connections while polling are retried with the same
+backoff, up to ``max_poll_errors`` in a row. Any other AWS error stops the job
+with a ``BatchJobError`` and is recorded in its state entry as ``last_error``;
+the stage stays where it was, so running again resumes from there.
+
+Outputs land in ``download_dir`` under their shard names, which is where
+``akasapulse.sharding.shard_output_paths`` looks for them.
+
+``run_batch_jobs`` runs several specs (e.g. Sentiments, Categorization and
+Generalization) at once on a thread pool sharing the same clients. The
+clients are injected, so ``akasapulse.fakes`` can stand in for S3 and Bedrock.
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from akasapulse.batch_io import read_input_manifest
+from akasapulse.sharding import upload_shards
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_PATH = "./batch_temp/orchestrator_state.json"
+
+TERMINAL_STATUSES = frozenset({"Completed", "PartiallyCompleted", "Failed", "Stopped", "Expired"})
+# Terminal statuses whose output is worth downloading (missing records are re-sent by the extraction step)
+USABLE_STATUSES = frozenset({"Completed", "PartiallyCompleted", "Stopped", "Expired"})
+
+# Error codes worth another poll; anything else (access denied, unknown job, ...) will not go away on its own
+TRANSIENT_ERROR_CODES = frozenset({
+    "ThrottlingException", "Throttling", "TooManyRequestsException", "ServiceUnavailableException",
+    "InternalServerException", "RequestTimeout", "RequestTimeoutException", "SlowDown",
+})
+
+_STAGES = ("pending", "uploaded", "submitted", "completed", "downloaded", "done")
+
+
+class BatchJobError(RuntimeError):
+    """Raised when a batch job cannot be submitted or ends without usable output."""
+
+
+def is_transient_error(error):
+    """True for AWS errors that a later retry can get past (throttling, timeouts, dropped connections)."""
+    from botocore.exceptions import BotoCoreError, ClientError
+
+    if isinstance(error, ClientError):
+        return error.response.get("Error", {}).get("Code") in TRANSIENT_ERROR_CODES
+    # Botocore's own errors are raised client-side: endpoint timeouts, connection resets, ...
+    return isinstance(error, BotoCoreError)
+
+
+def split_s3_uri(s3_uri):
+    """``("bucket", "key/prefix")`` from ``s3://bucket/key/prefix``."""
+    if not s3_uri.startswith("s3://"):
+        raise ValueError(f"Not an S3 URI: {s3_uri}")
+    bucket, _, key = s3_uri[len("s3://"):].partition("/")
+    return bucket, key
+
+
+def job_id_of(job_arn):
+    """Job ID (last ARN component); Bedrock writes the output under ``<output uri>/<job id>/``."""
+    return job_arn.rsplit("/", 1)[-1]
+
+
+def job_spec(name, bucket, s3_prefix, download_dir, input_files=None, input_s3_uri=None):
+    """
+    Describe one batch job
+
+    Inputs go to ``s3://<bucket>/<s3_prefix>/<name>/`` and outputs to
+    ``s3://<bucket>/<s3_prefix>-output/<name>/``, so each job reads only its
+    own shards and cleanup never touches another run.
+
+    Args:
+        name (str): Unique job name (also the idempotency token)
+        bucket (str): S3 bucket
+        s3_prefix (str): Key prefix, e.g. ``temp-batch-inference-sentiment``
+        download_dir (str): Local folder receiving the ``.jsonl.out`` files
+        input_files (list): Local shard files to upload
+        input_s3_uri (str): Input already in S3 (file or folder), instead of ``input_files``
+
+    Returns:
+        dict: Job spec for ``BatchJobRunner.run``
+    """
+    if not input_files and not input_s3_uri:
+        raise ValueError("A job needs input_files or input_s3_uri")
+    return {
+        "name": name,
+        "input_files": [os.path.abspath(path) for path in input_files or []],
+        "input_s3_uri": input_s3_uri or f"s3://{bucket}/{s3_prefix}/{name}/",
+        "output_s3_uri": f"s3://{bucket}/{s3_prefix}-output/{name}/",
+        "download_dir": os.path.abspath(download_dir),
+    }
+
+
+def manifest_job_spec(manifest_file, bucket, s3_prefix, name=None):
+    """
+    Job spec for the shards listed in an input manifest (written by the upload scripts
+    or by ``akasapulse.repair.write_retry_batch``); outputs are downloaded next to it
+
+    Args:
+        manifest_file (str): Input manifest path
+        bucket (str): S3 bucket
+        s3_prefix (str): Key prefix
+        name (str): Job name (defaults to the input file name without ``.jsonl``)
+
+    Returns:
+        dict: Job spec for ``BatchJobRunner.run``
+    """
+    manifest = read_input_manifest(manifest_file)
+    directory = os.path.dirname(manifest_file)
+    entries = manifest.get("shards") or [{"file": manifest["input_file"]}]
+    if name is None:
+        input_file = manifest["input_file"]
+        name = input_file[:-len(".jsonl")] if input_file.endswith(".jsonl") else input_file
+    spec = job_spec(name, bucket, s3_prefix, directory or ".",
+                    input_files=[os.path.join(directory, entry["file"]) for entry in entries])
+    # Lets the extraction stage find the outputs from the finished job alone
+    spec.update(manifest_file=os.path.abspath(manifest_file), task=manifest.get("task"))
+    return spec
+
+
+class JobState:
+    """
+    Job progress persisted as one JSON file, safe to share between threads
+
+    Every update rewrites the file atomically (temp file + ``os.replace``), so a
+    crash leaves either the previous or the new state on disk.
+
+    Args:
+        path (str): State file path (None keeps the state in memory only)
+    """
+
+    def __init__(self, path=DEFAULT_STATE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._jobs = {}
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self._jobs = json.load(f)
+
+    def get(self, name):
+        """Copy of the stored entry for job ``name`` or None."""
+        with self._lock:
+            entry = self._jobs.get(name)
+            return dict(entry) if entry else None
+
+    def update(self, name, **fields):
+        """Merge ``fields`` into the entry for job ``name`` and save."""
+        with self._lock:
+            entry = self._jobs.setdefault(name, {"name": name, "stage": "pending"})
+            entry.update(fields, updated_at=datetime.now().isoformat(timespec="seconds"))
+            self._save()
+            return dict(entry)
+
+    def unfinished(self):
+        """Specs of jobs that have not reached ``done`` (nor failed), for resuming."""
+        with self._lock:
+            return [dict(entry) for entry in self._jobs.values() if entry["stage"] not in ("done", "failed")]
+
+    def _save(self):
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._jobs, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+class BatchJobRunner:
+    """
+    Runs batch jobs end to end against injected Bedrock and S3 clients
+
+    Args:
+        bedrock_client: ``boto3.client("bedrock")`` (or a stand-in)
+        s3_client: ``boto3.client("s3")`` (or a stand-in)
+        role_arn (str): IAM role Bedrock assumes to read and write S3
+        model_id (str): Bedrock model ID
+        state (JobState): Progress store (defaults to an in-memory one)
+        poll_interval (float): First wait between status checks, in seconds
+        max_poll_interval (float): Upper bound of the wait
+        backoff (float): Factor applied to the wait after every check
+        timeout_hours (int): Bedrock job timeout
+        max_poll_errors (int): Transient errors in a row tolerated while polling
+        sleep: Sleep function (replaced in tests)
+    """
+
+    def __init__(self, bedrock_client, s3_client, role_arn, model_id, state=None, poll_interval=30,
+                 max_poll_interval=300, backoff=1.5, timeout_hours=None, max_poll_errors=5,
+                 sleep=time.sleep):
+        self.bedrock_client = bedrock_client
+        self.s3_client = s3_client
+        self.role_arn = role_arn
+        self.model_id = model_id
+        self.state = state or JobState(path=None)
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.backoff = backoff
+        self.timeout_hours = timeout_hours
+        self.max_poll_errors = max_poll_errors
+        self.sleep = sleep
+
+    def find_job(self, name):
+        """ARN of an existing job called ``name`` or None."""
+        response = self.bedrock_client.list_model_invocation_jobs(nameContains=name)
+        for summary in response.get("invocationJobSummaries", []):
+            if summary.get("jobName") == name:
+                return summary["jobArn"]
+        return None
+
+    def submit(self, name, input_s3_uri, output_s3_uri):
+        """
+        Create the invocation job, or return the ARN of the one already created under ``name``
+
+        Returns:
+            str: Job ARN
+        """
+        from botocore.exceptions import ClientError
+
+        job_arn = self.find_job(name)
+        if job_arn:
+            logger.info("Job %s already submitted: %s", name, job_arn)
+            return job_arn
+        params = {
+            "jobName": name,
+            "clientRequestToken": name,
+            "roleArn": self.role_arn,
+            "modelId": self.model_id,
+            "inputDataConfig": {"s3InputDataConfig": {"s3Uri": input_s3_uri, "s3InputFormat": "JSONL"}},
+            "outputDataConfig": {"s3OutputDataConfig": {"s3Uri": output_s3_uri}},
+        }
+        if self.timeout_hours:
+            params["timeoutDurationInHours"] = self.timeout_hours
+        try:
+            job_arn = self.bedrock_client.create_model_invocation_job(**params)["jobArn"]
+        except ClientError as e:
+            raise BatchJobError(f"Could not submit job {name}: {e}") from e
+        print(f"Batch job submitted: {job_arn}")
+        return job_arn
+
+    def wait(self, job_arn):
+        """
+        Poll the job until it reaches a terminal status
+
+        Throttling, timeouts and dropped connections are retried with the polling
+        backoff, up to ``max_poll_errors`` in a row; other errors are raised.
+
+        Returns:
+            dict: Last ``get_model_invocation_job`` response
+        """
+        from botocore.exceptions import BotoCoreError, ClientError
+
+        interval = self.poll_interval
+        errors = 0
+        while True:
+            try:
+                job = self.bedrock_client.get_model_invocation_job(jobIdentifier=job_arn)
+            except (ClientError, BotoCoreError) as e:
+                errors += 1
+                if not is_transient_error(e) or errors > self.max_poll_errors:
+                    raise
+                logger.warning("Polling job %s failed (%s), retry %d/%d in %.0fs",
+                               job_id_of(job_arn), e, errors, self.max_poll_errors, interval)
+                self.sleep(interval * random.uniform(0.9, 1.1))
+                interval = min(interval * self.backoff, self.max_poll_interval)
+                continue
+            errors = 0
+            status = job["status"]
+            if status in TERMINAL_STATUSES:
+                print(f"Batch job {job_id_of(job_arn)} finished with status {status}")
+                return job
+            logger.info("Job %s is %s, next check in %.0fs", job_id_of(job_arn), status, interval)
+            self.sleep(interval * random.uniform(0.9, 1.1))
+            interval = min(interval * self.backoff, self.max_poll_interval)
+
+    def _list_keys(self, s3_uri):
+        bucket, prefix = split_s3_uri(s3_uri)
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        return bucket, [
+            obj["Key"]
+            for page in paginator.paginate(Bucket=bucket, Prefix=prefix)
+            for obj in page.get("Contents", [])
+        ]
+
+    def download_outputs(self, output_s3_uri, job_arn, download_dir):
+        """
+        Download every ``.jsonl.out`` the job wrote, keeping the shard file names
+
+        Returns:
+            list: Local output paths
+        """
+        os.makedirs(download_dir, exist_ok=True)
+        bucket, keys = self._list_keys(f"{output_s3_uri.rstrip('/')}/{job_id_of(job_arn)}/")
+        paths = []
+        for key in keys:
+            filename = os.path.basename(key)
+            # manifest.json.out holds Bedrock's own job statistics, not answers
+            if not filename.endswith(".jsonl.out"):
+                continue
+            path = os.path.join(download_dir, filename)
+            self.s3_client.download_file(bucket, key, path)
+            paths.append(path)
+        print(f"Downloaded {len(paths)} output file(s) to {download_dir}")
+        return paths
+
+    def cleanup(self, *s3_uris):
+        """Delete every object under the given S3 prefixes (or single keys)."""
+        for s3_uri in s3_uris:
+            bucket, keys = self._list_keys(s3_uri)
+            for start in range(0, len(keys), 1000):
+                chunk = keys[start:start + 1000]
+                self.s3_client.delete_objects(Bucket=bucket, Delete={"Objects": [{"Key": key} for key in chunk]})
+            logger.info("Deleted %d object(s) under %s", len(keys), s3_uri)
+
+    def _upload(self, spec):
+        bucket, prefix = split_s3_uri(spec["input_s3_uri"])
+        uris = upload_shards(spec["input_files"], self.s3_client, bucket, prefix.rstrip("/"))
+        if not uris:
+            raise BatchJobError(f"Upload of the input of job {spec['name']} failed")
+
+    def run(self, spec, cleanup=True):
+        """
+        Take one job spec through every remaining stage
+
+        Args:
+            spec (dict): Output of ``job_spec`` / ``manifest_job_spec`` (or a state entry)
+            cleanup (bool): Delete the job's S3 input and output once downloaded
+
+        Returns:
+            dict: Final state entry (``status``, ``output_files``, ...)
+
+        Raises:
+            BatchJobError: If the job fails or ends without usable output
+        """
+        from botocore.exceptions import BotoCoreError, ClientError
+
+        name = spec["name"]
+        entry = self.state.get(name) or self.state.update(name, **{k: v for k, v in spec.items() if k != "name"})
+        if entry["stage"] == "done":
+            return entry
+        if entry["stage"] == "failed":
+            raise BatchJobError(f"Job {name} failed earlier: {entry.get('message')}")
+        stage = _STAGES.index(entry["stage"])
+
+        try:
+            if stage < _STAGES.index("uploaded"):
+                if entry["input_files"]:
+                    self._upload(entry)
+                entry = self.state.update(name, stage="uploaded")
+            if stage < _STAGES.index("submitted"):
+                job_arn = self.submit(name, entry["input_s3_uri"], entry["output_s3_uri"])
+                entry = self.state.update(name, stage="submitted", job_arn=job_arn)
+            if stage < _STAGES.index("completed"):
+                job = self.wait(entry["job_arn"])
+                entry = self.state.update(name, stage="completed", status=job["status"], message=job.get("message"))
+            if entry["status"] not in USABLE_STATUSES:
+                self.state.update(name, stage="failed")
+                raise BatchJobError(f"Job {name} ended with status {entry['status']}: {entry.get('message')}")
+            if entry["status"] != "Completed":
+                print(f"Job {name} ended with status {entry['status']}; missing records are re-sent after extraction")
+            if stage < _STAGES.index("downloaded"):
+                paths = self.download_outputs(entry["output_s3_uri"], entry["job_arn"], entry["download_dir"])
+                entry = self.state.update(name, stage="downloaded", output_files=paths)
+            if cleanup:
+                self.cleanup(entry["input_s3_uri"], entry["output_s3_uri"])
+            return self.state.update(name, stage="done", last_error=None)
+        except (ClientError, BotoCoreError) as e:
+            # AWS errors leave the stage as it was; running again resumes from there
+            entry = self.state.update(name, last_error=f"{type(e).__name__}: {e}")
+            raise BatchJobError(f"Job {name} interrupted at stage {entry['stage']}: {e}") from e
+
+
+def run_batch_jobs(runner, specs, max_workers=3, cleanup=True):
+    """
+    Run several batch jobs at the same time
+
+    Args:
+        runner (BatchJobRunner): Runner shared by all jobs
+        specs (list): Job specs
+        max_workers (int): Jobs in flight at once
+        cleanup (bool): Delete each job's S3 objects once downloaded
+
+    Returns:
+        dict: Job name -> final state entry, or the exception that stopped the job
+    """
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(runner.run, spec, cleanup): spec["name"] for spec in specs}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results[name] = future.result()
+                print(f"Job {name}: {results[name]['status']}, {len(results[name]['output_files'])} output file(s)")
+            except BatchJobError as e:
+                results[name] = e
+                print(f"Job {name} did not finish: {e}")
+    return results
+
+
+def resume_batch_jobs(runner, max_workers=3, cleanup=True):
+    """Run every unfinished job recorded in the runner's state file."""
+    return run_batch_jobs(runner, runner.state.unfinished(), max_workers=max_workers, cleanup=cleanup)
@@ -0,0 +1,336 @@
+"""
+Extraction stage of every task: turn downloaded batch outputs into the final tables.
+
+The three extraction scripts used to run the same steps under their
+``__main__`` guards, each with its own file names:
+
+- read the ``.jsonl.out`` files;
+- record token usage;
+- unpack packed answers;
+- repair the answers and queue the failures for a retry;
+- store new answers in the result cache;
+- fan answers out to de-duplicated respondents;
+- update the incremental state;
+- merge a retry into the run it completes;
+- reshape the answers;
+- load the warehouse.
+
+``extract_task`` runs those steps for any task. The file names come from
+``akasapulse.tasks``. The stores (``MetricsStore``, ``ResultCache``,
+``IncrementalState``) are passed in already open, and so is the previous
+output when it is held as a DataFrame. A scheduler can then chain the stages
+without re-opening or re-reading anything. ``extract_job`` takes the job
+returned by ``akasapulse.upload.process_feedback_batch_local`` as it is.
+
+Output files are extracted in worker processes (see ``akasapulse.extract``).
+On Windows the caller must run under an ``if __name__ == "__main__":``
+guard.
+"""
+import logging
+import os
+
+from akasapulse.batch_io import read_input_manifest
+from akasapulse.sharding import shard_output_paths, missing_records
+from akasapulse.packing import unpack_records, write_requeue_file
+from akasapulse.extract import (
+    DEFAULT_BATCH_SIZE, extract_outputs, iter_parquet, read_extracted, read_extraction_errors, read_usage,
+    write_batches
+)
+from akasapulse.repair import repair_outputs, write_retry_batch, merge_retry_results
+from akasapulse.tasks import TASKS, task_settings
+
+logger = logging.getLogger(__name__)
+
+
+def _frame(data):
+    """``data`` itself if it is a DataFrame, else the Parquet file it names."""
+    import pandas as pd
+
+    return data if isinstance(data, pd.DataFrame) else pd.read_parquet(data)
+
+
+def _sentiment_load_df(df):
+    """Sentiments warehouse rows: one label per Respondent_ID."""
+    load_df = df.assign(Sentiment=df["Model_Output"].str.removeprefix("Sentiment: "))
+    return load_df[[c for c in ["Respondent_ID", "Sentiment", "Prompt_Version"] if c in load_df.columns]]
+
+
+def extract_task(task, output_files=None, manifest_file=None, output_dir=None, extracted_dir=None, results_dir=".",
+                 cache=None, metrics=None, incremental_state=None, period=None, previous_output=None,
+                 warehouse_connect=None, warehouse_table=None, sentiment_warehouse_table=None,
+                 warehouse_connections=2, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Extract, repair and reshape the outputs of one batch job
+
+    The answers are unpacked, repaired and fanned out one Parquet record batch
+    at a time and written straight to the output file, so those steps hold
+    one batch in memory. The output file is then read back whole: the
+    incremental state, the retry merge, the reshape, the warehouse load and
+    the returned DataFrames work on every answer of the job at once.
+
+    Args:
+        task (str): Task name; the manifest's task wins when the manifest names one
+        output_files (list): ``.jsonl.out`` files (read from the manifest when ``manifest_file`` is given)
+        manifest_file (str): Manifest written next to the batch input
+        output_dir (str): Folder holding the downloaded outputs (defaults to the manifest's folder)
+        extracted_dir (str): Folder receiving one Parquet file and one .errors.jsonl per output file
+        results_dir (str): Folder receiving the output, failed-output and requeue files
+        cache (ResultCache): Result cache used by the upload stage; new answers are stored in it
+        metrics (MetricsStore): Token metrics store; actual output tokens and stop reasons are added to it
+        incremental_state (IncrementalState): Incremental state; the answered records are marked done in it
+        period (str): Period of the incremental run
+        previous_output: When extracting a retry batch: output of the run it completes
+            (DataFrame or Parquet path), merged with the retried answers
+        warehouse_connect: DB-API connection factory; the final tables are loaded when given
+        warehouse_table (str): Final table (the task's default if not given)
+        sentiment_warehouse_table (str): Combined jobs: Sentiments table (the sentiment task's default if not given)
+        warehouse_connections (int): Concurrent write connections
+        batch_size (int): Records per Parquet batch while extracting, unpacking, repairing and fanning out
+
+    Returns:
+        dict: DataFrames ``output`` (per record answers), ``final`` (reshaped rows, Categorization and
+            Generalization), ``sentiment`` (combined jobs), ``failed`` and ``errors``; ``reduce_manifest``
+            for map-reduce jobs with a reduce pass left
+    """
+    import pandas as pd
+
+    manifest = read_input_manifest(manifest_file) if manifest_file else {}
+    task = manifest.get("task") or task
+    settings = task_settings(task)
+    id_column = settings["id_column"]
+    extracted_dir = extracted_dir or settings["extracted_dir"]
+    os.makedirs(results_dir, exist_ok=True)
+
+    def result_path(name):
+        return os.path.join(results_dir, name)
+
+    # Sharded jobs: read every shard output listed in the manifest
+    if manifest_file:
+        output_files, missing_shards = shard_output_paths(manifest_file, output_dir)
+        if missing_shards:
+            print(f"No output found for shards: {missing_shards}")
+    if not output_files:
+        raise ValueError("No output files to extract")
+
+    summaries = extract_outputs(output_files, extracted_dir, id_column=id_column, batch_size=batch_size)
+    extracted_files = [summary["parquet"] for summary in summaries]
+    error_df = read_extraction_errors(summaries)
+    if not error_df.empty:
+        print(f"{len(error_df)} output lines could not be read, see {extracted_dir}/*.errors.jsonl")
+
+    if metrics is not None:
+        # Recorded under the input's job so the upload stage can calibrate maxTokens from it
+        metrics_job = (manifest.get("metrics_job") or manifest.get("input_file")
+                       or os.path.basename(output_files[0]).removesuffix(".out"))
+        metrics.record_outputs(metrics_job, read_usage(summaries, id_column=id_column), id_column=id_column)
+        print(f"Token usage: {metrics.job_summary(metrics_job)}")
+
+    if manifest_file and not manifest.get("packs"):
+        id_batches = iter_parquet(extracted_files, columns=[id_column], batch_size=batch_size)
+        returned_ids = (record_id for frame in id_batches for record_id in frame[id_column])
+        missing = missing_records(manifest_file, returned_ids)
+        if missing:
+            print(f"{len(missing)} submitted records have no output: {missing[:20]}")
+
+    if task == "generalization":
+        return _extract_generalization(read_extracted(summaries), error_df, manifest_file, result_path,
+                                       incremental_state, period, previous_output, warehouse_connect,
+                                       warehouse_table or settings["warehouse_table"], warehouse_connections)
+
+    packs = manifest.get("packs") or {}
+    clusters = manifest.get("clusters", {})
+    requeue_ids = []
+    failed_frames = []
+    seen_packs = set()
+
+    def repaired_batches():
+        for batch in iter_parquet(extracted_files, batch_size=batch_size):
+            # Packed jobs: split every packed answer back into one row per Respondent_ID.
+            # Respondents missing from a packed answer are re-sent on their own.
+            if packs:
+                batch_packs = {pack_id: packs[pack_id] for pack_id in batch[id_column] if pack_id in packs}
+                seen_packs.update(batch_packs)
+                records, unanswered = unpack_records(batch.to_dict("records"), batch_packs, task=task)
+                batch = pd.DataFrame(records, columns=batch.columns)
+                requeue_ids.extend(unanswered)
+            # Repair fenced / chatty / slightly broken answers and check every category and sentiment ID;
+            # the answers that still fail are queued for a retry
+            batch, failed = repair_outputs(batch, task=task)
+            failed_frames.append(failed)
+            yield batch
+
+    # Unpacked and repaired answers, one record batch at a time
+    answers_file = os.path.join(extracted_dir, f"{task}.answers.parquet")
+    write_batches(repaired_batches(), answers_file, [id_column, "Model_Output"])
+    # Packs without any output line
+    requeue_ids.extend(member for pack_id, members in packs.items() if pack_id not in seen_packs for member in members)
+
+    failed_frames = [failed for failed in failed_frames if not failed.empty]
+    failed_df = (pd.concat(failed_frames, ignore_index=True) if failed_frames
+                 else pd.DataFrame(columns=[id_column, "Raw_Output", "Error"]))
+    if not failed_df.empty:
+        failed_df.to_parquet(result_path(settings["failed_file"]), index=False)
+        print(f"{len(failed_df)} answers could not be repaired, see {settings['failed_file']}")
+        requeue_ids.extend(failed_df[id_column].astype(str))
+        if manifest_file and not manifest.get("packs"):
+            # Only the failed lines of the original input, ready for process_feedback_batch_local(input_files=[...])
+            write_retry_batch(manifest_file, failed_df[id_column])
+
+    if requeue_ids:
+        # A cluster representative stands for its whole cluster
+        requeue_ids = [member for rid in requeue_ids for member in clusters.get(rid, [rid])]
+        write_requeue_file(result_path(settings["requeue_file"]), requeue_ids)
+        print(f"{len(requeue_ids)} respondents to re-send, saved to {settings['requeue_file']}")
+
+    if cache is not None and manifest.get("cache_job"):
+        answers = (record for frame in iter_parquet([answers_file], batch_size=batch_size)
+                   for record in frame.to_dict("records"))
+        cache.resolve_pending(manifest["cache_job"], answers)
+
+    def output_batches():
+        for batch in iter_parquet([answers_file], batch_size=batch_size):
+            # De-duplicated jobs: copy each representative's answer to every respondent in its cluster
+            if clusters:
+                from akasapulse.dedup import fan_out_records
+
+                batch = pd.DataFrame(fan_out_records(batch.to_dict("records"), clusters), columns=batch.columns)
+            if manifest_file:
+                batch["Prompt_Version"] = manifest["prompt_version"]
+            yield batch
+
+    output_path = result_path(settings["output_file"])
+    write_batches(output_batches(), output_path,
+                  [id_column, "Model_Output"] + (["Prompt_Version"] if manifest_file else []))
+    os.remove(answers_file)
+    # From here on the whole output is in memory (one row per respondent)
+    extract_df = pd.read_parquet(output_path)
+
+    if incremental_state is not None:
+        # Records sent but missing here (failed or unrepaired) are selected again on the next run
+        incremental_state.mark_done(task, period, extract_df[id_column])
+        print(f"Incremental state: {incremental_state.stats(task, period)}")
+
+    if previous_output is not None:
+        extract_df = merge_retry_results(_frame(previous_output), extract_df)
+        extract_df.to_parquet(output_path, index=False)
+
+    result = {"output": extract_df, "failed": failed_df, "errors": error_df}
+    if task == "sentiment":
+        if warehouse_connect:
+            from akasapulse.loader import load_task_output
+
+            # One row per Respondent_ID, upserted, so re-running the load is safe
+            report = load_task_output(warehouse_connect, "sentiment", warehouse_table or settings["warehouse_table"],
+                                      _sentiment_load_df(extract_df), max_connections=warehouse_connections)
+            print(f"Warehouse load: {report}")
+        return result
+
+    from akasapulse.reshape import expand_categorization, split_combined
+
+    categorization = TASKS["categorization"]
+    if task == "combined":
+        # One answer per respondent holds both labels; split it into the two single-task outputs
+        sentiment_df, extract_df, inconsistent = split_combined(extract_df)
+        sentiment_df.to_parquet(result_path(TASKS["sentiment"]["output_file"]), index=False)
+        extract_df.to_parquet(result_path(categorization["output_file"]), index=False)
+        print(f"{TASKS['sentiment']['output_file']} written ({len(sentiment_df)} respondents, "
+              f"{inconsistent} with an overall sentiment that disagrees with their categories)")
+        result["sentiment"] = sentiment_df
+
+    # One row per (Respondent_ID, Category_ID); unreadable answers go to reshape_errors
+    final_df, reshape_errors = expand_categorization(extract_df)
+    if not reshape_errors.empty:
+        print(f"{len(reshape_errors)} answers could not be reshaped: {reshape_errors[id_column].tolist()[:20]}")
+    final_df.to_parquet(result_path(categorization["final_file"]), index=False)
+    result["final"] = final_df
+
+    if warehouse_connect:
+        from akasapulse.loader import load_task_output
+
+        # The rows of every Respondent_ID in final_df replace the ones stored for it, so re-running is safe
+        report = load_task_output(warehouse_connect, "categorization", warehouse_table or categorization["warehouse_table"],
+                                  final_df, max_connections=warehouse_connections)
+        print(f"Warehouse load: {report}")
+        if task == "combined":
+            report = load_task_output(warehouse_connect, "sentiment",
+                                      sentiment_warehouse_table or TASKS["sentiment"]["warehouse_table"],
+                                      _sentiment_load_df(result["sentiment"]), max_connections=warehouse_connections)
+            print(f"Warehouse load: {report}")
+    return result
+
+
+def _extract_generalization(extract_df, error_df, manifest_file, result_path, incremental_state, period,
+                            previous_output, warehouse_connect, warehouse_table, warehouse_connections):
+    """Generalization steps of ``extract_task``, from the repair on."""
+    from akasapulse.mapreduce import load_partials, write_reduce_batch
+    from akasapulse.reshape import expand_generalization
+
+    settings = TASKS["generalization"]
+    if manifest_file:
+        extract_df["Prompt_Version"] = read_input_manifest(manifest_file)["prompt_version"]
+
+    # Repair fenced / chatty / slightly broken JSON (repeated sentiment keys are merged) and check
+    # every category and sentiment ID; the answers that still fail are queued for a retry
+    extract_df, failed_df = repair_outputs(extract_df, task="generalization", id_column="Unique_ID")
+    # Map-reduce jobs: recordId -> Unique_ID of every chunk / intermediate answer
+    partials = load_partials(manifest_file) if manifest_file else {}
+    if not failed_df.empty:
+        failed_df.to_parquet(result_path(settings["failed_file"]), index=False)
+        requeue_ids = dict.fromkeys(partials.get(rid, {}).get("unique_id", rid) for rid in failed_df["Unique_ID"].astype(str))
+        write_requeue_file(result_path(settings["requeue_file"]), requeue_ids)
+        print(f"{len(failed_df)} answers could not be repaired, see {settings['failed_file']}; "
+              f"their Unique_IDs are saved to {settings['requeue_file']}")
+        if manifest_file:
+            # Only the failed lines of the original input, ready for process_feedback_batch_local(input_files=[...])
+            write_retry_batch(manifest_file, failed_df["Unique_ID"])
+
+    if previous_output is not None:
+        extract_df = merge_retry_results(_frame(previous_output), extract_df, id_column="Unique_ID")
+    extract_df.to_parquet(result_path(settings["output_file"]), index=False)
+    result = {"output": extract_df, "failed": failed_df, "errors": error_df}
+
+    # Map-reduce jobs: partial answers stay in the output (pass it as previous_output for the
+    # reduce pass); the next reduce batch is written and only whole-group answers are reshaped
+    if partials:
+        extract_df, result["reduce_manifest"] = write_reduce_batch(manifest_file, extract_df)
+        if result["reduce_manifest"]:
+            print(f"Submit the reduce batch with process_feedback_batch_local(..., input_files=[...]) and extract it "
+                  f"with manifest_file={result['reduce_manifest']!r} and previous_output={settings['output_file']!r}")
+
+    if incremental_state is not None:
+        # Records sent but missing here (failed or unrepaired) are selected again on the next run
+        incremental_state.mark_done("generalization", period, extract_df["Unique_ID"])
+        print(f"Incremental state: {incremental_state.stats('generalization', period)}")
+
+    # One block of padded Positive/Negative/Neutral issue rows per (Unique_ID, Category_ID 1-14);
+    # answers that still cannot be parsed are listed in reshape_errors
+    final_df, reshape_errors = expand_generalization(extract_df)
+    if not reshape_errors.empty:
+        print(f"{len(reshape_errors)} answers could not be reshaped: {reshape_errors['Unique_ID'].tolist()[:20]}")
+    final_df.sort_values(by=["Unique_ID", "Category_ID"], inplace=True)
+    result["final"] = final_df
+
+    if warehouse_connect:
+        from akasapulse.loader import load_task_output
+
+        # The rows of every Unique_ID in final_df replace the ones stored for it, so re-running is safe
+        report = load_task_output(warehouse_connect, "generalization", warehouse_table, final_df,
+                                  max_connections=warehouse_connections)
+        print(f"Warehouse load: {report}")
+    return result
+
+
+def extract_job(job, **options):
+    """
+    ``extract_task`` for a job returned by ``process_feedback_batch_local`` or ``BatchJobRunner.run``
+
+    Args:
+        job (dict): Finished job (``task``, ``manifest_file`` and ``output_files``)
+        **options: Passed to ``extract_task``
+
+    Returns:
+        dict: See ``extract_task``
+    """
+    if job.get("manifest_file"):
+        return extract_task(job.get("task"), manifest_file=job["manifest_file"], **options)
+    return extract_task(job.get("task"), output_files=job["output_files"], **options)
@@ -0,0 +1,168 @@
+"""
+Pack several short feedbacks into one batch request.
+
+Sentiments and Categorization records are dominated by the repeated
+instruction block, not by the verbatim itself. ``RequestPacker`` groups rows
+under an input-token budget and a feedback count, sends them to the packed
+prompt variants as a ``{Respondent_ID: feedback}`` JSON object and reserves
+``maxTokens`` for the keyed answer. ``unpack_records`` turns each packed
+answer back into the per-Respondent_ID ``Model_Output`` rows the extraction
+scripts already understand, and reports every Respondent_ID that was sent but
+not answered so it can be re-queued as a single request.
+"""
+import json
+
+from akasapulse.prompts import encode_batch_request, estimate_tokens
+from akasapulse.repair import RepairError, extract_json_object, loads_lenient
+
+DEFAULT_TOKEN_BUDGET = 6000      # estimated input tokens per packed request
+DEFAULT_MAX_FEEDBACKS = 25
+MAX_OUTPUT_TOKENS = 5000         # maxTokens ceiling of the batch model
+
+# Output tokens reserved per feedback in the keyed answer
+OUTPUT_TOKENS_PER_FEEDBACK = {"sentiment": 12, "categorization": 40, "combined": 50}
+RESPONSE_OVERHEAD_TOKENS = 20
+PER_FEEDBACK_OVERHEAD_TOKENS = 8     # JSON key, quotes and separators
+
+
+class RequestPacker:
+    """
+    Group (respondent_id, feedback_text) rows into packed batch requests
+
+    Iterating yields serialised requests. ``packs`` maps every pack recordId
+    to the Respondent_IDs inside it and is filled in as iteration proceeds,
+    so write it to the manifest once the requests have been consumed.
+
+    Args:
+        rows: Iterable of (respondent_id, feedback_text)
+        prompt (CompiledPrompt): Compiled packed prompt (row field ``feedbacks``)
+        task (str): "sentiment", "categorization" or "combined", selects the output reservation
+        token_budget (int): Estimated input tokens allowed per request
+        max_feedbacks (int): Maximum feedbacks per request
+        record_prefix (str): Prefix of the pack recordIds
+        max_tokens_policy: ``f(pack_size) -> maxTokens or None`` (see ``akasapulse.metrics``);
+            the fixed per-feedback reservation is used when it is not given or returns None
+    """
+
+    def __init__(self, rows, prompt, task, token_budget=DEFAULT_TOKEN_BUDGET,
+                 max_feedbacks=DEFAULT_MAX_FEEDBACKS, record_prefix="pack", max_tokens_policy=None):
+        self.rows = rows
+        self.prompt = prompt
+        self.output_tokens_per_feedback = OUTPUT_TOKENS_PER_FEEDBACK[task]
+        self.token_budget = token_budget
+        self.max_feedbacks = min(
+            max_feedbacks,
+            (MAX_OUTPUT_TOKENS - RESPONSE_OVERHEAD_TOKENS) // self.output_tokens_per_feedback
+        )
+        self.record_prefix = record_prefix
+        self.max_tokens_policy = max_tokens_policy
+        self.packs = {}
+
+    def default_max_tokens(self, pack_size):
+        """Fixed reservation: response overhead plus a per-feedback allowance."""
+        return RESPONSE_OVERHEAD_TOKENS + pack_size * self.output_tokens_per_feedback
+
+    def __iter__(self):
+        pack = {}
+        tokens = self.prompt.static_tokens
+        for respondent_id, feedback_text in self.rows:
+            respondent_id = str(respondent_id)
+            feedback_text = str(feedback_text)
+            cost = estimate_tokens(respondent_id) + estimate_tokens(feedback_text) + PER_FEEDBACK_OVERHEAD_TOKENS
+            if pack and (
+                len(pack) >= self.max_feedbacks
+                or tokens + cost > self.token_budget
+                or respondent_id in pack
+            ):
+                yield self._emit(pack)
+                pack = {}
+                tokens = self.prompt.static_tokens
+            pack[respondent_id] = feedback_text
+            tokens += cost
+        if pack:
+            yield self._emit(pack)
+
+    def _emit(self, pack):
+        record_id = f"{self.record_prefix}-{len(self.packs) + 1:06d}"
+        self.packs[record_id] = list(pack)
+        max_tokens = self.max_tokens_policy(len(pack)) if self.max_tokens_policy is not None else None
+        if max_tokens is None:
+            max_tokens = self.default_max_tokens(len(pack))
+        prompt_json = self.prompt.render_json(feedbacks=json.dumps(pack, ensure_ascii=False, indent=1))
+        return encode_batch_request(record_id, prompt_json, max_tokens=max_tokens)
+
+
+def parse_packed_output(text):
+    """
+    Parse a keyed JSON answer, tolerating code fences and surrounding prose
+
+    Returns:
+        dict or None: Parsed map, or None if no JSON object could be read
+    """
+    try:
+        return loads_lenient(extract_json_object(text))
+    except RepairError:
+        return None
+
+
+def _format_output(task, value):
+    """Render one unpacked answer in the single-request Model_Output shape."""
+    if task == "sentiment":
+        return f"Sentiment: {value}"
+    return json.dumps(value)
+
+
+def unpack_records(records, packs, task, id_column="Respondent_ID"):
+    """
+    Expand packed outputs into one record per Respondent_ID
+
+    Args:
+        records (list): Dicts with ``id_column`` (the pack recordId) and ``Model_Output``
+        packs (dict): Pack recordId -> list of Respondent_IDs (from the manifest)
+        task (str): "sentiment", "categorization" or "combined"
+        id_column (str): Key holding the recordId in ``records``
+
+    Returns:
+        tuple: (list of unpacked records, list of Respondent_IDs with no answer)
+    """
+    unpacked = []
+    missing = []
+    seen_packs = set()
+    for record in records:
+        pack_id = str(record[id_column])
+        members = packs.get(pack_id)
+        if members is None:
+            # Not a pack (e.g. a re-queued single request); pass through unchanged
+            unpacked.append(record)
+            continue
+        seen_packs.add(pack_id)
+        answers = parse_packed_output(record["Model_Output"]) or {}
+        answers = {str(k).strip(): v for k, v in answers.items()}
+        for respondent_id in members:
+            value = answers.get(respondent_id)
+            if value is None or (task != "sentiment" and not isinstance(value, dict)):
+                missing.append(respondent_id)
+                continue
+            unpacked.append({
+                **{k: v for k, v in record.items() if k not in (id_column, "Model_Output")},
+                id_column: respondent_id,
+                "Model_Output": _format_output(task, value),
+            })
+
+    for pack_id, members in packs.items():
+        if pack_id not in seen_packs:
+            missing.extend(members)
+    return unpacked, missing
+
+
+def write_requeue_file(path, respondent_ids):
+    """Save Respondent_IDs that must be re-sent as single requests."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([str(respondent_id) for respondent_id in respondent_ids], f, indent=2)
+    return path
+
+
+def read_requeue_file(path):
+    """Load Respondent_IDs written by ``write_requeue_file``."""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,274 @@
+"""
+Local pre-classifier for trivial verbatims, applied before the batch input is built.
+
+A large share of the survey verbatims are blank, "NA", "nothing" or a word
+of generic praise, and each of them used to cost a full request.
+``PreClassifier`` answers them locally when it is confident enough, in the
+answer format of the task (``Sentiment: <label>`` / ``{category_id:
+sentiment_id}`` / both in a combined answer), and only the rest go into
+the batch file:
+
+blank      empty, "NA", "nil", "nothing", "no comments", ...
+           -> Neutral / ``{"0": "0"}``
+praise     generic praise with nothing specific ("good", "all good",
+           "excellent") -> Positive / ``{"0": "1"}``
+keyword    short verbatims (``max_words``) that hit the keywords of exactly
+           one category (``CATEGORY_KEYWORDS`` plus ``EXTRA_KEYWORDS``,
+           matched in one pass by a single alternation regex) and carry a
+           clear sentiment word, with no negation, contrast or second
+           category -> that category; suggestions are Neutral, as the
+           Categorization prompt asks. Sentiments only take the polarity.
+
+Every rule has a confidence; rules below ``min_confidence`` are not used.
+The keyword rule (0.85) is below the default of 0.9, so it stays off until
+a precision report on the last months justifies lowering the threshold.
+``filter_rows`` writes the local answers as a ``.jsonl.out`` file (listed in
+the manifest, so the extraction scripts read it with the Bedrock outputs)
+and yields the rows that still need the model. ``precision_report``
+measures a configuration against past LLM labels: the share of requests
+saved and how often the local answer matches the model's, per rule.
+"""
+import json
+import logging
+import re
+
+from akasapulse.taxonomy import CATEGORY_ID, CATEGORY_KEYWORDS, SENTIMENT_ID
+from akasapulse.text import normalize_feedback
+
+logger = logging.getLogger(__name__)
+
+TASKS = ("sentiment", "categorization", "combined")
+
+BLANK_PHRASES = {
+    "", "na", "n a", "nil", "none", "null", "nothing", "no", "nope", "no comment", "no comments",
+    "no feedback", "no suggestion", "no suggestions", "nothing to say", "nothing to add", "nothing much",
+    "not applicable", "no remarks", "nothing as such", "nothing specific", "no issues", "ok", "okay",
+}
+PRAISE_PHRASES = {
+    "good", "very good", "great", "excellent", "awesome", "amazing", "nice", "best", "all good", "everything is good",
+    "everything good", "happy", "very happy", "satisfied", "good company", "great company", "great place to work",
+    "good place to work", "best company", "superb", "fantastic", "wonderful", "love it", "keep it up", "good work",
+    "all is well", "good experience", "great experience", "happy to work", "proud", "thank you", "thanks",
+}
+# Everyday words for the taxonomy categories, on top of CATEGORY_KEYWORDS
+EXTRA_KEYWORDS = {
+    "Compensation": ["salary", "pay", "hike", "increment", "appraisal", "ctc", "wages"],
+    "Employee Policies & Benefits": ["cab", "leave", "medical", "policy", "policies", "benefit", "benefits"],
+    "Career & Growth": ["growth", "career", "designation", "ijp"],
+    "Reward and Recognition": ["recognition", "appreciation", "reward", "rewards"],
+    "Learning & Development": ["training", "learning", "upskilling"],
+    "Work Place Amenities": ["cafeteria", "canteen", "food", "parking", "restroom", "seating"],
+    "Operational Effectiveness": ["roster", "rostering", "workload", "manpower", "staffing"],
+    "Line Manager": ["manager", "supervisor", "reporting manager"],
+    "Team": ["team", "colleagues", "teammates"],
+}
+POSITIVE_WORDS = {"good", "great", "excellent", "awesome", "amazing", "nice", "best", "happy", "satisfied", "supportive",
+                  "helpful", "fair", "friendly", "smooth", "proud", "love", "appreciate", "wonderful", "fantastic"}
+NEGATIVE_WORDS = {"bad", "poor", "worst", "low", "less", "unfair", "pathetic", "terrible", "horrible", "delayed",
+                  "delay", "late", "lack", "toxic", "rude", "unhappy", "worse", "stress", "stressful", "pending"}
+SUGGESTION_WORDS = {"should", "need", "needs", "please", "kindly", "improve", "improvement", "increase", "request",
+                    "suggest", "expect", "must", "hope", "would"}
+# Words that make a short verbatim too ambiguous for a rule
+DOUBT_WORDS = {"not", "but", "however", "although", "though", "except", "no", "never", "nothing", "dont", "didnt",
+               "doesnt", "isnt", "wasnt", "cant", "cannot", "wont", "without", "yet"}
+
+RULE_CONFIDENCE = {"blank": 0.99, "praise": 0.95, "keyword": 0.85}
+_SENTIMENT_NAME = {sentiment_id: name for name, sentiment_id in SENTIMENT_ID.items()}
+
+
+def _keyword_index(keywords):
+    """Normalised keyword -> category ID, for every category of ``keywords``."""
+    index = {}
+    for category, words in keywords.items():
+        for word in words:
+            key = normalize_feedback(word)
+            if key:
+                index.setdefault(key, CATEGORY_ID[category])
+    return index
+
+
+class PreClassifier:
+    """
+    Rule and keyword pre-classifier for one task
+
+    Args:
+        task (str): "sentiment", "categorization" or "combined"
+        min_confidence (float): Rules below this confidence are not applied
+        max_words (int): Longest verbatim (in words) the keyword rule answers
+        extra_keywords (dict): Category name -> extra keywords (defaults to ``EXTRA_KEYWORDS``)
+        blank_phrases (set): Normalised verbatims treated as blank
+        praise_phrases (set): Normalised verbatims treated as generic praise
+        rule_confidence (dict): Confidence of each rule ("blank", "praise", "keyword")
+    """
+
+    def __init__(self, task, min_confidence=0.9, max_words=8, extra_keywords=None,
+                 blank_phrases=BLANK_PHRASES, praise_phrases=PRAISE_PHRASES, rule_confidence=None):
+        if task not in TASKS:
+            raise ValueError(f"Unknown task {task!r}, expected one of {TASKS}")
+        self.task = task
+        self.min_confidence = min_confidence
+        self.max_words = max_words
+        self.blank_phrases = set(blank_phrases)
+        self.praise_phrases = set(praise_phrases)
+        self.rule_confidence = {**RULE_CONFIDENCE, **(rule_confidence or {})}
+        keywords = {category: list(words) for category, words in CATEGORY_KEYWORDS.items()}
+        for category, words in (EXTRA_KEYWORDS if extra_keywords is None else extra_keywords).items():
+            keywords.setdefault(category, []).extend(words)
+        self._category_of = _keyword_index(keywords)
+        # One alternation over every keyword (longest first), with an optional plural "s"
+        alternation = "|".join(re.escape(key) for key in sorted(self._category_of, key=len, reverse=True))
+        self._keyword_re = re.compile(rf"\b({alternation})s?\b")
+        self.stats = {"rows": 0, "blank": 0, "praise": 0, "keyword": 0}
+
+    def _answer(self, category_id, sentiment_id):
+        if self.task == "sentiment":
+            return f"Sentiment: {_SENTIMENT_NAME[sentiment_id]}"
+        categories = {str(category_id): str(sentiment_id)}
+        if self.task == "combined":
+            return json.dumps({"sentiment": _SENTIMENT_NAME[sentiment_id], "categories": categories})
+        return json.dumps(categories)
+
+    def _keyword_answer(self, text):
+        words = text.split()
+        if len(words) > self.max_words or DOUBT_WORDS.intersection(words):
+            return None
+        positive = bool(POSITIVE_WORDS.intersection(words))
+        negative = bool(NEGATIVE_WORDS.intersection(words))
+        suggestion = bool(SUGGESTION_WORDS.intersection(words))
+        if suggestion and not positive:
+            # "need better cab timings", "salary should increase": a suggestion is Neutral
+            sentiment_id = SENTIMENT_ID["Neutral"]
+        elif positive != negative and not suggestion:
+            sentiment_id = SENTIMENT_ID["Positive"] if positive else SENTIMENT_ID["Negative"]
+        else:
+            return None
+        if self.task == "sentiment":
+            # Without a category to anchor it, only a clear polarity is answered locally
+            return None if suggestion else self._answer(None, sentiment_id)
+        categories = {self._category_of[match] for match in self._keyword_re.findall(text)}
+        if len(categories) != 1:
+            return None
+        return self._answer(categories.pop(), sentiment_id)
+
+    def classify(self, feedback_text):
+        """
+        Local answer for one verbatim
+
+        Returns:
+            tuple: (answer text, rule name, confidence), or None if the model must answer
+        """
+        text = normalize_feedback(feedback_text)
+        if text in self.blank_phrases:
+            rule, answer = "blank", self._answer(0, SENTIMENT_ID["Neutral"])
+        elif text in self.praise_phrases:
+            rule, answer = "praise", self._answer(0, SENTIMENT_ID["Positive"])
+        else:
+            rule, answer = "keyword", self._keyword_answer(text)
+            if answer is None:
+                return None
+        confidence = self.rule_confidence[rule]
+        if confidence < self.min_confidence:
+            return None
+        return answer, rule, confidence
+
+    def filter_rows(self, rows, output_path):
+        """
+        Answer what the rules can and yield only the rows that must be sent
+
+        Local answers are written to ``output_path`` as ``.jsonl.out`` records.
+
+        Args:
+            rows: Iterable of (record_id, feedback_text)
+            output_path (str): Destination of the local answers
+
+        Yields:
+            tuple: (record_id, feedback_text) for every row the rules do not answer
+        """
+        with open(output_path, "w", encoding="utf-8") as out:
+            for record_id, feedback_text in rows:
+                self.stats["rows"] += 1
+                result = self.classify(feedback_text)
+                if result is None:
+                    yield record_id, feedback_text
+                    continue
+                answer, rule, confidence = result
+                self.stats[rule] += 1
+                out.write(json.dumps({
+                    "recordId": str(record_id),
+                    "modelOutput": {"output": {"message": {"content": [{"text": answer}]}}},
+                    "preclassified": rule,
+                    "confidence": confidence
+                }, ensure_ascii=False) + "\n")
+        answered = self.stats["blank"] + self.stats["praise"] + self.stats["keyword"]
+        print(f"Pre-classified {answered} of {self.stats['rows']} feedbacks locally: {self.stats}")
+
+
+def _category_ids(answer):
+    data = json.loads(answer)
+    return set(data.get("categories", data) if "sentiment" in data else data)
+
+
+def precision_report(preclassifier, df, labels, id_column="Respondent_ID", feedback_column="Feedback",
+                     output_column="Model_Output"):
+    """
+    Compare the local answers with past LLM labels
+
+    Args:
+        preclassifier (PreClassifier): Configuration to evaluate
+        df (pd.DataFrame): Verbatims (id_column, feedback_column)
+        labels (pd.DataFrame): Past model answers (id_column, output_column), e.g.
+            ``Sentiment_Analysis_Output.parquet`` / ``Categorization_Model_Output.parquet``
+        id_column (str): Record key
+        feedback_column (str): Verbatim column
+        output_column (str): Model answer column
+
+    Returns:
+        pd.DataFrame: One row per rule plus "total": answered, share of rows (= requests saved),
+            labelled, precision (exact answer match) and, for Categorization / combined, category_precision
+            (same category IDs, sentiment ignored)
+    """
+    import pandas as pd
+
+    from akasapulse.repair import RepairError, repair_output
+
+    def canonical(text):
+        try:
+            answer = repair_output(text, preclassifier.task)
+        except (RepairError, TypeError):
+            return None
+        if preclassifier.task == "categorization":
+            return json.dumps(dict(sorted(json.loads(answer).items())))
+        if preclassifier.task == "combined":
+            answer = json.loads(answer)
+            return json.dumps({**answer, "categories": dict(sorted(answer["categories"].items()))})
+        return answer
+
+    truth = {str(record_id): canonical(text) for record_id, text in zip(labels[id_column], labels[output_column])}
+    rows = []
+    for record_id, feedback_text in zip(df[id_column].astype(str), df[feedback_column]):
+        result = preclassifier.classify(feedback_text)
+        if result is None:
+            continue
+        answer, rule, _ = result
+        label = truth.get(record_id)
+        row = {"rule": rule, "labelled": label is not None, "match": label is not None and canonical(answer) == label}
+        if preclassifier.task != "sentiment":
+            row["category_match"] = label is not None and _category_ids(answer) == _category_ids(label)
+        rows.append(row)
+
+    columns = ["rule", "labelled", "match"] + (["category_match"] if preclassifier.task != "sentiment" else [])
+    results = pd.DataFrame(rows, columns=columns)
+    report = []
+    for rule, group in [*results.groupby("rule", sort=False), ("total", results)]:
+        labelled = group[group["labelled"]]
+        entry = {
+            "rule": rule,
+            "answered": len(group),
+            "share_of_rows": round(len(group) / len(df), 4) if len(df) else 0.0,
+            "labelled": len(labelled),
+            "precision": round(labelled["match"].mean(), 4) if len(labelled) else None,
+        }
+        if preclassifier.task != "sentiment":
+            entry["category_precision"] = round(labelled["category_match"].mean(), 4) if len(labelled) else None
+        report.append(entry)
+    return pd.DataFrame(report)
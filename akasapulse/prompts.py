@@ -0,0 +1,461 @@
+"""
+Versioned prompt templates shared by the Sentiments, Categorization and
+Generalization pipelines.
+
+A template is a ``str.format`` string whose placeholders are either job-level
+(the category/sentiment mappings, identical for every record) or row-level
+(``respondent_id``, ``feedback_text``). ``PromptTemplate.compile`` renders all
+job-level placeholders once and splits the text into static segments around
+the row-level slots, so building a record is a single join instead of
+re-stringifying the mapping dicts for every row. The static segments are also
+JSON-escaped once, which lets ``encode_batch_request`` serialise a record
+without re-escaping the multi-kilobyte instruction block.
+
+Every compiled prompt carries a ``version_id`` (template name, version and a
+hash of the rendered static text) that is stored alongside the batch input so
+outputs can be traced back to the exact prompt that produced them.
+"""
+import hashlib
+import json
+from string import Formatter
+
+from akasapulse.taxonomy import (
+    SENTIMENT_ID, CATEGORY_KEYWORDS, CATEGORY_EXAMPLES, CATEGORY_ID, GENERALIZATION_CATEGORY_ID
+)
+
+ROW_FIELDS = ("respondent_id", "feedback_text")
+
+
+def _json_escape(text):
+    """JSON string-literal body for ``text`` (json.dumps without the quotes)."""
+    return json.dumps(text)[1:-1]
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token) used for budgeting requests."""
+    return (len(text) + 3) // 4
+
+
+class CompiledPrompt:
+    """
+    A prompt with every job-level field rendered, ready to fill per row
+
+    Attributes:
+        name (str): Template name
+        version_id (str): Stable identifier, e.g. ``categorization-v1-3f9c2a1b0d``
+        row_fields (tuple): Names of the per-row slots, in order of appearance
+        static_tokens (int): Estimated tokens of the invariant text
+    """
+
+    def __init__(self, name, version, segments):
+        self.name = name
+        # segments alternates literal text and ("slot", field_name) markers
+        self._segments = segments
+        self._json_segments = [
+            seg if isinstance(seg, tuple) else _json_escape(seg) for seg in segments
+        ]
+        self.row_fields = tuple(seg[1] for seg in segments if isinstance(seg, tuple))
+        self.static_tokens = estimate_tokens("".join(seg for seg in segments if isinstance(seg, str)))
+        digest = hashlib.sha256()
+        for seg in segments:
+            digest.update(("{%s}" % seg[1] if isinstance(seg, tuple) else seg).encode("utf-8"))
+        self.version_id = f"{name}-v{version}-{digest.hexdigest()[:10]}"
+
+    def render(self, **row):
+        """Return the full prompt text for one record."""
+        return "".join(
+            str(row[seg[1]]) if isinstance(seg, tuple) else seg for seg in self._segments
+        )
+
+    def render_json(self, **row):
+        """Return the prompt as an already JSON-escaped string body (no quotes)."""
+        return "".join(
+            _json_escape(str(row[seg[1]])) if isinstance(seg, tuple) else seg
+            for seg in self._json_segments
+        )
+
+
+class PromptTemplate:
+    """
+    Versioned prompt template
+
+    Args:
+        name (str): Template name used in the version ID
+        version (int): Bump whenever the wording changes
+        text (str): ``str.format`` template text
+        defaults (dict): Default values for the job-level fields
+        row_fields (tuple): Placeholders filled per record
+    """
+
+    def __init__(self, name, version, text, defaults=None, row_fields=ROW_FIELDS):
+        self.name = name
+        self.version = version
+        self.text = text
+        self.defaults = dict(defaults or {})
+        self.row_fields = tuple(row_fields)
+
+    def compile(self, **job_fields):
+        """
+        Render every job-level placeholder once
+
+        Args:
+            **job_fields: Overrides for the template defaults
+
+        Returns:
+            CompiledPrompt
+        """
+        values = {**self.defaults, **job_fields}
+        formatter = Formatter()
+        segments = []
+        for literal, field_name, format_spec, conversion in formatter.parse(self.text):
+            if literal:
+                segments.append(literal)
+            if field_name is None:
+                continue
+            if field_name in self.row_fields:
+                segments.append(("slot", field_name))
+            else:
+                value = formatter.convert_field(formatter.get_value(field_name, (), values), conversion)
+                segments.append(formatter.format_field(value, format_spec or ""))
+
+        # Merge adjacent literal pieces so rendering is one join per slot
+        merged = []
+        for seg in segments:
+            if merged and isinstance(seg, str) and isinstance(merged[-1], str):
+                merged[-1] += seg
+            else:
+                merged.append(seg)
+        return CompiledPrompt(self.name, self.version, merged)
+
+
+def encode_batch_request(record_id, prompt_json, max_tokens, temperature=0, top_p=0.1):
+    """
+    Serialise a batch request directly from a pre-escaped prompt
+
+    Produces exactly the same line as ``json.dumps(build_batch_request(...))``
+    without walking and escaping the full prompt again.
+
+    Args:
+        record_id (str): recordId value
+        prompt_json (str): Output of ``CompiledPrompt.render_json``
+        max_tokens (int): maxTokens for the inference config
+        temperature (float): Sampling temperature
+        top_p (float): Nucleus sampling parameter
+
+    Returns:
+        str: One JSONL line without the trailing newline
+    """
+    return (
+        '{"recordId": ' + json.dumps(record_id)
+        + ', "modelInput": {"messages": [{"role": "user", "content": [{"text": "' + prompt_json
+        + '"}]}], "inferenceConfig": {"maxTokens": ' + json.dumps(max_tokens)
+        + ', "temperature": ' + json.dumps(temperature)
+        + ', "topP": ' + json.dumps(top_p) + '}}}'
+    )
+
+
+SENTIMENT_PROMPT = PromptTemplate("sentiment", 1, """You are expert in analyzing the employee feedback sentiment.
+
+Your task is to classify the sentiment of the given employee feedback into one of the 3 categories: Positive, Neutral or Negative.
+
+Sentiment Analysis Guidelines:
+1. Analyze the feedback to determine the overall sentiment.
+2. Classify the sentiment as Positive, Neutral or Negative based on the tone and content of the feedback.
+3. If the feedback contains both positive and negative sentiments, always prioritize the negative sentiment.
+4. Only use the sentiments: Positive, Neutral or Negative and do not create new categories in any case.
+5. Explainations or additional text should not be present in the output. Only the sentiment classification should be returned.
+6. Ensure the output will always be in the format: Sentiment: [classification]
+
+Present your answer in this exact format:
+
+
+Respondent_ID : "{respondent_id}"
+Customer Feedback: "{feedback_text}"
+Sentiment: [classification]
+
+
+""")
+
+CATEGORIZATION_PROMPT = PromptTemplate("categorization", 1, """You are an expert text classifier specializing in employee feedback analysis. 
+Your task is to classify employee feedback into predefined categories using their assigned IDs, and determine the sentiment for each identified category.
+The sentiments which should only be used are : Positive, Neutral & Negative with respective sentiment IDs as {sentiment_id}.
+For each feedback, identify the relevant categories based on the provided keywords and from {category_keywords} and examples {category_examples}, 
+and assign the accurate category IDs from {category_id} and its appropriate sentiment id as present in {sentiment_id}.
+
+Classification Guidelines:
+1. Analyze the feedback to identify relevant categories based on the provided keywords and examples.
+2. Assign the corresponding category ID from {category_id} for each identified category.
+3. Determine the sentiment for each category and assign the appropriate sentiment ID from {sentiment_id} to that category.
+4. If any feedback does not match any category, assign 0 as the category ID and never it as empty.
+5. The feedback can belong to multiple categories and ensure to assign the correct category ID and sentiment ID for each.
+6. If the feedback doesn't match any category, assign sentiment based on the overall tone of the feedback.
+7. Only use Category IDs and Sentiment IDs from the provided mappings and do not create new ones in any case.
+8. If any feedback gives mixed sentiment for a category, choose the sentiment which is more dominant
+9. If the feedback is a generic feedback without any specific details, should be assigned 0 for category ID and sentiment ID based on the overall tone of the feedback.
+10. No duplicate category IDs should be present in the output.
+11. Explainations or additional text should not be present in the output. Only the dictionary with category IDs and sentiment IDs should be returned.
+12. Ensure the output will always in dict format with keys as category_id and values as its corresponding sentiment_id.
+13. If the feedback is suggestion based or improvement based, the sentiment should always be Neutral.
+
+Respondent_ID: {respondent_id}
+Feedback: {feedback_text}
+
+Output:
+Output should be in the following format:
+{{
+    "category_id_1": "sentiment_id_1",
+    "category_id_2": "sentiment_id_2",
+    ...
+}}
+
+""", defaults={
+    "sentiment_id": SENTIMENT_ID,
+    "category_keywords": CATEGORY_KEYWORDS,
+    "category_examples": CATEGORY_EXAMPLES,
+    "category_id": CATEGORY_ID,
+})
+
+GENERALIZATION_PROMPT = PromptTemplate("generalization", 1, """You are an expert text analyst specializing in employee feedback.
+
+Task:
+Process a batch of employee feedbacks and produce a summary of issues grouped by categories and sentiments.
+
+Input:
+- Feedbacks are provided in a dict format: {{feedback_1: {{"category_id_1": "sentiment_id_1", "category_id_2": "sentiment_id_2", ...}}, feedback_2: {{...}}, ...}}.
+- Category and sentiment mappings are given in {category_id} and {sentiment_id}.
+- Unique_Identifier: {respondent_id}
+- Input Feedbacks: {feedback_text}
+
+Instructions:
+1. Write the top 5 frequent / top most occurring positive, negative, and neutral issues for each category in short sentences which can summarize. Here the category is identified by category_id and sentiment is identified by sentiment_id.
+2. For understanding the categories, refer to the category keywords and examples provided in {category_keywords} and {category_examples}.
+3. Include issues for all sentiments: Positive (1), Negative (-1), and Neutral (0).
+4. Do not include any issues for sentiments that are not present in the input feedbacks.
+5. While writing the issues for each category, write them as short sentences summarizing the main concern or praise not full sentences and the issue should be repeatable across multiple feedbacks.
+6. In mentioning the issues, do not repeat the same issue again for all the categories. For example, if "Salary is low" is mentioned as an issue for category_id 1 (Compensation), do not mention the same issue for any other category_id.
+7. If "Salary is low" is mentioned as an issue for category_id 1 (Compensation), do not mention it again in the same category_id again and again in the same sentiment_id (positive, negative, or neutral).
+8. Different issues should be mentioned for the same category under different sentiments that means if the issue is present in positive sentiment that issue should not be mentioned in negative or neutral sentiment for the same category.
+9. While writing the issues/phrases for positive, negative, and neutral under each category, make sure that you write the things only related to that category.
+10. While writing the issues for neutral sentiment, ensure that they should be suggestions or observations that are neither positive nor negative ( this is important ).
+11. If there are no issues present for a particular sentiment in a category, then for that category only the issues for the present sentiments should be written.
+12. Rank issues by frequency of occurrence not by sentiment score.
+13. The issues must be maximum of 5 per category and sentiment and should be short phrases summarizing the main concern or praise.
+14. No additional text or explanations should be included in the output.
+15. In the Output JSON, don't mention the words "category_id" or "sentiment_id", only use the respective IDs as keys.
+16. While writing the issues/phrases for positive or neutral or negative under each category, make sure that you write the things only related to that category.
+17. If there are no positive sentiment_id is present for a particular category, then for that category mention only the sentiment issues should be written and vice versa.
+
+18. Output must be valid JSON in the following format:
+
+{{
+  "category_id_1": {{
+    "{{positive_sentiment_id}}": ["issue1", "issue2", ...],
+    "{{negative_sentiment_id}}": ["issue1", "issue2", ...],
+    "{{neutral_sentiment_id}}": ["issue1", "issue2", ...]
+  }},
+  "category_id_2": {{
+    "{{positive_sentiment_id}}": ["issue1", "issue2", ...],
+    "{{negative_sentiment_id}}": ["issue1", "issue2", ...],
+    "{{neutral_sentiment_id}}": ["issue1", "issue2", ...]
+  }}
+}}
+""", defaults={
+    "sentiment_id": SENTIMENT_ID,
+    "category_keywords": CATEGORY_KEYWORDS,
+    "category_examples": CATEGORY_EXAMPLES,
+    "category_id": GENERALIZATION_CATEGORY_ID,
+})
+# Reduce pass of map-reduce Generalization: merges the summaries of the chunks of one large Unique_ID
+GENERALIZATION_REDUCE_PROMPT = PromptTemplate("generalization-reduce", 1, """You are an expert text analyst specializing in employee feedback.
+
+Task:
+The feedbacks of one group were summarized in several parts. Merge the partial summaries into one summary of issues grouped by categories and sentiments.
+
+Input:
+- Partial summaries are provided as a JSON list: [{{"feedback_count": n, "summary": {{"category_id": {{"sentiment_id": ["issue1", "issue2", ...]}}}}}}, ...].
+- feedback_count is the number of feedbacks a partial summary was written from.
+- Category and sentiment mappings are given in {category_id} and {sentiment_id}.
+- Unique_Identifier: {respondent_id}
+- Partial Summaries: {feedback_text}
+
+Instructions:
+1. Write the top 5 most occurring positive, negative, and neutral issues for each category across all partial summaries. Here the category is identified by category_id and sentiment is identified by sentiment_id.
+2. Issues that mean the same thing in different partial summaries are one issue; merge them into one short phrase.
+3. Rank issues by how often they occur, weighting each partial summary by its feedback_count.
+4. Keep every category and sentiment that appears in the partial summaries; do not add categories or sentiments that are not present.
+5. Do not mention the same issue under more than one category, or under more than one sentiment of the same category.
+6. The issues must be maximum of 5 per category and sentiment and should be short phrases summarizing the main concern or praise.
+7. No additional text or explanations should be included in the output.
+8. In the Output JSON, don't mention the words "category_id" or "sentiment_id", only use the respective IDs as keys.
+
+9. Output must be valid JSON in the following format:
+
+{{
+  "category_id_1": {{
+    "{{positive_sentiment_id}}": ["issue1", "issue2", ...],
+    "{{negative_sentiment_id}}": ["issue1", "issue2", ...],
+    "{{neutral_sentiment_id}}": ["issue1", "issue2", ...]
+  }},
+  "category_id_2": {{
+    "{{positive_sentiment_id}}": ["issue1", "issue2", ...]
+  }}
+}}
+""", defaults={
+    "sentiment_id": SENTIMENT_ID,
+    "category_id": GENERALIZATION_CATEGORY_ID,
+})
+
+# Packed variants: several feedbacks per request, answered as a JSON map keyed by Respondent_ID
+PACKED_ROW_FIELDS = ("feedbacks",)
+
+SENTIMENT_PACKED_PROMPT = PromptTemplate("sentiment-packed", 1, """You are expert in analyzing the employee feedback sentiment.
+
+Your task is to classify the sentiment of every employee feedback given below into one of the 3 categories: Positive, Neutral or Negative.
+
+Sentiment Analysis Guidelines:
+1. Analyze each feedback on its own to determine its overall sentiment.
+2. Classify the sentiment as Positive, Neutral or Negative based on the tone and content of the feedback.
+3. If the feedback contains both positive and negative sentiments, always prioritize the negative sentiment.
+4. Only use the sentiments: Positive, Neutral or Negative and do not create new categories in any case.
+5. Explainations or additional text should not be present in the output. Only the JSON object should be returned.
+6. Return exactly one entry for every Respondent_ID given in the input; do not skip, merge or add any Respondent_ID.
+
+The feedbacks are given as a JSON object with Respondent_ID as keys and the customer feedback as values:
+{feedbacks}
+
+Present your answer in this exact format:
+{{
+    "Respondent_ID_1": "classification",
+    "Respondent_ID_2": "classification",
+    ...
+}}
+
+""", row_fields=PACKED_ROW_FIELDS)
+
+CATEGORIZATION_PACKED_PROMPT = PromptTemplate("categorization-packed", 1, """You are an expert text classifier specializing in employee feedback analysis. 
+Your task is to classify each employee feedback into predefined categories using their assigned IDs, and determine the sentiment for each identified category.
+The sentiments which should only be used are : Positive, Neutral & Negative with respective sentiment IDs as {sentiment_id}.
+For each feedback, identify the relevant categories based on the provided keywords and from {category_keywords} and examples {category_examples}, 
+and assign the accurate category IDs from {category_id} and its appropriate sentiment id as present in {sentiment_id}.
+
+Classification Guidelines:
+1. Analyze each feedback on its own to identify relevant categories based on the provided keywords and examples.
+2. Assign the corresponding category ID from {category_id} for each identified category.
+3. Determine the sentiment for each category and assign the appropriate sentiment ID from {sentiment_id} to that category.
+4. If any feedback does not match any category, assign 0 as the category ID and never it as empty.
+5. The feedback can belong to multiple categories and ensure to assign the correct category ID and sentiment ID for each.
+6. If the feedback doesn't match any category, assign sentiment based on the overall tone of the feedback.
+7. Only use Category IDs and Sentiment IDs from the provided mappings and do not create new ones in any case.
+8. If any feedback gives mixed sentiment for a category, choose the sentiment which is more dominant
+9. If the feedback is a generic feedback without any specific details, should be assigned 0 for category ID and sentiment ID based on the overall tone of the feedback.
+10. No duplicate category IDs should be present for a feedback.
+11. Explainations or additional text should not be present in the output. Only the JSON object should be returned.
+12. For every feedback, the value must be a dict with keys as category_id and values as its corresponding sentiment_id.
+13. If the feedback is suggestion based or improvement based, the sentiment should always be Neutral.
+14. Return exactly one entry for every Respondent_ID given in the input; do not skip, merge or add any Respondent_ID.
+
+The feedbacks are given as a JSON object with Respondent_ID as keys and the feedback as values:
+{feedbacks}
+
+Output:
+Output should be in the following format:
+{{
+    "Respondent_ID_1": {{"category_id_1": "sentiment_id_1", "category_id_2": "sentiment_id_2"}},
+    "Respondent_ID_2": {{"category_id_1": "sentiment_id_1"}},
+    ...
+}}
+
+""", defaults={
+    "sentiment_id": SENTIMENT_ID,
+    "category_keywords": CATEGORY_KEYWORDS,
+    "category_examples": CATEGORY_EXAMPLES,
+    "category_id": CATEGORY_ID,
+}, row_fields=PACKED_ROW_FIELDS)
+
+# Combined variants: overall sentiment and category map in one answer, so a single job
+# fills both the Sentiments and the Categorization outputs
+COMBINED_PROMPT = PromptTemplate("combined", 1, """You are an expert text classifier specializing in employee feedback analysis. 
+Your task is to determine the overall sentiment of the employee feedback, classify it into predefined categories using their assigned IDs, and determine the sentiment for each identified category.
+The sentiments which should only be used are : Positive, Neutral & Negative with respective sentiment IDs as {sentiment_id}.
+For each feedback, identify the relevant categories based on the provided keywords and from {category_keywords} and examples {category_examples}, 
+and assign the accurate category IDs from {category_id} and its appropriate sentiment id as present in {sentiment_id}.
+
+Overall Sentiment Guidelines:
+1. Classify the overall sentiment of the feedback as Positive, Neutral or Negative based on its tone and content.
+2. If the feedback contains both positive and negative sentiments, always prioritize the negative sentiment.
+3. The overall sentiment must agree with the category sentiments: it is Negative if any category is Negative.
+
+Classification Guidelines:
+1. Analyze the feedback to identify relevant categories based on the provided keywords and examples.
+2. Assign the corresponding category ID from {category_id} for each identified category.
+3. Determine the sentiment for each category and assign the appropriate sentiment ID from {sentiment_id} to that category.
+4. If any feedback does not match any category, assign 0 as the category ID and never it as empty.
+5. The feedback can belong to multiple categories and ensure to assign the correct category ID and sentiment ID for each.
+6. If the feedback doesn't match any category, assign sentiment based on the overall tone of the feedback.
+7. Only use Category IDs and Sentiment IDs from the provided mappings and do not create new ones in any case.
+8. If any feedback gives mixed sentiment for a category, choose the sentiment which is more dominant
+9. If the feedback is a generic feedback without any specific details, should be assigned 0 for category ID and sentiment ID based on the overall tone of the feedback.
+10. No duplicate category IDs should be present in the output.
+11. Explainations or additional text should not be present in the output. Only the JSON object should be returned.
+12. If the feedback is suggestion based or improvement based, the category sentiment should always be Neutral.
+
+Respondent_ID: {respondent_id}
+Feedback: {feedback_text}
+
+Output:
+Output should be in the following format:
+{{
+    "sentiment": "Positive, Neutral or Negative",
+    "categories": {{"category_id_1": "sentiment_id_1", "category_id_2": "sentiment_id_2"}}
+}}
+
+""", defaults={
+    "sentiment_id": SENTIMENT_ID,
+    "category_keywords": CATEGORY_KEYWORDS,
+    "category_examples": CATEGORY_EXAMPLES,
+    "category_id": CATEGORY_ID,
+})
+
+COMBINED_PACKED_PROMPT = PromptTemplate("combined-packed", 1, """You are an expert text classifier specializing in employee feedback analysis. 
+Your task is to determine the overall sentiment of each employee feedback, classify it into predefined categories using their assigned IDs, and determine the sentiment for each identified category.
+The sentiments which should only be used are : Positive, Neutral & Negative with respective sentiment IDs as {sentiment_id}.
+For each feedback, identify the relevant categories based on the provided keywords and from {category_keywords} and examples {category_examples}, 
+and assign the accurate category IDs from {category_id} and its appropriate sentiment id as present in {sentiment_id}.
+
+Overall Sentiment Guidelines:
+1. Classify the overall sentiment of each feedback as Positive, Neutral or Negative based on its tone and content.
+2. If the feedback contains both positive and negative sentiments, always prioritize the negative sentiment.
+3. The overall sentiment must agree with the category sentiments: it is Negative if any category is Negative.
+
+Classification Guidelines:
+1. Analyze each feedback on its own to identify relevant categories based on the provided keywords and examples.
+2. Assign the corresponding category ID from {category_id} for each identified category.
+3. Determine the sentiment for each category and assign the appropriate sentiment ID from {sentiment_id} to that category.
+4. If any feedback does not match any category, assign 0 as the category ID and never it as empty.
+5. The feedback can belong to multiple categories and ensure to assign the correct category ID and sentiment ID for each.
+6. If the feedback doesn't match any category, assign sentiment based on the overall tone of the feedback.
+7. Only use Category IDs and Sentiment IDs from the provided mappings and do not create new ones in any case.
+8. If any feedback gives mixed sentiment for a category, choose the sentiment which is more dominant
+9. If the feedback is a generic feedback without any specific details, should be assigned 0 for category ID and sentiment ID based on the overall tone of the feedback.
+10. No duplicate category IDs should be present for a feedback.
+11. Explainations or additional text should not be present in the output. Only the JSON object should be returned.
+12. If the feedback is suggestion based or improvement based, the category sentiment should always be Neutral.
+13. Return exactly one entry for every Respondent_ID given in the input; do not skip, merge or add any Respondent_ID.
+
+The feedbacks are given as a JSON object with Respondent_ID as keys and the feedback as values:
+{feedbacks}
+
+Output:
+Output should be in the following format:
+{{
+    "Respondent_ID_1": {{"sentiment": "Negative", "categories": {{"category_id_1": "sentiment_id_1", "category_id_2": "sentiment_id_2"}}}},
+    "Respondent_ID_2": {{"sentiment": "Positive", "categories": {{"category_id_1": "sentiment_id_1"}}}},
+    ...
+}}
+
+""", defaults={
+    "sentiment_id": SENTIMENT_ID,
+    "category_keywords": CATEGORY_KEYWORDS,
+    "category_examples": CATEGORY_EXAMPLES,
+    "category_id": CATEGORY_ID,
+}, row_fields=PACKED_ROW_FIELDS)
@@ -0,0 +1,351 @@
+"""
+Repair model outputs automatically and queue only what still fails.
+
+Answers wrapped in ```json fences, followed by prose, with trailing commas,
+single quotes or repeated keys used to be fixed by hand in Excel.
+``repair_output`` does it in code:
+
+1. strip code fences and take the first balanced ``{...}`` object;
+2. parse it leniently (duplicate keys are merged; trailing commas, smart
+   quotes and Python-literal dicts are accepted);
+3. validate every category and sentiment ID against ``akasapulse.taxonomy``
+   and return the answer in canonical form.
+
+Combined answers (``{"sentiment": ..., "categories": {...}}``) are checked
+the same way on both parts.
+
+Records that still fail go to the retry queue. ``write_retry_batch`` copies
+only their lines out of the original batch-input files into a small
+follow-up input file with its own manifest, so re-running a month costs only
+the failures. ``merge_retry_results`` folds the retried answers back into the
+previous run's output.
+"""
+import ast
+import json
+import logging
+import os
+import re
+from datetime import datetime
+
+from akasapulse.batch_io import record_id_of, write_input_manifest, read_input_manifest
+from akasapulse.taxonomy import SENTIMENT_ID, CATEGORY_ID, GENERALIZATION_CATEGORY_ID
+
+logger = logging.getLogger(__name__)
+
+# Categorization uses 0 for "no matching category"
+CATEGORIZATION_CATEGORY_IDS = frozenset({0, *CATEGORY_ID.values()})
+GENERALIZATION_CATEGORY_IDS = frozenset(GENERALIZATION_CATEGORY_ID.values())
+SENTIMENT_IDS = frozenset(SENTIMENT_ID.values())
+_SENTIMENT_BY_NAME = {name.lower(): sentiment_id for name, sentiment_id in SENTIMENT_ID.items()}
+_SENTIMENT_NAME = {name.lower(): name for name in SENTIMENT_ID}
+
+_FENCE_RE = re.compile(r"```[A-Za-z]*")
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+_SENTIMENT_RE = re.compile(r"sentiment\W*(positive|neutral|negative)\b", re.IGNORECASE)
+_LABEL_RE = re.compile(r"^\W*(positive|neutral|negative)\W*$", re.IGNORECASE)
+
+
+class RepairError(ValueError):
+    """Raised when an output cannot be turned into a valid answer."""
+
+
+def extract_json_object(text):
+    """
+    First balanced ``{...}`` object in ``text`` (code fences removed), or None
+
+    Braces inside JSON strings are ignored, so prose before or after the object
+    and a second object are both tolerated.
+    """
+    if not isinstance(text, str):
+        return None
+    text = _FENCE_RE.sub("", text)
+    start = text.find("{")
+    if start == -1:
+        return None
+    depth = 0
+    quote = None
+    escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if quote:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == quote:
+                quote = None
+        elif ch in "\"'":
+            quote = ch
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+
+def _merge_pairs(pairs):
+    """object_pairs_hook: a repeated key extends lists / merges dicts instead of overwriting."""
+    merged = {}
+    for key, value in pairs:
+        previous = merged.get(key)
+        if isinstance(previous, list) and isinstance(value, list):
+            merged[key] = previous + value
+        elif isinstance(previous, dict) and isinstance(value, dict):
+            merged[key] = _merge_pairs(list(previous.items()) + list(value.items()))
+        else:
+            merged[key] = value
+    return merged
+
+
+def loads_lenient(fragment):
+    """
+    Parse a JSON object with the usual model slips tolerated
+
+    Raises:
+        RepairError: If no reading of ``fragment`` gives a dict
+    """
+    if fragment is None:
+        raise RepairError("No JSON object found")
+    candidates = [fragment]
+    fixed = _TRAILING_COMMA_RE.sub(r"\1", fragment.translate(_SMART_QUOTES))
+    if fixed != fragment:
+        candidates.append(fixed)
+    for candidate in candidates:
+        try:
+            data = json.loads(candidate, object_pairs_hook=_merge_pairs)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(data, dict):
+            return data
+    try:
+        # Python-literal dicts (single quotes), e.g. str(dict) pasted back from Excel
+        data = ast.literal_eval(fixed)
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        raise RepairError("Invalid JSON object") from None
+    if not isinstance(data, dict):
+        raise RepairError("Answer is not a JSON object")
+    return data
+
+
+def _to_id(value, allowed, kind):
+    try:
+        number = int(str(value).strip())
+    except ValueError:
+        raise RepairError(f"Invalid {kind} {value!r}") from None
+    if number not in allowed:
+        raise RepairError(f"Unknown {kind} {number}")
+    return number
+
+
+def _sentiment_id(value):
+    if isinstance(value, str) and value.strip().lower() in _SENTIMENT_BY_NAME:
+        return _SENTIMENT_BY_NAME[value.strip().lower()]
+    return _to_id(value, SENTIMENT_IDS, "sentiment ID")
+
+
+def validate_categorization(data):
+    """``{category_id: sentiment_id}`` with known IDs, as ``{"3": "-1", ...}``."""
+    if not data:
+        raise RepairError("Empty answer")
+    answer = {}
+    for category_id, sentiment_id in data.items():
+        category_id = _to_id(category_id, CATEGORIZATION_CATEGORY_IDS, "category ID")
+        answer[str(category_id)] = str(_sentiment_id(sentiment_id))
+    return answer
+
+
+def validate_generalization(data):
+    """``{category_id: {sentiment_id: [issues]}}`` with known IDs and string issues."""
+    answer = {}
+    for category_id, sentiments in data.items():
+        category_id = str(_to_id(category_id, GENERALIZATION_CATEGORY_IDS, "category ID"))
+        if not isinstance(sentiments, dict):
+            raise RepairError(f"Category {category_id} is not a JSON object")
+        category = answer.setdefault(category_id, {})
+        for sentiment_id, issues in sentiments.items():
+            sentiment_id = str(_sentiment_id(sentiment_id))
+            if isinstance(issues, str):
+                issues = [issues]
+            if not isinstance(issues, list) or not all(isinstance(issue, str) for issue in issues):
+                raise RepairError(f"Issues of category {category_id} are not a list of strings")
+            category.setdefault(sentiment_id, []).extend(issue.strip() for issue in issues if issue.strip())
+    return answer
+
+
+def validate_combined(data):
+    """``{"sentiment": <label>, "categories": {category_id: sentiment_id}}`` with known labels and IDs."""
+    fields = {str(key).strip().lower(): value for key, value in data.items()}
+    if "sentiment" not in fields:
+        raise RepairError("No overall sentiment")
+    categories = fields.get("categories", fields.get("category"))
+    if not isinstance(categories, dict):
+        raise RepairError("No category map")
+    sentiment_id = _sentiment_id(fields["sentiment"])
+    name = next(label for label, value in SENTIMENT_ID.items() if value == sentiment_id)
+    return {"sentiment": name, "categories": validate_categorization(categories)}
+
+
+def repair_sentiment(text):
+    """``Sentiment: <label>`` from a sentiment answer, tolerating casing and extra text."""
+    if not isinstance(text, str):
+        raise RepairError("Empty answer")
+    match = _SENTIMENT_RE.search(text) or _LABEL_RE.match(text)
+    if not match:
+        raise RepairError("No sentiment label found")
+    return f"Sentiment: {_SENTIMENT_NAME[match.group(1).lower()]}"
+
+
+_JSON_VALIDATORS = {
+    "categorization": validate_categorization,
+    "generalization": validate_generalization,
+    "combined": validate_combined,
+}
+
+
+def repair_output(text, task):
+    """
+    Canonical answer text for one model output
+
+    Args:
+        text (str): Raw Model_Output
+        task (str): "sentiment", "categorization", "generalization" or "combined"
+
+    Returns:
+        str: ``Sentiment: <label>`` or the validated answer as JSON
+
+    Raises:
+        RepairError: If the output cannot be repaired
+    """
+    if task == "sentiment":
+        return repair_sentiment(text)
+    fragment = extract_json_object(text)
+    if fragment is None and isinstance(text, str) and "{" in text:
+        raise RepairError("Unbalanced JSON object (truncated output?)")
+    data = loads_lenient(fragment)
+    return json.dumps(_JSON_VALIDATORS[task](data), ensure_ascii=False)
+
+
+def repair_outputs(df, task, id_column="Respondent_ID", output_column="Model_Output"):
+    """
+    Repair every output of an extracted job
+
+    Args:
+        df (pd.DataFrame): Extracted outputs
+        task (str): "sentiment", "categorization", "generalization" or "combined"
+        id_column (str): recordId column
+        output_column (str): Raw answer column
+
+    Returns:
+        tuple: (DataFrame of repaired rows with ``output_column`` in canonical form,
+                DataFrame of failures with ``id_column`` / Raw_Output / Error)
+    """
+    import pandas as pd
+
+    repaired, failures, keep = [], [], []
+    for position, (record_id, text) in enumerate(zip(df[id_column].tolist(), df[output_column].tolist())):
+        try:
+            repaired.append(repair_output(text, task))
+            keep.append(position)
+        except RepairError as e:
+            failures.append({id_column: record_id, "Raw_Output": text, "Error": str(e)})
+
+    result = df.iloc[keep].copy()
+    result[output_column] = repaired
+    failed = pd.DataFrame(failures, columns=[id_column, "Raw_Output", "Error"])
+    logger.info("Repaired %d outputs, %d still failing", len(result), len(failed))
+    return result.reset_index(drop=True), failed
+
+
+def _input_files(manifest_file, manifest):
+    directory = os.path.dirname(manifest_file)
+    entries = manifest.get("shards") or [{"file": manifest["input_file"]}]
+    return [os.path.join(directory, entry["file"]) for entry in entries]
+
+
+def write_retry_batch(manifest_file, record_ids, output_path=None):
+    """
+    Build a follow-up batch-input file holding only the failed records
+
+    The lines are copied verbatim from the original input files listed in the
+    manifest (keep them with ``cleanup_files=False``), so the retry uses the
+    same prompt version. A manifest is written next to the file; point the
+    extraction script's ``manifest_file`` at it after the retry job.
+
+    Args:
+        manifest_file (str): Manifest of the original job
+        record_ids: recordIds to resubmit
+        output_path (str): Destination (defaults to ``<input>-retry-<timestamp>.jsonl``
+            next to the manifest)
+
+    Returns:
+        tuple: (retry manifest path or None if no line matched,
+                list of recordIds not found in the original input files)
+    """
+    manifest = read_input_manifest(manifest_file)
+    wanted = {str(record_id) for record_id in record_ids}
+    if output_path is None:
+        stem = manifest["input_file"][:-len(".jsonl")] if manifest["input_file"].endswith(".jsonl") else manifest["input_file"]
+        output_path = os.path.join(
+            os.path.dirname(manifest_file), f"{stem}-retry-{datetime.now().strftime('%Y%m%d-%H%M%S')}.jsonl"
+        )
+
+    found = []
+    size = 0
+    with open(output_path, "w", encoding="utf-8") as out:
+        for input_file in _input_files(manifest_file, manifest):
+            if not os.path.exists(input_file):
+                logger.warning("Original input %s not found; its records cannot be retried from file", input_file)
+                continue
+            with open(input_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    record_id = str(record_id_of(line.rstrip("\n")))
+                    if record_id in wanted:
+                        out.write(line)
+                        size += len(line.encode("utf-8"))
+                        found.append(record_id)
+                        wanted.discard(record_id)
+
+    not_found = sorted(wanted)
+    if not found:
+        os.remove(output_path)
+        return None, not_found
+
+    metadata = {
+        "task": manifest.get("task"),
+        "prompt_version": manifest.get("prompt_version"),
+        "retry_of": os.path.basename(manifest_file),
+        "records": len(found),
+        "shards": [{"file": os.path.basename(output_path), "records": len(found), "bytes": size, "record_ids": found}],
+    }
+    clusters = manifest.get("clusters")
+    if clusters:
+        metadata["clusters"] = {rid: clusters[rid] for rid in found if rid in clusters}
+    partials = manifest.get("partials")
+    if partials:
+        # Map-reduce Generalization: retried chunk answers still go to the reduce pass
+        metadata["partials"] = {rid: partials[rid] for rid in found if rid in partials}
+    retry_manifest = write_input_manifest(output_path, **metadata)
+    print(f"Retry batch with {len(found)} records written to {output_path}")
+    return retry_manifest, not_found
+
+
+def merge_retry_results(previous_df, retry_df, id_column="Respondent_ID"):
+    """
+    Previous output with the retried records replaced by their new answers
+
+    Args:
+        previous_df (pd.DataFrame): Output of the earlier run
+        retry_df (pd.DataFrame): Output of the retry run (same columns)
+        id_column (str): recordId column
+
+    Returns:
+        pd.DataFrame: Combined output
+    """
+    import pandas as pd
+
+    retried = set(retry_df[id_column].astype(str))
+    kept = previous_df[~previous_df[id_column].astype(str).isin(retried)]
+    return pd.concat([kept, retry_df], ignore_index=True)
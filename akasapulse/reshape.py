@@ -0,0 +1,237 @@
+"""
+Wide-to-long reshapes of the extracted model outputs.
+
+Both extraction stages turn one answer per respondent into several rows:
+
+- Categorization: ``{"3": "Positive", "7": "Negative"}`` -> one
+  (Respondent_ID, Category_ID, Sentiment) row per category.
+- Generalization: ``{"3": {"1": [...], "-1": [...], "0": [...]}}`` -> for
+  every Unique_ID and each of the 14 categories, as many rows as its longest
+  issue list (at least one), with the positive / negative / neutral issues
+  side by side and padded with None.
+
+``split_combined`` turns the answers of the combined Sentiment +
+Categorization prompt into the two single-task outputs.
+
+The outputs are parsed in one pass over the column and the rows are laid out
+with numpy (repeat / cumulative offsets), so no per-row DataFrame access is
+needed. The schemas match the previous ``iterrows`` implementations.
+"""
+import ast
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+NUM_CATEGORIES = 14
+
+# Sentiment key in the Generalization answer -> output column
+ISSUE_COLUMNS = {"1": "Positive_Issues", "-1": "Negative_Issues", "0": "Neutral_Issues"}
+
+
+def parse_outputs(values, literal_fallback=False):
+    """
+    Parse a column of model outputs
+
+    Args:
+        values (list): JSON strings (already-parsed dicts are passed through)
+        literal_fallback (bool): Also accept Python literals (``str(dict)``, as
+            stored by an Excel round-trip) when JSON parsing fails
+
+    Returns:
+        tuple: (list of parsed values, with None where parsing failed,
+                dict of position -> error message)
+    """
+    loads = json.loads
+    parsed = [None] * len(values)
+    errors = {}
+    for i, value in enumerate(values):
+        if isinstance(value, dict):
+            parsed[i] = value
+            continue
+        try:
+            parsed[i] = loads(value)
+        except Exception as e:
+            if literal_fallback and isinstance(value, str):
+                try:
+                    parsed[i] = ast.literal_eval(value)
+                    continue
+                except Exception:
+                    pass
+            errors[i] = str(e)
+    return parsed, errors
+
+
+def _not_a_dict(value):
+    return f"'{type(value).__name__}' object has no attribute 'items'"
+
+
+def expand_categorization(df, id_column="Respondent_ID", output_column="Model_Output"):
+    """
+    One row per (Respondent_ID, Category_ID) from ``{category_id: sentiment}`` answers
+
+    Args:
+        df (pd.DataFrame): Extracted outputs
+        id_column (str): Respondent column
+        output_column (str): JSON answer column
+
+    Returns:
+        tuple: (final_df with Respondent_ID / Category_ID / Sentiment,
+                error_df with Respondent_ID / Raw_Data / Error)
+    """
+    ids = df[id_column].reset_index(drop=True)
+    raw = df[output_column].tolist()
+    parsed, errors = parse_outputs(raw)
+    for i, value in enumerate(parsed):
+        if i not in errors and not isinstance(value, dict):
+            errors[i] = _not_a_dict(value)
+
+    valid = np.array([i not in errors for i in range(len(parsed))], dtype=bool)
+    dicts = [parsed[i] for i in np.flatnonzero(valid)]
+    lengths = np.fromiter((len(d) for d in dicts), dtype=np.int64, count=len(dicts))
+    keys = [k for d in dicts for k in d]
+    sentiments = [v for d in dicts for v in d.values()]
+    row_ids = ids[valid].repeat(lengths).reset_index(drop=True)
+
+    try:
+        category_ids = list(map(int, keys))
+    except (TypeError, ValueError):
+        # Slow path: keep the categories converted before the bad key, report the rest of the row
+        category_ids, keep = [], []
+        position = 0
+        for i, d in zip(np.flatnonzero(valid), dicts):
+            for offset, key in enumerate(d):
+                try:
+                    category_ids.append(int(key))
+                    keep.append(position + offset)
+                except (TypeError, ValueError) as e:
+                    errors[i] = str(e)
+                    break
+            position += len(d)
+        row_ids = row_ids.iloc[keep].reset_index(drop=True)
+        sentiments = [sentiments[j] for j in keep]
+
+    final_df = pd.DataFrame({
+        id_column: row_ids,
+        "Category_ID": np.asarray(category_ids, dtype=np.int64),
+        "Sentiment": sentiments
+    })
+    error_df = pd.DataFrame(
+        [{id_column: ids.iloc[i], "Raw_Data": raw[i], "Error": errors[i]} for i in sorted(errors)]
+    )
+    return final_df, error_df
+
+
+def split_combined(df, id_column="Respondent_ID", output_column="Model_Output"):
+    """
+    Sentiments and Categorization outputs from repaired combined answers
+
+    Args:
+        df (pd.DataFrame): Repaired combined outputs (``{"sentiment": ..., "categories": {...}}``)
+        id_column (str): Respondent column
+        output_column (str): Answer column
+
+    Returns:
+        tuple: (sentiment_df with ``Sentiment: <label>`` answers, categorization_df with
+                ``{category_id: sentiment_id}`` answers, number of answers whose overall
+                sentiment disagrees with the category sentiments), both in the shape of
+                the single-task outputs and with every other column of ``df``
+    """
+    parsed, errors = parse_outputs(df[output_column].tolist())
+    if errors:
+        raise ValueError(f"{len(errors)} combined answers are not valid JSON; repair them first")
+    sentiment_df = df.copy()
+    sentiment_df[output_column] = [f"Sentiment: {answer['sentiment']}" for answer in parsed]
+    categorization_df = df.copy()
+    categorization_df[output_column] = [json.dumps(answer["categories"]) for answer in parsed]
+
+    # Negative wins, as in both prompts; only counted, the model's overall label is kept
+    inconsistent = 0
+    for answer in parsed:
+        sentiment_ids = set(answer["categories"].values())
+        expected = "Negative" if "-1" in sentiment_ids else "Positive" if sentiment_ids == {"1"} else None
+        if expected is not None and answer["sentiment"] != expected:
+            inconsistent += 1
+    return sentiment_df.reset_index(drop=True), categorization_df.reset_index(drop=True), inconsistent
+
+
+def expand_generalization(df, id_column="Unique_ID", output_column="Model_Output", num_categories=NUM_CATEGORIES):
+    """
+    Padded (Unique_ID, Category_ID, Positive/Negative/Neutral_Issues) rows for every category
+
+    Args:
+        df (pd.DataFrame): Outputs as dicts or as JSON / ``str(dict)`` strings
+        id_column (str): Unique_ID column
+        output_column (str): Answer column ``{category_id: {sentiment: [issues]}}``
+        num_categories (int): Categories 1..num_categories always get at least one row
+
+    Returns:
+        tuple: (final_df, error_df with Unique_ID / Raw_Data / Error for unreadable answers)
+    """
+    ids = df[id_column].reset_index(drop=True)
+    raw = df[output_column].tolist()
+    parsed, errors = parse_outputs(raw, literal_fallback=True)
+
+    columns = list(ISSUE_COLUMNS.values())
+    column_of = {sentiment: j for j, sentiment in enumerate(ISSUE_COLUMNS)}
+    counts, issues, valid = [], [], []
+    for i, output in enumerate(parsed):
+        if i in errors:
+            continue
+        if not isinstance(output, dict):
+            errors[i] = _not_a_dict(output)
+            continue
+        try:
+            # A repeated category (e.g. "1" and "01") keeps its last answer
+            category_map = {int(category_id): sentiments for category_id, sentiments in output.items()}
+        except (TypeError, ValueError) as e:
+            errors[i] = str(e)
+            continue
+        record = len(valid)
+        valid.append(i)
+        for category_id, sentiments in category_map.items():
+            if not 1 <= category_id <= num_categories or not isinstance(sentiments, dict):
+                continue
+            for sentiment, sentiment_issues in sentiments.items():
+                column = column_of.get(sentiment)
+                if column is None:
+                    continue
+                sentiment_issues = list(sentiment_issues)
+                counts.append((record, category_id - 1, column, len(sentiment_issues)))
+                issues.extend(sentiment_issues)
+
+    lengths = np.zeros((len(valid), num_categories, len(columns)), dtype=np.int64)
+    segments = np.array(counts, dtype=np.int64).reshape(-1, 4)
+    segment_record, segment_category, segment_column, segment_lengths = segments.T
+    lengths[segment_record, segment_category, segment_column] = segment_lengths
+
+    # Each (record, category) block is as long as its longest issue list, and at least one row
+    block_rows = np.maximum(lengths.max(axis=2), 1)
+    block_start = (np.cumsum(block_rows.ravel()) - block_rows.ravel()).reshape(block_rows.shape)
+    total = int(block_rows.sum())
+
+    output_columns = {c: np.full(total, None, dtype=object) for c in columns}
+    # Position of every issue inside its block: 0..length-1 per (record, category, sentiment)
+    offsets = np.arange(len(issues)) - np.repeat(np.cumsum(segment_lengths) - segment_lengths, segment_lengths)
+    targets = np.repeat(block_start[segment_record, segment_category], segment_lengths) + offsets
+    issue_array = np.empty(len(issues), dtype=object)
+    issue_array[:] = issues
+    issue_column = np.repeat(segment_column, segment_lengths)
+    for j, column in enumerate(columns):
+        mask = issue_column == j
+        output_columns[column][targets[mask]] = issue_array[mask]
+
+    final_df = pd.DataFrame({
+        id_column: ids.iloc[valid].repeat(block_rows.sum(axis=1)).reset_index(drop=True),
+        "Category_ID": np.repeat(np.tile(np.arange(1, num_categories + 1), len(valid)), block_rows.ravel()),
+        **output_columns
+    })
+    error_df = pd.DataFrame(
+        [{id_column: ids.iloc[i], "Raw_Data": raw[i], "Error": errors[i]} for i in sorted(errors)]
+    )
+    if errors:
+        logger.warning("%d Generalization answers could not be reshaped", len(errors))
+    return final_df, error_df
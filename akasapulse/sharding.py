@@ -0,0 +1,189 @@
+"""
+Split a batch-request stream into size- and count-bounded JSONL shards.
+
+Bedrock batch inference caps each input file by record count and by bytes.
+``write_shards`` rolls over to a new file whenever the next record would
+break either limit, and ``upload_shards`` pushes the shards concurrently
+through a thread pool that shares a single (thread-safe) S3 client.
+
+The shard manifest records which recordIds went into which shard, so the
+extraction scripts can locate every ``<shard>.jsonl.out`` and report records
+that never came back.
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from akasapulse.batch_io import (
+    encode_line, record_id_of, write_input_manifest, read_input_manifest
+)
+
+logger = logging.getLogger(__name__)
+
+# Bedrock batch inference quotas (per input file); both can be overridden per call
+DEFAULT_MAX_RECORDS = 50_000
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+
+def shard_filename(base_name, index):
+    """``feedback-input-...-part-0001.jsonl`` for shard ``index`` (1-based)."""
+    stem = base_name[:-len(".jsonl")] if base_name.endswith(".jsonl") else base_name
+    return f"{stem}-part-{index:04d}.jsonl"
+
+
+def write_shards(requests, output_dir, base_name, max_records=DEFAULT_MAX_RECORDS, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Stream batch requests into as many shard files as the limits require
+
+    Args:
+        requests: Iterable of batch request dicts or serialised lines
+        output_dir (str): Directory for the shard files
+        base_name (str): Base filename, e.g. ``feedback-input-<ts>-<id>.jsonl``
+        max_records (int): Maximum records per shard
+        max_bytes (int): Maximum bytes per shard
+
+    Returns:
+        list: One dict per shard with ``file``, ``path``, ``records``, ``bytes`` and ``record_ids``
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    shards = []
+    f = None
+    current = None
+
+    def _open_next():
+        path = os.path.join(output_dir, shard_filename(base_name, len(shards) + 1))
+        shard = {"file": os.path.basename(path), "path": path, "records": 0, "bytes": 0, "record_ids": []}
+        shards.append(shard)
+        return open(path, "wb"), shard
+
+    try:
+        for request in requests:
+            line = encode_line(request)
+            if len(line) > max_bytes:
+                raise ValueError(f"Record {record_id_of(request)} is larger than max_bytes ({max_bytes})")
+            if current is None or current["records"] >= max_records or current["bytes"] + len(line) > max_bytes:
+                if f is not None:
+                    f.close()
+                f, current = _open_next()
+            f.write(line)
+            current["records"] += 1
+            current["bytes"] += len(line)
+            current["record_ids"].append(record_id_of(request))
+    finally:
+        if f is not None:
+            f.close()
+
+    logger.info("Wrote %d records into %d shard(s)", sum(s["records"] for s in shards), len(shards))
+    return shards
+
+
+def write_shard_manifest(output_dir, base_name, shards, **metadata):
+    """
+    Write the shard manifest next to the shards
+
+    Args:
+        output_dir (str): Directory holding the shards
+        base_name (str): Base filename used for the shards
+        shards (list): Output of ``write_shards``
+        **metadata: Extra job metadata (task, prompt_version, ...)
+
+    Returns:
+        str: Manifest path
+    """
+    entries = [{k: v for k, v in shard.items() if k != "path"} for shard in shards]
+    return write_input_manifest(
+        os.path.join(output_dir, base_name),
+        records=sum(shard["records"] for shard in shards),
+        shards=entries,
+        **metadata
+    )
+
+
+def upload_shards(shard_paths, s3_client, bucket_name, s3_prefix, max_workers=8):
+    """
+    Upload shard files concurrently, reusing one S3 client
+
+    Args:
+        shard_paths (list): Local shard paths
+        s3_client: S3 client (boto3 clients are thread-safe)
+        bucket_name (str): S3 bucket name
+        s3_prefix (str): Key prefix, e.g. ``temp-batch-inference``
+        max_workers (int): Concurrent uploads
+
+    Returns:
+        list: S3 URIs in shard order, or None if any upload failed
+    """
+    from boto3.exceptions import S3UploadFailedError
+    from botocore.exceptions import BotoCoreError, ClientError
+
+    def _upload(path):
+        s3_key = f"{s3_prefix}/{os.path.basename(path)}"
+        s3_client.upload_file(path, bucket_name, s3_key)
+        return f"s3://{bucket_name}/{s3_key}"
+
+    uris = [None] * len(shard_paths)
+    failed = False
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_upload, path): i for i, path in enumerate(shard_paths)}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                uris[i] = future.result()
+                print(f"File uploaded to: {uris[i]}")
+            except (ClientError, BotoCoreError, S3UploadFailedError) as e:
+                failed = True
+                print(f"Error uploading {shard_paths[i]} to S3: {e}")
+    return None if failed else uris
+
+
+def shard_output_paths(manifest_file, output_dir=None):
+    """
+    Locate the ``.jsonl.out`` file Bedrock produced for each shard
+
+    Args:
+        manifest_file (str): Shard manifest path
+        output_dir (str): Directory holding the downloaded outputs
+            (defaults to the manifest's directory)
+
+    Returns:
+        tuple: (list of existing output paths, list of shard files with no output).
+            The cached and pre-classified answer files, if any, are included in the output paths.
+    """
+    manifest = read_input_manifest(manifest_file)
+    output_dir = output_dir or os.path.dirname(manifest_file)
+    found, missing = [], []
+    for shard in manifest.get("shards", [{"file": manifest["input_file"]}]):
+        path = os.path.join(output_dir, f"{shard['file']}.out")
+        if os.path.exists(path):
+            found.append(path)
+        else:
+            missing.append(shard["file"])
+
+    # Answers served from the result cache or the local pre-classifier never went through Bedrock
+    for key in ("cached_output", "preclassified_output"):
+        if manifest.get(key):
+            path = os.path.join(os.path.dirname(manifest_file), manifest[key])
+            if os.path.exists(path):
+                found.append(path)
+    return found, missing
+
+
+def missing_records(manifest_file, returned_ids):
+    """
+    Record IDs that were submitted but are absent from the extracted output
+
+    Args:
+        manifest_file (str): Shard manifest path
+        returned_ids: Iterable of recordIds seen in the outputs
+
+    Returns:
+        list: Missing recordIds in submission order
+    """
+    manifest = read_input_manifest(manifest_file)
+    returned = {str(record_id) for record_id in returned_ids}
+    return [
+        record_id
+        for shard in manifest.get("shards", [])
+        for record_id in shard["record_ids"]
+        if record_id not in returned
+    ]
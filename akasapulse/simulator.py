@@ -0,0 +1,215 @@
+"""
+Local stand-in for Bedrock batch inference.
+
+``simulate_job`` reads the batch-input shards listed in a manifest and writes
+``<shard>.jsonl.out`` next to each one, in the shape Bedrock produces
+(``modelOutput.output.message.content[0].text`` plus ``stopReason`` and
+``usage``), so the extraction scripts and benchmarks run without AWS.
+
+Answers come from ``SimulatedModel``:
+
+* deterministic: the answer for a recordId depends only on the recordId,
+  the task and ``seed``;
+* task-aware: ``Sentiment: <label>`` for sentiment, ``{category: sentiment}``
+  for categorization, ``{category: {sentiment: [issues]}}`` for
+  generalization, ``{"sentiment": <label>, "categories": {...}}`` (consistent
+  with each other) for combined, and a map keyed by Respondent_ID for packed
+  requests;
+* ``malformed_rate`` of the records come back broken in one of
+  ``MALFORMED_KINDS`` (fenced, chatty, trailing comma, truncated, or a
+  record-level error with no ``modelOutput``);
+* ``latency`` seconds are spent per request.
+
+``akasapulse.fakes.FakeBedrockClient(..., model=SimulatedModel(...))`` uses the
+same model behind the batch API.
+"""
+import json
+import logging
+import os
+import random
+import time
+
+from akasapulse.batch_io import read_input_manifest
+from akasapulse.taxonomy import CATEGORY_ID, GENERALIZATION_CATEGORY_ID, SENTIMENT_ID
+
+logger = logging.getLogger(__name__)
+
+TASKS = ("sentiment", "categorization", "generalization", "combined")
+# The first three are repaired by akasapulse.repair, the last two end up re-queued
+MALFORMED_KINDS = ("fenced", "prose", "trailing_comma", "truncated", "error")
+
+_SENTIMENTS = list(SENTIMENT_ID)
+_ISSUES = ["delayed boarding", "seat comfort", "friendly crew", "meal quality", "baggage wait",
+           "refund process", "app check-in", "legroom", "on-time arrival", "cabin cleanliness"]
+
+
+def output_record(request, text, stop_reason="end_turn", error=None):
+    """
+    One ``.jsonl.out`` line (as a dict) for a batch request
+
+    Args:
+        request (dict): Parsed batch-input line
+        text (str): Answer text (ignored when ``error`` is set)
+        stop_reason (str): ``end_turn`` or ``max_tokens``
+        error (str): Record-level error message; the line then has no ``modelOutput``
+    """
+    record = {"recordId": request["recordId"], "modelInput": request["modelInput"]}
+    if error:
+        record["error"] = {"errorCode": 400, "errorMessage": error}
+        return record
+    input_text = request["modelInput"]["messages"][0]["content"][0]["text"]
+    record["modelOutput"] = {
+        "output": {"message": {"role": "assistant", "content": [{"text": text}]}},
+        "stopReason": stop_reason,
+        "usage": {
+            "inputTokens": len(input_text) // 4,
+            "outputTokens": max(len(text) // 4, 1),
+            "totalTokens": len(input_text) // 4 + max(len(text) // 4, 1),
+        },
+    }
+    return record
+
+
+class SimulatedModel:
+    """
+    Deterministic fake model for one task
+
+    Args:
+        task (str): "sentiment", "categorization", "generalization" or "combined"
+        packs (dict): Pack recordId -> Respondent_IDs (manifest ``packs``) for packed jobs
+        seed (int): Changes every answer
+        malformed_rate (float): Share of records answered with a malformed output (0-1)
+        malformed_kinds (tuple): Kinds drawn from when an output is malformed
+        latency (float): Seconds spent per request
+    """
+
+    def __init__(self, task, packs=None, seed=0, malformed_rate=0.0, malformed_kinds=MALFORMED_KINDS, latency=0.0):
+        if task not in TASKS:
+            raise ValueError(f"Unknown task {task!r}, expected one of {TASKS}")
+        self.task = task
+        self.packs = packs or {}
+        self.seed = seed
+        self.malformed_rate = malformed_rate
+        self.malformed_kinds = tuple(malformed_kinds)
+        self.latency = latency
+
+    def _rng(self, record_id):
+        return random.Random(f"{self.seed}:{self.task}:{record_id}")
+
+    def _single_answer(self, rng):
+        if self.task == "sentiment":
+            return rng.choice(_SENTIMENTS)
+        if self.task in ("categorization", "combined"):
+            categories = rng.sample(sorted(CATEGORY_ID.values()), rng.randint(1, 3))
+            answer = {str(c): str(SENTIMENT_ID[rng.choice(_SENTIMENTS)]) for c in categories}
+            if self.task == "categorization":
+                return answer
+            sentiment_ids = set(answer.values())
+            sentiment = "Negative" if "-1" in sentiment_ids else "Positive" if "1" in sentiment_ids else "Neutral"
+            return {"sentiment": sentiment, "categories": answer}
+        categories = rng.sample(sorted(GENERALIZATION_CATEGORY_ID.values()), rng.randint(1, 3))
+        return {
+            str(c): {
+                str(SENTIMENT_ID[s]): rng.sample(_ISSUES, rng.randint(1, 3))
+                for s in rng.sample(_SENTIMENTS, rng.randint(1, 2))
+            }
+            for c in categories
+        }
+
+    def answer(self, record_id):
+        """Well-formed answer text for ``record_id``."""
+        rng = self._rng(record_id)
+        members = self.packs.get(str(record_id))
+        if members is not None:
+            return json.dumps({member: self._single_answer(rng) for member in members})
+        answer = self._single_answer(rng)
+        if self.task == "sentiment":
+            return f"Sentiment: {answer}"
+        return json.dumps(answer)
+
+    def malformed_kind(self, record_id):
+        """Kind of malformed output for ``record_id``, or None for a well-formed one."""
+        if not self.malformed_rate:
+            return None
+        rng = random.Random(f"{self.seed}:malformed:{record_id}")
+        if rng.random() >= self.malformed_rate:
+            return None
+        return rng.choice(self.malformed_kinds)
+
+    def output_record(self, request):
+        """``.jsonl.out`` line for one parsed batch request."""
+        if self.latency:
+            time.sleep(self.latency)
+        record_id = request["recordId"]
+        text = self.answer(record_id)
+        kind = self.malformed_kind(record_id)
+        if kind is None:
+            return output_record(request, text)
+        if kind == "error":
+            return output_record(request, None, error="Simulated model error")
+        if kind == "truncated":
+            return output_record(request, text[:max(len(text) // 2, 1)], stop_reason="max_tokens")
+        if kind == "fenced":
+            text = f"```json\n{text}\n```"
+        elif kind == "prose":
+            text = f"Here is the classification:\n{text}\nLet me know if you need anything else."
+        elif kind == "trailing_comma":
+            text = text[:-1] + ",}" if text.endswith("}") else text + ","
+        return output_record(request, text)
+
+    def respond(self, request):
+        """Answer text only (``FakeBedrockClient`` responder); errors give an empty answer."""
+        record = self.output_record(request)
+        if "error" in record:
+            return ""
+        return record["modelOutput"]["output"]["message"]["content"][0]["text"]
+
+
+def simulate_file(input_path, output_path, model):
+    """
+    Answer every request of one batch-input file
+
+    Returns:
+        dict: ``records`` written and ``malformed`` among them
+    """
+    records = malformed = 0
+    with open(input_path, "r", encoding="utf-8") as src, open(output_path, "w", encoding="utf-8") as out:
+        for line in src:
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            out.write(json.dumps(model.output_record(request), ensure_ascii=False))
+            out.write("\n")
+            records += 1
+            if model.malformed_kind(request["recordId"]) is not None:
+                malformed += 1
+    return {"records": records, "malformed": malformed}
+
+
+def simulate_job(manifest_file, output_dir=None, task=None, **model_options):
+    """
+    Produce the ``.jsonl.out`` of every shard listed in an input manifest
+
+    Args:
+        manifest_file (str): Input manifest written by the upload scripts
+        output_dir (str): Destination (defaults to the manifest's folder, where
+            ``shard_output_paths`` looks)
+        task (str): Overrides the manifest's ``task``
+        **model_options: Passed to ``SimulatedModel`` (seed, malformed_rate, latency, ...)
+
+    Returns:
+        list: Output paths in shard order
+    """
+    manifest = read_input_manifest(manifest_file)
+    directory = os.path.dirname(manifest_file)
+    output_dir = output_dir or directory
+    os.makedirs(output_dir or ".", exist_ok=True)
+    model = SimulatedModel(task or manifest["task"], packs=manifest.get("packs"), **model_options)
+
+    paths = []
+    for shard in manifest.get("shards") or [{"file": manifest["input_file"]}]:
+        output_path = os.path.join(output_dir, f"{shard['file']}.out")
+        stats = simulate_file(os.path.join(directory, shard["file"]), output_path, model)
+        logger.info("Simulated %s: %d records, %d malformed", shard["file"], stats["records"], stats["malformed"])
+        paths.append(output_path)
+    return paths
@@ -0,0 +1,90 @@
+"""
+Per-task settings shared by the upload and extraction stages.
+
+Each upload script used to hard-code its prompt, id column, S3 prefix and
+output file names; they are listed here once so ``akasapulse.upload``,
+``akasapulse.outputs`` and the command line read the same values.
+"""
+from akasapulse.prompts import (
+    SENTIMENT_PROMPT, SENTIMENT_PACKED_PROMPT, CATEGORIZATION_PROMPT, CATEGORIZATION_PACKED_PROMPT,
+    COMBINED_PROMPT, COMBINED_PACKED_PROMPT, GENERALIZATION_PROMPT
+)
+
+DEFAULT_MODEL_ID = "apac.amazon.nova-pro-v1:0"
+DEFAULT_BUCKET = "akasa-bedrock"
+DEFAULT_ROLE_ARN = "arn:aws:iam::891377165721:role/Amazon-Bedrock-Batchinference-Role"
+DEFAULT_BATCH_DIR = "./batch_temp"
+
+TASKS = {
+    "sentiment": {
+        "prompt": SENTIMENT_PROMPT,
+        "packed_prompt": SENTIMENT_PACKED_PROMPT,
+        "id_column": "Respondent_ID",
+        "feedback_column": "Feedback",
+        "incremental_columns": ["Feedback"],
+        "s3_prefix": "temp-batch-inference-sentiment",
+        "max_tokens": 100,
+        "extracted_dir": "./Sentiment_Extracted",
+        "output_file": "Sentiment_Analysis_Output.parquet",
+        "failed_file": "Sentiment_Failed_Outputs.parquet",
+        "requeue_file": "Requeue_Respondent_IDs.json",
+        "warehouse_table": "QP_DA.Feedback_Sentiment",
+    },
+    "categorization": {
+        "prompt": CATEGORIZATION_PROMPT,
+        "packed_prompt": CATEGORIZATION_PACKED_PROMPT,
+        "id_column": "Respondent_ID",
+        "feedback_column": "Feedback",
+        "incremental_columns": ["Feedback"],
+        "s3_prefix": "temp-batch-inference",
+        "max_tokens": 100,
+        "extracted_dir": "./Categorization_Extracted",
+        "output_file": "Categorization_Model_Output.parquet",
+        "final_file": "Final_Categorization_Sentiments.parquet",
+        "failed_file": "Categorization_Failed_Outputs.parquet",
+        "requeue_file": "Requeue_Respondent_IDs.json",
+        "warehouse_table": "QP_DA.Category_Sentiment",
+    },
+    # One request per feedback for both Sentiments and Categorization; shares the Categorization prefix
+    "combined": {
+        "prompt": COMBINED_PROMPT,
+        "packed_prompt": COMBINED_PACKED_PROMPT,
+        "id_column": "Respondent_ID",
+        "feedback_column": "Feedback",
+        "incremental_columns": ["Feedback"],
+        "s3_prefix": "temp-batch-inference",
+        "max_tokens": 100,
+        "extracted_dir": "./Categorization_Extracted",
+        "output_file": "Combined_Model_Output.parquet",
+        "failed_file": "Categorization_Failed_Outputs.parquet",
+        "requeue_file": "Requeue_Respondent_IDs.json",
+    },
+    # Rows are Unique_IDs after akasapulse.generalization.aggregate_feedback; maxTokens follows Feedback_Count
+    "generalization": {
+        "prompt": GENERALIZATION_PROMPT,
+        "packed_prompt": None,
+        "id_column": "Unique_ID",
+        "feedback_column": "Feedback_Output",
+        "incremental_columns": ["Feedback", "Category_ID", "Sentiments"],
+        "s3_prefix": "temp-batch-inference-generalization",
+        "max_tokens": None,
+        "extracted_dir": "./Generalization_Extracted",
+        "output_file": "Generalization_Output.parquet",
+        "failed_file": "Generalization_Failed_Outputs.parquet",
+        "requeue_file": "Requeue_Unique_IDs.json",
+        "warehouse_table": "QP_DA.Generalization_Issues",
+    },
+}
+
+
+def task_settings(task):
+    """Settings of ``task``; raises ValueError for an unknown task."""
+    try:
+        return TASKS[task]
+    except KeyError:
+        raise ValueError(f"Unknown task {task!r}, expected one of {sorted(TASKS)}") from None
+
+
+def default_max_tokens(feedback_count):
+    """Fixed Generalization maxTokens rule, used when no history calibrates the Feedback_Count bucket."""
+    return 1500 if feedback_count <= 150 else feedback_count * 10
@@ -0,0 +1,62 @@
+"""
+Category and sentiment mappings shared by the Categorization and
+Generalization prompts and by the extraction scripts.
+"""
+
+SENTIMENT_ID = {'Positive': 1, 'Neutral': 0, 'Negative': -1}
+
+CATEGORY_KEYWORDS = {
+    'Compensation': ['Salary', 'Allowance'],
+    'Employee Policies & Benefits': ['ELT', 'Insurance', 'Transport', 'Night shift Allowance', 'Leaves', 'Medi Claims', 'HR Polices'],
+    'Career & Growth': ['Promotion', 'Progression', 'Internal Job Post', 'Transfer'],
+    'Reward and Recognition': ['Getting recognised for work', 'Appreciation at work place'],
+    'Learning & Development': ['Learning needs', 'Training needs'],
+    'Work Place Amenities': ['Drinking Water', 'Space', 'Washroom'],
+    'Work Environment & Culture': ['Respect at work place', 'Fairness at work place', 'Transparency', 'Inclusivity', 'Positivity at work', 'Empowerment'],
+    'Operational Effectiveness': ['Rostering', 'Scheduling', 'Resource Shortage', 'Lack of Information', 'Communication Gaps'],
+    'Leadership': ['HOD', 'EXCOM', 'Vison of organisation', 'Org decisions'],
+    'Line Manager': ['Immediate Line Manager'],
+    'Team': ['Immediate team members'],
+    'Cross functional Collaboration': ['Other departments and teams'],
+    'Pride and Brand association': ['General Positive or Negative feedback about Akasa Air']
+}
+
+CATEGORY_EXAMPLES = {
+    'Compensation': 'Salary should be revised.Kindly increase hours or salary.',
+    'Employee Policies & Benefits': 'Night allowances Two way cab felicity or transport allowance.',
+    'Career & Growth': 'Currently I am looking for growth in terms of designation. I have been working with Akasa from last 3.5 years and have managed different profiles in all these years. Grateful to Akasa for providing me with an opportunity to work on such diverse profiles but I am currently looking at taking a step ahead with promotion as well.',
+    'Reward and Recognition': 'More staff centric appreciation to be there,best employee of month ,best performers Tobe awarded',
+    'Learning & Development': 'Training should be expedited',
+    'Work Place Amenities': 'Just need some extra facilities for employees',
+    'Work Environment & Culture': 'To much politics & favoritism in the team.  Need to maintain transparency & fairness in the team.',
+    'Operational Effectiveness': 'No work life balance with long patterns and rostering changes',
+    'Leadership': 'I wanted to take a moment to express my appreciation for the outstanding leadership demonstrated by Ananya Narula (SR GM AALA) Ananya has consistently gone above and beyond to foster a positive work environment, motivate individuals, promote transparency, and lead by example. Her efforts have undoubtedly contributed to the overall success and morale of our team.',
+    'Line Manager': 'The duty manager send mails for things which I havenâ€™t done and I have to explain every time.',
+    'Team': 'Seniors should treat all subordinates with equal respect and fairness.',
+    'Cross functional Collaboration': 'Improved inter-departmental communication would enhance overall efficiency.Streamlining processes for approvals and addressing requirements could help reduce delays and prevent unnecessary issues with regulatory authorities.',
+    'Pride and Brand association': 'I feel extremely good to work with Akasa Air.'
+}
+
+CATEGORY_ID = {
+    'Compensation': 1,
+    'Employee Policies & Benefits': 2,
+    'Career & Growth': 3,
+    'Reward and Recognition': 4,
+    'Learning & Development': 5,
+    'Work Place Amenities': 6,
+    'Work Environment & Culture': 7,
+    'Operational Effectiveness': 8,
+    'Leadership': 9,
+    'Line Manager': 10,
+    'Team': 11,
+    'Cross functional Collaboration': 12,
+    'Pride and Brand association': 13
+}
+
+# Generalization also reports the catch-all "Others" bucket
+# (Category_Name -> Category_ID as documented in Generalization/Input_creation.sql)
+GENERALIZATION_CATEGORY_ID = {**CATEGORY_ID, 'Others': 14}
+
+# Category_ID -> Category_Name as stored in QP_DA.Category_Sentiment; Categorization answers use 0
+# for feedback that matches no category, which the warehouse (and Generalization) calls "Others"
+CATEGORY_NAME = {**{category_id: name for name, category_id in CATEGORY_ID.items()}, 0: 'Others'}
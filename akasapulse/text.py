@@ -0,0 +1,40 @@
+"""
+Feedback text normalisation shared by the result cache and de-duplication.
+"""
+import re
+import unicodedata
+
+# Apostrophes inside words and periods after single letters join ("don't" -> "dont",
+# "n.a." -> "na"); all other punctuation separates words
+_JOIN_RE = re.compile(r"(?<=\w)['\u2019](?=\w)|(?<=\b\w)\.")
+_PUNCT_RE = re.compile(r"[^\w\s]+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def is_blank(value):
+    """True for None, NaN and whitespace-only values."""
+    if value is None:
+        return True
+    if isinstance(value, float) and value != value:
+        return True
+    return not str(value).strip()
+
+
+def normalize_feedback(text):
+    """
+    Canonical form of a verbatim: Unicode NFKC, case-folded, punctuation
+    removed and whitespace collapsed. "Good!!", " good " and "GOOD." all map
+    to "good", "N.A." maps to "na"; None/NaN map to "".
+
+    Args:
+        text: Feedback value (any type)
+
+    Returns:
+        str: Normalised text
+    """
+    if is_blank(text):
+        return ""
+    text = unicodedata.normalize("NFKC", str(text)).casefold()
+    text = _JOIN_RE.sub("", text)
+    text = _PUNCT_RE.sub(" ", text)
+    return _SPACE_RE.sub(" ", text).strip()
@@ -0,0 +1,577 @@
+"""
+Upload stage of every task: build the batch input and run the Bedrock job.
+
+The Sentiments, Categorization and Generalization upload scripts each had their own
+copy of ``iter_batch_requests``, ``create_local_batch_input_file``,
+``upload_to_s3_temp`` and ``process_feedback_batch_local``. The copies differed
+only in the prompt, id column, S3 prefix and maxTokens rule, and they had
+started to drift apart. Those settings now come from ``akasapulse.tasks`` and
+the functions here take the task name.
+
+``process_feedback_batch_local`` takes an ``akasapulse.clients.AwsClients``
+(or a ready ``BatchJobRunner``) instead of a credentials dict. A scheduler
+can then run every task with the same clients. The job it returns carries
+``task`` and ``manifest_file``, so ``akasapulse.outputs.extract_job`` can
+pick the outputs up directly.
+
+pandas, numpy and botocore are imported only by the steps that need them.
+Importing this module stays cheap, which keeps the CLI fast to start.
+"""
+import logging
+import os
+import re
+import uuid
+from datetime import datetime
+
+from akasapulse.batch_io import (
+    iter_rows, write_jsonl, stream_jsonl_to_s3,
+    batch_input_filename, local_batch_input_path, manifest_path, write_input_manifest
+)
+from akasapulse.prompts import encode_batch_request
+from akasapulse.packing import RequestPacker, read_requeue_file
+from akasapulse.mapreduce import DEFAULT_MAX_FEEDBACKS, MAP_MAX_TOKENS, iter_map_requests
+from akasapulse.sharding import DEFAULT_MAX_RECORDS, DEFAULT_MAX_BYTES, write_shards, write_shard_manifest
+from akasapulse.orchestrator import DEFAULT_STATE_PATH, BatchJobRunner, BatchJobError, JobState, job_spec
+from akasapulse.tasks import DEFAULT_BATCH_DIR, DEFAULT_MODEL_ID, default_max_tokens, task_settings
+
+logger = logging.getLogger(__name__)
+
+
+def read_input(path, **options):
+    """
+    Read an input sheet (.xlsx / .xls, .parquet or .csv) into a DataFrame
+
+    Args:
+        path (str): Input file path
+        **options: Passed to the pandas reader (e.g. ``sheet_name``)
+
+    Returns:
+        pd.DataFrame: Input rows
+    """
+    import pandas as pd
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".parquet":
+        return pd.read_parquet(path, **options)
+    if extension == ".csv":
+        return pd.read_csv(path, **options)
+    return pd.read_excel(path, **options)
+
+
+def prepare_input(df, task, requeue_file=None, incremental_state=None, period=None, checkpoint_dir=None):
+    """
+    Narrow the input sheet to the rows to send, as the upload scripts did before building the input
+
+    Sentiments / Categorization: respondents listed in ``requeue_file`` only, then (with an
+    incremental state) the ones not answered yet for ``period`` or whose feedback changed.
+    Generalization: Unique_ID groups whose feedback set changed, aggregated to one row per
+    Unique_ID (see ``akasapulse.generalization.aggregate_feedback``), then the requeued ones.
+
+    Args:
+        df (pd.DataFrame): Input sheet
+        task (str): Task name
+        requeue_file (str): Requeue file written by the extraction stage
+        incremental_state (IncrementalState): Open incremental state (None sends every row)
+        period (str): Month of the input, e.g. "2026-01"
+        checkpoint_dir (str): Generalization only: pre-aggregation checkpoint folder
+            (rebuilt when the period or the rows to aggregate change)
+
+    Returns:
+        pd.DataFrame: Rows to send
+    """
+    settings = task_settings(task)
+    id_column = settings["id_column"]
+    if incremental_state is not None:
+        df = incremental_state.select_changes(df, task, period, id_column, settings["incremental_columns"])
+    if task == "generalization":
+        from akasapulse.generalization import aggregate_feedback
+
+        # Build {Feedback: {Category_ID: Sentiments}} per Unique_ID, plus Feedback_Count
+        df = aggregate_feedback(df, checkpoint_dir=checkpoint_dir, period=period)
+    if requeue_file:
+        df = df[df[id_column].astype(str).isin(read_requeue_file(requeue_file))]
+    return df
+
+
+def iter_batch_requests(df, task, feedback_column=None, id_column=None, prompt=None, rows=None,
+                        max_tokens=None, max_tokens_policy=None, group_sizes=None):
+    """
+    Lazily generate one batch request per feedback row (per Unique_ID for Generalization).
+    The invariant part of the prompt is rendered once (see akasapulse.prompts);
+    only the id and the feedback text are filled in per row.
+
+    Args:
+        df: pd.DataFrame or an iterable of DataFrame chunks
+        task (str): Task name
+        feedback_column (str): Column name containing feedback text (task default if not given)
+        id_column (str): Column name containing the record ID (task default if not given)
+        prompt (CompiledPrompt): Pre-compiled prompt, compiled here if not given
+        rows: Pre-filtered (record_id, feedback_text) pairs; read from df when not given
+        max_tokens (int): maxTokens of every request (task default if not given)
+        max_tokens_policy: Generalization only: ``f(Feedback_Count) -> maxTokens``, the fixed rule if not given
+        group_sizes (dict): Generalization only: filled with Unique_ID -> Feedback_Count for the metrics store
+
+    Yields:
+        str: Serialised batch request with the record ID as recordId
+    """
+    settings = task_settings(task)
+    prompt = prompt or settings["prompt"].compile()
+    id_column = id_column or settings["id_column"]
+    feedback_column = feedback_column or settings["feedback_column"]
+
+    if task == "generalization":
+        # Dynamic maxTokens based on Feedback_Count
+        max_tokens_policy = max_tokens_policy or default_max_tokens
+        group_sizes = {} if group_sizes is None else group_sizes
+        for record_id, feedback_text, feedback_count in iter_rows(df, [id_column, feedback_column, "Feedback_Count"]):
+            record_id = str(record_id)
+            feedback_count = int(feedback_count or 0)
+            group_sizes[record_id] = feedback_count
+            prompt_json = prompt.render_json(respondent_id=record_id, feedback_text=feedback_text)
+            yield encode_batch_request(record_id, prompt_json, max_tokens=max_tokens_policy(feedback_count))
+        return
+
+    max_tokens = max_tokens or settings["max_tokens"]
+    if rows is None:
+        rows = iter_rows(df, [id_column, feedback_column])
+    for record_id, feedback_text in rows:
+        record_id = str(record_id)
+        prompt_json = prompt.render_json(respondent_id=record_id, feedback_text=feedback_text)
+        yield encode_batch_request(record_id, prompt_json, max_tokens=max_tokens)
+
+
+def adaptive_max_tokens_policy(metrics, prompt, task, map_reduce=False):
+    """
+    maxTokens calibrated from the earlier jobs of ``prompt`` in ``metrics``
+
+    Group sizes without enough history keep the fixed reservation: the Generalization rule
+    (``MAP_MAX_TOKENS`` for map chunks), and for the other tasks the task's maxTokens on single
+    requests and the per-feedback reservation on packs.
+
+    Args:
+        metrics (MetricsStore): Token metrics of earlier jobs
+        prompt (CompiledPrompt): Prompt of the requests
+        task (str): Task name
+        map_reduce (bool): The requests are Generalization map chunks
+
+    Returns:
+        MaxTokensPolicy: ``f(group_size) -> maxTokens``; None leaves the request builder's default in place
+    """
+    if map_reduce:
+        default = MAP_MAX_TOKENS
+    elif task == "generalization":
+        default = default_max_tokens
+    else:
+        default = None
+    return metrics.max_tokens_policy(prompt.name, default=default)
+
+
+def create_local_batch_input_file(df, task, feedback_column=None, id_column=None, output_dir=DEFAULT_BATCH_DIR,
+                                  metrics=None, adaptive_max_tokens=False, model_id=DEFAULT_MODEL_ID):
+    """
+    Create the batch input as one local file.
+    Records are streamed to disk one at a time so memory stays flat.
+    The prompt version is recorded in a sidecar manifest next to the input file.
+
+    Args:
+        df: pd.DataFrame or an iterable of DataFrame chunks
+        task (str): Task name
+        feedback_column (str): Column name containing feedback text (task default if not given)
+        id_column (str): Column name containing the record ID (task default if not given)
+        output_dir (str): Directory to save files
+        metrics (MetricsStore): Record the estimated input tokens and maxTokens of every request
+        adaptive_max_tokens (bool): Set maxTokens from the output tokens of earlier jobs in ``metrics``
+        model_id (str): Model ID, used for the cost estimate
+
+    Returns:
+        str: Path to the created input file
+    """
+    settings = task_settings(task)
+    prompt = settings["prompt"].compile()
+    input_file = local_batch_input_path(output_dir)
+    metadata = {"task": task, "prompt_version": prompt.version_id}
+    policy = None
+    if metrics is not None and adaptive_max_tokens:
+        policy = adaptive_max_tokens_policy(metrics, prompt, task)
+    group_sizes = {}
+    if task == "generalization":
+        requests = iter_batch_requests(df, task, feedback_column, id_column, prompt,
+                                       max_tokens_policy=policy, group_sizes=group_sizes)
+    else:
+        requests = iter_batch_requests(df, task, feedback_column, id_column, prompt,
+                                       max_tokens=policy(1) if policy is not None else None)
+    if metrics is not None:
+        metrics_job = os.path.basename(input_file)
+        metrics.register_job(metrics_job, prompt.name, prompt.version_id, model_id)
+        metadata["metrics_job"] = metrics_job
+        requests = metrics.record_requests(requests, metrics_job, group_sizes=group_sizes or None)
+    total = write_jsonl(requests, input_file)
+    write_input_manifest(input_file, records=total, **metadata)
+
+    print(f"Batch input file created: {input_file}")
+    print(f"Prompt version: {prompt.version_id}")
+    print(f"Total requests: {total}")
+    return input_file
+
+
+def create_local_batch_input_shards(df, task, feedback_column=None, id_column=None, output_dir=DEFAULT_BATCH_DIR,
+                                    max_records=DEFAULT_MAX_RECORDS, max_bytes=DEFAULT_MAX_BYTES, pack_size=None,
+                                    cache=None, model_id=DEFAULT_MODEL_ID, dedup_threshold=None,
+                                    metrics=None, adaptive_max_tokens=False, preclassifier=None,
+                                    map_reduce=False, max_feedbacks=DEFAULT_MAX_FEEDBACKS, base_name=None):
+    """
+    Create the batch input as record- and byte-bounded shard files plus a manifest
+    that maps each shard to its record IDs
+
+    Args:
+        df: pd.DataFrame or an iterable of DataFrame chunks
+        task (str): Task name
+        feedback_column (str): Column name containing feedback text (task default if not given)
+        id_column (str): Column name containing the record ID (task default if not given)
+        output_dir (str): Directory to save files
+        max_records (int): Maximum records per shard
+        max_bytes (int): Maximum bytes per shard
+        pack_size (int): Pack up to this many feedbacks per request (None sends one per request)
+        cache (ResultCache): Skip feedbacks whose answer is already cached for this prompt and model
+        model_id (str): Model ID, part of the cache key
+        dedup_threshold (float): Send one request per cluster of exact/near-duplicate feedbacks
+            (similarity 0-1, 1.0 collapses exact duplicates only; None disables)
+        metrics (MetricsStore): Record the estimated input tokens and maxTokens of every request
+        adaptive_max_tokens (bool): Set maxTokens per group size from the output tokens of earlier jobs in ``metrics``
+        preclassifier (PreClassifier): Answer blank / generic feedbacks locally instead of sending them
+            (built for the same task)
+        map_reduce (bool): Generalization only: send Unique_IDs with more than ``max_feedbacks`` feedbacks
+            as bounded chunks (see akasapulse.mapreduce); the extraction stage then writes the reduce batch
+        max_feedbacks (int): Feedbacks per request in map-reduce mode
+        base_name (str): Base filename of the shards (a fresh timestamped one if not given)
+
+    Returns:
+        list: Paths of the shard files
+    """
+    settings = task_settings(task)
+    id_column = id_column or settings["id_column"]
+    feedback_column = feedback_column or settings["feedback_column"]
+    if task == "generalization" and (pack_size or cache is not None or dedup_threshold is not None
+                                     or preclassifier is not None):
+        raise ValueError("pack_size, cache, dedup_threshold and preclassifier are not supported for generalization")
+    if map_reduce and task != "generalization":
+        raise ValueError("map_reduce is only supported for generalization")
+
+    prompt = (settings["packed_prompt"] if pack_size else settings["prompt"]).compile()
+    base_name = base_name or batch_input_filename()
+    metadata = {"task": task, "prompt_version": prompt.version_id}
+
+    rows = None
+    if task != "generalization":
+        rows = iter_rows(df, [id_column, feedback_column])
+    if preclassifier is not None:
+        # Local answers are written in the .jsonl.out shape, like cached ones
+        preclassified_output = base_name.replace(".jsonl", "-preclassified.jsonl.out")
+        rows = preclassifier.filter_rows(rows, os.path.join(output_dir, preclassified_output))
+        metadata["preclassified_output"] = preclassified_output
+    if dedup_threshold is not None:
+        from akasapulse.dedup import collapse_duplicates
+
+        # Representative -> members, used by the extraction stage to fan answers out
+        rows, clusters, report = collapse_duplicates(rows, threshold=dedup_threshold)
+        metadata["clusters"] = clusters
+        print(f"De-duplication: {report}")
+    if cache is not None:
+        # Cached answers skip the job and are written in the .jsonl.out shape for the extraction stage
+        cached_output = base_name.replace(".jsonl", "-cached.jsonl.out")
+        rows = cache.filter_rows(rows, prompt.version_id, model_id, base_name, os.path.join(output_dir, cached_output))
+        metadata.update(cached_output=cached_output, cache_job=base_name)
+
+    policy = None
+    if metrics is not None:
+        if adaptive_max_tokens:
+            # Calibrated per task and group size; sizes without enough history keep the fixed reservation
+            policy = adaptive_max_tokens_policy(metrics, prompt, task, map_reduce=map_reduce)
+        metrics.register_job(base_name, prompt.name, prompt.version_id, model_id)
+        metadata["metrics_job"] = base_name
+
+    group_sizes = None
+    partials = None
+    if map_reduce:
+        partials, group_sizes = {}, {}
+        requests = iter_map_requests(iter_rows(df, [id_column, feedback_column]), prompt, partials,
+                                     max_feedbacks=max_feedbacks, max_tokens_policy=policy, group_sizes=group_sizes)
+    elif task == "generalization":
+        group_sizes = {}
+        requests = iter_batch_requests(df, task, feedback_column, id_column, prompt,
+                                       max_tokens_policy=policy, group_sizes=group_sizes)
+    elif pack_size:
+        requests = RequestPacker(rows, prompt, task, max_feedbacks=pack_size, max_tokens_policy=policy)
+        group_sizes = requests.packs
+    else:
+        max_tokens = policy(1) if policy is not None else None
+        requests = iter_batch_requests(df, task, feedback_column, id_column, prompt, rows=rows, max_tokens=max_tokens)
+    if metrics is not None:
+        requests = metrics.record_requests(requests, base_name, group_sizes=group_sizes)
+
+    shards = write_shards(requests, output_dir, base_name, max_records=max_records, max_bytes=max_bytes)
+    if pack_size:
+        # Pack recordId -> record IDs, used by the extraction stage to unpack answers
+        metadata["packs"] = group_sizes
+    if map_reduce:
+        # Chunk recordId -> Unique_ID, used by the extraction stage to build the reduce pass
+        metadata["partials"] = partials
+        print(f"Map-reduce: {len(partials)} chunk requests for "
+              f"{len(set(p['unique_id'] for p in partials.values()))} large Unique_IDs")
+    manifest_file = write_shard_manifest(output_dir, base_name, shards, **metadata)
+
+    print(f"Batch input shards created: {len(shards)} (manifest: {manifest_file})")
+    print(f"Total requests: {sum(shard['records'] for shard in shards)}")
+    if cache is not None:
+        print(f"Result cache: {cache.stats()}")
+    return [shard["path"] for shard in shards]
+
+
+def stream_batch_input_to_s3(df, task, s3_client, bucket_name, feedback_column=None, id_column=None, prompt=None,
+                             output_dir=DEFAULT_BATCH_DIR):
+    """
+    Generate the batch input and stream it straight into a multipart S3 upload,
+    skipping the local file entirely. Upload overlaps with record generation.
+    Only single-feedback requests can be streamed; the manifest (task, prompt version,
+    record count) is still written locally, where the job's output is downloaded.
+
+    Args:
+        df: pd.DataFrame or an iterable of DataFrame chunks
+        task (str): Task name
+        s3_client: S3 client
+        bucket_name (str): S3 bucket name
+        feedback_column (str): Column name containing feedback text (task default if not given)
+        id_column (str): Column name containing the record ID (task default if not given)
+        prompt (CompiledPrompt): Compiled single-request prompt (the task's prompt if not given)
+        output_dir (str): Folder receiving the manifest (``<input file>.manifest.json``)
+
+    Returns:
+        str: S3 URI
+    """
+    from botocore.exceptions import BotoCoreError, ClientError
+
+    prompt = prompt or task_settings(task)["prompt"].compile()
+    input_file = batch_input_filename()
+    s3_key = f"{task_settings(task)['s3_prefix']}/{input_file}"
+    try:
+        s3_uri, total = stream_jsonl_to_s3(
+            iter_batch_requests(df, task, feedback_column, id_column, prompt), s3_client, bucket_name, s3_key
+        )
+        os.makedirs(output_dir, exist_ok=True)
+        write_input_manifest(os.path.join(output_dir, input_file), records=total, task=task,
+                             prompt_version=prompt.version_id, input_s3_uri=s3_uri)
+        print(f"File streamed to: {s3_uri}")
+        print(f"Total requests: {total}")
+        return s3_uri
+    except (ClientError, BotoCoreError) as e:
+        print(f"Error uploading to S3: {e}")
+        return None
+
+
+def upload_to_s3_temp(file_path, s3_client, bucket_name, s3_prefix):
+    """
+    Upload file to S3 temporarily for batch processing
+
+    Args:
+        file_path (str): Local file path
+        s3_client: S3 client
+        bucket_name (str): S3 bucket name
+        s3_prefix (str): Key prefix, e.g. ``task_settings(task)["s3_prefix"]``
+
+    Returns:
+        str: S3 URI
+    """
+    from boto3.exceptions import S3UploadFailedError
+    from botocore.exceptions import BotoCoreError, ClientError
+
+    s3_key = f"{s3_prefix}/{os.path.basename(file_path)}"
+    try:
+        s3_client.upload_file(file_path, bucket_name, s3_key)
+        s3_uri = f"s3://{bucket_name}/{s3_key}"
+        print(f"File uploaded to: {s3_uri}")
+        return s3_uri
+    except (ClientError, BotoCoreError, S3UploadFailedError) as e:
+        print(f"Error uploading to S3: {e}")
+        return None
+
+
+def cleanup_temp_files(*file_paths):
+    """
+    Clean up temporary files
+
+    Args:
+        *file_paths: Variable number of file paths to delete
+    """
+    for file_path in file_paths:
+        if file_path and os.path.exists(file_path):
+            try:
+                os.remove(file_path)
+                print(f"Cleaned up: {file_path}")
+            except Exception as e:
+                print(f"Error cleaning up {file_path}: {e}")
+
+
+def input_manifest(input_file):
+    """
+    Manifest of a pre-built input file: its own (retry batch) or its shard set's (reduce batch)
+
+    Args:
+        input_file (str): Batch input file
+
+    Returns:
+        str: Absolute manifest path, or None if there is none
+    """
+    for candidate in (input_file, re.sub(r"-part-\d{4}\.jsonl$", ".jsonl", input_file)):
+        if os.path.exists(manifest_path(candidate)):
+            return os.path.abspath(manifest_path(candidate))
+    return None
+
+
+def batch_runner(clients, role_arn, model_id=DEFAULT_MODEL_ID, state_file=DEFAULT_STATE_PATH, **options):
+    """
+    ``BatchJobRunner`` on the shared clients
+
+    Args:
+        clients (AwsClients): Shared clients
+        role_arn (str): IAM role ARN for batch processing
+        model_id (str): Bedrock model ID
+        state_file (str): Job progress file
+        **options: Passed to ``BatchJobRunner`` (poll_interval, ...)
+
+    Returns:
+        BatchJobRunner: Runner
+    """
+    return BatchJobRunner(clients.bedrock, clients.s3, role_arn, model_id, state=JobState(state_file), **options)
+
+
+def process_feedback_batch_local(df, task, s3_bucket, role_arn, clients=None, runner=None, feedback_column=None,
+                                 cleanup_files=True, stream_upload=False,
+                                 max_records=DEFAULT_MAX_RECORDS, max_bytes=DEFAULT_MAX_BYTES, pack_size=None,
+                                 cache=None, dedup_threshold=None, input_files=None,
+                                 map_reduce=False, max_feedbacks=DEFAULT_MAX_FEEDBACKS,
+                                 submit_job=True, state_file=DEFAULT_STATE_PATH, resume_job=None,
+                                 metrics=None, adaptive_max_tokens=False, preclassifier=None,
+                                 model_id=DEFAULT_MODEL_ID, output_dir=DEFAULT_BATCH_DIR):
+    """
+    Process feedback using batch inference with local file handling
+
+    Args:
+        df (pd.DataFrame): DataFrame with feedback data (see ``prepare_input``)
+        task (str): "sentiment", "categorization", "combined" or "generalization"
+        s3_bucket (str): S3 bucket for temporary files (still needed for batch processing)
+        role_arn (str): IAM role ARN for batch processing
+        clients (AwsClients): Shared AWS clients (boto3's default credentials if neither this nor ``runner`` is given)
+        runner (BatchJobRunner): Runner to reuse; ``clients``, ``state_file`` and ``model_id`` are then ignored
+        feedback_column (str): Column name containing feedback text (task default if not given)
+        cleanup_files (bool): Whether to clean up temporary files
+        stream_upload (bool): Stream the input straight to S3 instead of writing a local file first
+            (one request per feedback: not with ``pack_size``, ``cache``, ``dedup_threshold``,
+            ``preclassifier``, ``map_reduce`` or ``metrics``)
+        max_records (int): Maximum records per input shard
+        max_bytes (int): Maximum bytes per input shard
+        pack_size (int): Pack up to this many feedbacks per request (None sends one per request)
+        cache (ResultCache): Result cache used to skip already-answered feedbacks
+        dedup_threshold (float): Collapse exact/near-duplicate feedbacks at this similarity (None disables)
+        input_files (list): Pre-built input files uploaded as-is (e.g. the retry batch written by the extraction stage)
+        map_reduce (bool): Generalization only: split Unique_IDs with many feedbacks into bounded chunks
+        max_feedbacks (int): Feedbacks per request in map-reduce mode
+        submit_job (bool): Submit the job and wait for it (False only prepares the input and returns the job spec)
+        state_file (str): Job progress file, used to resume after an interruption
+        resume_job (str): Name of an interrupted job in ``state_file`` to finish instead of starting a new one
+        metrics (MetricsStore): Token metrics store (see akasapulse.metrics)
+        adaptive_max_tokens (bool): Set maxTokens from the history in ``metrics``
+        preclassifier (PreClassifier): Local rules answering trivial feedbacks before the batch input is built
+        model_id (str): Bedrock model ID
+        output_dir (str): Folder for the input shards and the downloaded outputs
+
+    Returns:
+        dict: Final job state (``status``, ``output_files``, ``task``, ``manifest_file``, ...), the job spec
+            if ``submit_job`` is False, or the input DataFrame if the upload or the job failed
+
+    Raises:
+        ValueError: If ``stream_upload`` is combined with an option that needs the local shards
+    """
+    settings = task_settings(task)
+    s3_prefix = settings["s3_prefix"]
+    if stream_upload and not (resume_job or input_files):
+        # These build packs, side files and manifest entries that only the local shards get
+        local_only = {"pack_size": pack_size, "cache": cache, "dedup_threshold": dedup_threshold,
+                      "preclassifier": preclassifier, "map_reduce": map_reduce, "metrics": metrics}
+        unsupported = [name for name, value in local_only.items() if value is not None and value is not False]
+        if unsupported:
+            raise ValueError(f"stream_upload cannot be combined with {', '.join(unsupported)}; "
+                             "leave stream_upload off to build local shards")
+    if runner is None:
+        if clients is None:
+            from akasapulse.clients import AwsClients
+
+            clients = AwsClients()
+        runner = batch_runner(clients, role_arn, model_id, state_file)
+
+    # Generate unique identifiers
+    timestamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    job_id = str(uuid.uuid4())[:8]
+    job_name = f"feedback-{task}-{timestamp}-{job_id}"
+
+    local_input_files = []
+
+    try:
+        if resume_job:
+            # Steps 1-3 continue from the stage recorded in the state file
+            spec = runner.state.get(resume_job)
+            if spec is None:
+                print(f"Job {resume_job} not found in {runner.state.path}")
+                return df
+        elif input_files:
+            # Step 1 is already done: the given files are uploaded unchanged
+            spec = job_spec(job_name, s3_bucket, s3_prefix, os.path.dirname(input_files[0]) or ".",
+                            input_files=list(input_files))
+            spec["manifest_file"] = input_manifest(input_files[0])
+        elif stream_upload:
+            # Steps 1+2: Generate the input while it uploads to S3
+            print("Step 1: Streaming input file to S3...")
+            input_s3_uri = stream_batch_input_to_s3(df, task, runner.s3_client, s3_bucket, feedback_column,
+                                                    output_dir=output_dir)
+            if not input_s3_uri:
+                return df
+            spec = job_spec(job_name, s3_bucket, s3_prefix, output_dir, input_s3_uri=input_s3_uri)
+            spec["manifest_file"] = os.path.abspath(
+                manifest_path(os.path.join(output_dir, os.path.basename(input_s3_uri)))
+            )
+        else:
+            # Step 1: Create local input shards (one file unless the limits are exceeded)
+            print("Step 1: Creating local input shards...")
+            base_name = batch_input_filename()
+            local_input_files = create_local_batch_input_shards(
+                df, task, feedback_column=feedback_column, output_dir=output_dir,
+                max_records=max_records, max_bytes=max_bytes, pack_size=pack_size,
+                cache=cache, model_id=model_id, dedup_threshold=dedup_threshold,
+                metrics=metrics, adaptive_max_tokens=adaptive_max_tokens, preclassifier=preclassifier,
+                map_reduce=map_reduce, max_feedbacks=max_feedbacks, base_name=base_name
+            )
+            spec = job_spec(job_name, s3_bucket, s3_prefix, output_dir, input_files=local_input_files)
+            spec["manifest_file"] = os.path.abspath(manifest_path(os.path.join(output_dir, base_name)))
+        spec.setdefault("task", task)
+
+        if not submit_job:
+            # Inputs stay on disk for Orchestration/Run_Batch_Jobs.py / ``python -m akasapulse jobs run``
+            local_input_files = []
+            return spec
+
+        # Step 2: Upload the shards under the job's own S3 prefix and submit the job
+        # Step 3: Poll it with backoff, download the .jsonl.out files next to the manifest and clear S3
+        print("Step 2: Uploading to S3 and submitting the batch job...")
+        try:
+            job = runner.run(spec, cleanup=cleanup_files)
+        except BatchJobError as e:
+            # Interrupted jobs (not failed ones) can be finished later with resume_job=spec['name']
+            print(f"Batch job {spec['name']} did not finish: {e}")
+            local_input_files = []
+            return df
+        print(f"Step 3: Outputs ready for the extraction stage: {job['output_files']}")
+        return job
+
+    finally:
+        # Cleanup temporary files
+        if cleanup_files:
+            cleanup_temp_files(*local_input_files)
@@ -0,0 +1,166 @@
+"""
+Benchmark and regression check: wide-to-long reshapes of the extraction stages.
+
+Generates synthetic Categorization (``{category_id: sentiment}``) and
+Generalization (``{category_id: {sentiment: [issues]}}``) answers, including
+a share of malformed ones, runs the previous ``iterrows`` implementations and
+``akasapulse.reshape``, asserts that ``final_df`` / ``error_df`` are identical
+and prints the timings.
+
+Run from the repository root:
+    python benchmarks/extraction_reshape.py --records 10000 100000 1000000
+"""
+import argparse
+import ast
+import json
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from akasapulse.reshape import expand_categorization, expand_generalization  # noqa: E402
+
+SENTIMENTS = ["Positive", "Negative", "Neutral"]
+
+
+def synthetic_categorization(records, seed=3):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(records):
+        answer = {str(c): rng.choice(SENTIMENTS) for c in rng.sample(range(1, 14), rng.randint(1, 4))}
+        text = json.dumps(answer)
+        roll = rng.random()
+        if roll < 0.01:
+            text = "```json\n" + text
+        elif roll < 0.015:
+            text = json.dumps(list(answer))
+        elif roll < 0.02:
+            text = json.dumps({"2": "Positive", "x": "Negative", "5": "Neutral"})
+        rows.append((f"R{i:07d}", text))
+    return pd.DataFrame(rows, columns=["Respondent_ID", "Model_Output"])
+
+
+def synthetic_generalization(records, seed=5):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(records):
+        answer = {}
+        for c in rng.sample(range(1, 16), rng.randint(1, 3)):
+            answer[str(c)] = {
+                s: [f"issue {c}.{s}.{k}" for k in range(rng.randint(0, 3))]
+                for s in rng.sample(["1", "-1", "0"], rng.randint(1, 3))
+            }
+        # Answers are JSON; a few were re-saved as str(dict) by the Excel clean-up step
+        rows.append((i, str(answer) if rng.random() < 0.05 else json.dumps(answer)))
+    return pd.DataFrame(rows, columns=["Unique_ID", "Model_Output"])
+
+
+def legacy_categorization(df):
+    """Categorization/Extraction_from_Output_JSON before akasapulse.reshape."""
+    expanded_rows = []
+    error_rows = []
+    for idx, row in df.iterrows():
+        respondent_id = row.iloc[0]
+        json_str = row.iloc[1]
+        try:
+            data_dict = json.loads(json_str)
+            for category_id, sentiment in data_dict.items():
+                expanded_rows.append({
+                    "Respondent_ID": respondent_id,
+                    "Category_ID": int(category_id),
+                    "Sentiment": sentiment
+                })
+        except Exception as e:
+            error_rows.append({"Respondent_ID": respondent_id, "Raw_Data": json_str, "Error": str(e)})
+    return pd.DataFrame(expanded_rows), pd.DataFrame(error_rows)
+
+
+def legacy_generalization(df):
+    """Generalization/Extracting_Data_from_Output_JSON.py before akasapulse.reshape."""
+    df = df.copy()
+    df['Model_Output'] = df['Model_Output'].apply(ast.literal_eval)
+    rows = []
+    for _, row in df.iterrows():
+        unique_id = row['Unique_ID']
+        model_output = row['Model_Output']
+        category_map = {}
+        for category_id, sentiment_dict in model_output.items():
+            positive_issues, negative_issues, neutral_issues = [], [], []
+            for sentiment, issues in sentiment_dict.items():
+                if sentiment == '1':
+                    positive_issues.extend(issues)
+                elif sentiment == '-1':
+                    negative_issues.extend(issues)
+                elif sentiment == '0':
+                    neutral_issues.extend(issues)
+            category_map[int(category_id)] = {
+                'Positive_Issues': positive_issues,
+                'Negative_Issues': negative_issues,
+                'Neutral_Issues': neutral_issues
+            }
+        for cat_id in range(1, 15):
+            pos_list = category_map.get(cat_id, {}).get('Positive_Issues', [])
+            neg_list = category_map.get(cat_id, {}).get('Negative_Issues', [])
+            neu_list = category_map.get(cat_id, {}).get('Neutral_Issues', [])
+            max_len = max(len(pos_list), len(neg_list), len(neu_list), 1)
+            for i in range(max_len):
+                rows.append({
+                    'Unique_ID': unique_id,
+                    'Category_ID': cat_id,
+                    'Positive_Issues': pos_list[i] if i < len(pos_list) else None,
+                    'Negative_Issues': neg_list[i] if i < len(neg_list) else None,
+                    'Neutral_Issues': neu_list[i] if i < len(neu_list) else None
+                })
+    return pd.DataFrame(rows)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--legacy-limit", type=int, default=100_000,
+                        help="Skip the legacy run (and the comparison) above this many records")
+    args = parser.parse_args()
+
+    print(f"{'stage':<15} {'records':>9} {'legacy_s':>9} {'vector_s':>9} {'speedup':>8} {'equal':>6}")
+    for records in args.records:
+        run_legacy = records <= args.legacy_limit
+
+        df = synthetic_categorization(records)
+        (final_df, error_df), vector_s = timed(expand_categorization, df)
+        legacy_s = None
+        if run_legacy:
+            (legacy_final, legacy_errors), legacy_s = timed(legacy_categorization, df)
+            assert_frame_equal(final_df, legacy_final)
+            assert_frame_equal(error_df, legacy_errors)
+        report("categorization", records, legacy_s, vector_s)
+
+        df = synthetic_generalization(records)
+        (final_df, error_df), vector_s = timed(expand_generalization, df)
+        assert error_df.empty
+        legacy_s = None
+        if run_legacy:
+            legacy_final, legacy_s = timed(legacy_generalization, df)
+            assert_frame_equal(final_df, legacy_final)
+        report("generalization", records, legacy_s, vector_s)
+
+
+def report(stage, records, legacy_s, vector_s):
+    if legacy_s is None:
+        print(f"{stage:<15} {records:>9} {'-':>9} {vector_s:>9.2f} {'-':>8} {'-':>6}")
+    else:
+        print(f"{stage:<15} {records:>9} {legacy_s:>9.2f} {vector_s:>9.2f} {legacy_s / vector_s:>7.1f}x {'True':>6}")
+
+
+if __name__ == "__main__":
+    main()
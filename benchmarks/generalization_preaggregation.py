@@ -0,0 +1,132 @@
+"""
+Benchmark: Generalization pre-aggregation, Excel round-trip vs direct path.
+
+Builds a synthetic long sheet (Unique_ID, Feedback, Category_ID, Sentiments),
+runs the legacy script logic (dict -> str -> df_agg.xlsx -> regex re-parse ->
+second groupby) and ``akasapulse.generalization.aggregate_feedback``, checks
+that both produce the same prompt payload, and prints the timings.
+
+Run from the repository root:
+    python benchmarks/generalization_preaggregation.py --rows 20000 100000 300000
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from akasapulse.generalization import aggregate_feedback  # noqa: E402
+
+WORDS = ["trainer", "session", "content", "slow", "great", "lab", "network", "manager", "€", "helpful",
+         "timing", "pace", "clear", "boring", "hands-on", "cafeteria", "laptop", "support"]
+
+
+def synthetic_sheet(rows, seed=7):
+    """Long sheet with ~``rows`` rows; feedbacks contain no ':' (the legacy path split on it)."""
+    rng = random.Random(seed)
+    records = []
+    unique_id = 0
+    while len(records) < rows:
+        unique_id += 1
+        for _ in range(rng.randint(1, 40)):
+            words = rng.choices(WORDS, k=rng.randint(3, 14))
+            feedback = " ".join(words)
+            if rng.random() < 0.05:
+                feedback = f"  {feedback.replace(' ', chr(10), 1)} "
+            for category_id in rng.sample(range(1, 15), rng.randint(1, 3)):
+                records.append((f"U{unique_id:06d}", feedback, category_id, rng.choice([1, 0, -1])))
+    return pd.DataFrame(records[:rows], columns=["Unique_ID", "Feedback", "Category_ID", "Sentiments"])
+
+
+def legacy_aggregate(df, workdir):
+    """The pre-aggregation exactly as Generalization(UploadtoS3).py used to run it."""
+    series_map = (
+        df.groupby(["Unique_ID", "Feedback"])
+          .apply(lambda g: dict(zip(g["Category_ID"], g["Sentiments"])))
+    )
+    agg = series_map.to_frame("category_sentiment_map").reset_index()
+    agg["Feedback_Output"] = agg["Feedback"] + ":" + agg["category_sentiment_map"].astype(str)
+    agg_file = os.path.join(workdir, "df_agg.xlsx")
+    agg[["Unique_ID", "Feedback_Output"]].to_excel(agg_file, index=False)
+
+    DF = pd.read_excel(agg_file)
+
+    def sanitize_key(raw_key):
+        key = raw_key.strip()
+        key = re.sub(r'\s+', ' ', key)
+        key = key.replace('€', 'EUR')
+        return key
+
+    def extract_int_pairs(val):
+        pairs = {}
+        for left, right in re.findall(r'([+-]?\d+)\s*:\s*([+-]?\d+)', val):
+            pairs[int(left.lstrip("0") or "0")] = int(right)
+        return pairs
+
+    def safe_parse_row(s):
+        if ":" not in s:
+            return {}
+        key_raw, val_raw = s.split(":", 1)
+        kv_dict = extract_int_pairs(val_raw.strip("() "))
+        return {sanitize_key(key_raw): kv_dict} if kv_dict else {}
+
+    DF["feedback_dict"] = DF["Feedback_Output"].map(safe_parse_row)
+    out = (
+        DF.groupby("Unique_ID")
+          .apply(lambda g: {list(d.keys())[0]: list(d.values())[0] for d in g["feedback_dict"] if d})
+          .reset_index(name="Feedback_Output")
+    )
+    out["Feedback_Count"] = out["Feedback_Output"].apply(lambda x: len(x))
+    return out
+
+
+def same_payloads(left, right):
+    """Equal Unique_IDs, counts and prompt text (str of the ordered dict)."""
+    return (
+        left["Unique_ID"].tolist() == right["Unique_ID"].tolist()
+        and left["Feedback_Count"].tolist() == right["Feedback_Count"].tolist()
+        and left["Feedback_Output"].map(str).tolist() == right["Feedback_Output"].map(str).tolist()
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[20_000, 100_000])
+    parser.add_argument("--skip-legacy", action="store_true", help="Only time the direct path")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'legacy_s':>10} {'direct_s':>10} {'checkpoint_s':>13} {'speedup':>8} {'equal':>6}")
+    for rows in args.rows:
+        df = synthetic_sheet(rows)
+        with tempfile.TemporaryDirectory() as workdir:
+            start = time.perf_counter()
+            direct = aggregate_feedback(df, checkpoint_dir=workdir)
+            direct_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            reloaded = aggregate_feedback(df, checkpoint_dir=workdir)
+            checkpoint_s = time.perf_counter() - start
+            assert same_payloads(direct, reloaded), "checkpoint reload differs"
+
+            if args.skip_legacy:
+                print(f"{rows:>10} {'-':>10} {direct_s:>10.2f} {checkpoint_s:>13.2f} {'-':>8} {'-':>6}")
+                continue
+            start = time.perf_counter()
+            legacy = legacy_aggregate(df, workdir)
+            legacy_s = time.perf_counter() - start
+
+        equal = same_payloads(legacy, direct)
+        print(f"{rows:>10} {legacy_s:>10.2f} {direct_s:>10.2f} {checkpoint_s:>13.2f} "
+              f"{legacy_s / direct_s:>7.1f}x {str(equal):>6}")
+        if not equal:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Benchmark: end-to-end throughput of the pipelines, without AWS.
+
+For every task and size, builds synthetic feedbacks and times each stage:
+
+    build     batch-input shards + manifest from akasapulse.upload.iter_batch_requests
+              (Generalization includes aggregate_feedback)
+    upload    upload_shards into the in-memory S3 stand-in (akasapulse.fakes)
+    simulate  akasapulse.simulator answers every request (not a pipeline stage; shown for reference)
+    extract   extract_outputs + read_extracted
+    repair    repair_outputs
+    reshape   expand_categorization / expand_generalization (none for Sentiments;
+              split_combined + expand_categorization for the combined mode)
+
+``--save results.json`` stores the timings; ``--baseline results.json`` compares
+against a stored run and exits with status 1 if any stage took more than
+``--tolerance`` times its baseline time.
+
+Run from the repository root:
+    python benchmarks/pipeline_throughput.py --records 10000 100000 1000000
+    python benchmarks/pipeline_throughput.py --records 10000 --tasks sentiment --baseline results.json
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from akasapulse.extract import extract_outputs, read_extracted  # noqa: E402
+from akasapulse.fakes import FakeS3Client  # noqa: E402
+from akasapulse.generalization import aggregate_feedback  # noqa: E402
+from akasapulse.repair import repair_outputs  # noqa: E402
+from akasapulse.reshape import expand_categorization, expand_generalization, split_combined  # noqa: E402
+from akasapulse.sharding import write_shards, write_shard_manifest, upload_shards  # noqa: E402
+from akasapulse.simulator import TASKS, simulate_job  # noqa: E402
+from akasapulse.upload import iter_batch_requests  # noqa: E402
+
+WORDS = ["flight", "delayed", "crew", "friendly", "seat", "legroom", "meal", "cold", "boarding", "smooth",
+         "baggage", "lost", "refund", "app", "check-in", "on-time", "clean", "cabin", "staff", "rude", "€"]
+ID_COLUMN = {"sentiment": "Respondent_ID", "categorization": "Respondent_ID", "generalization": "Unique_ID",
+             "combined": "Respondent_ID"}
+
+
+def synthetic_feedback(records, seed=11):
+    """``records`` feedback rows (Respondent_ID, Feedback)."""
+    rng = random.Random(seed)
+    return pd.DataFrame({
+        "Respondent_ID": [f"R{i:07d}" for i in range(records)],
+        "Feedback": [" ".join(rng.choices(WORDS, k=rng.randint(4, 30))) for _ in range(records)],
+    })
+
+
+def synthetic_long_sheet(records, seed=13):
+    """``records`` Generalization sheet rows (Unique_ID, Feedback, Category_ID, Sentiments)."""
+    rng = random.Random(seed)
+    rows = []
+    unique_id = 0
+    while len(rows) < records:
+        unique_id += 1
+        for _ in range(rng.randint(1, 40)):
+            feedback = " ".join(rng.choices(WORDS, k=rng.randint(4, 30)))
+            for category_id in rng.sample(range(1, 15), rng.randint(1, 2)):
+                rows.append((f"U{unique_id:06d}", feedback, category_id, rng.choice([1, 0, -1])))
+    return pd.DataFrame(rows[:records], columns=["Unique_ID", "Feedback", "Category_ID", "Sentiments"])
+
+
+def run_pipeline(task, records, workdir, malformed_rate, workers):
+    """Timings (seconds) and request count of every stage for one task and size."""
+    timings = {}
+    df = synthetic_long_sheet(records) if task == "generalization" else synthetic_feedback(records)
+    input_dir = os.path.join(workdir, "batch_temp")
+
+    start = time.perf_counter()
+    if task == "generalization":
+        df = aggregate_feedback(df)
+    shards = write_shards(iter_batch_requests(df, task), input_dir, f"bench-{task}.jsonl")
+    manifest_file = write_shard_manifest(input_dir, f"bench-{task}.jsonl", shards, task=task)
+    timings["build"] = time.perf_counter() - start
+    requests = sum(shard["records"] for shard in shards)
+
+    start = time.perf_counter()
+    if not upload_shards([shard["path"] for shard in shards], FakeS3Client(), "bench", f"bench-{task}"):
+        raise RuntimeError("Upload failed")
+    timings["upload"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    simulate_job(manifest_file, malformed_rate=malformed_rate)
+    timings["simulate"] = time.perf_counter() - start
+
+    id_column = ID_COLUMN[task]
+    start = time.perf_counter()
+    outputs = [f"{shard['path']}.out" for shard in shards]
+    extract_df = read_extracted(extract_outputs(outputs, os.path.join(workdir, "extracted"), id_column=id_column,
+                                                workers=workers))
+    timings["extract"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    extract_df, _ = repair_outputs(extract_df, task=task, id_column=id_column)
+    timings["repair"] = time.perf_counter() - start
+
+    if task == "combined":
+        start = time.perf_counter()
+        _, categorization_df, _ = split_combined(extract_df)
+        expand_categorization(categorization_df)
+        timings["reshape"] = time.perf_counter() - start
+    elif task != "sentiment":
+        start = time.perf_counter()
+        expand = expand_categorization if task == "categorization" else expand_generalization
+        expand(extract_df)
+        timings["reshape"] = time.perf_counter() - start
+    return requests, timings
+
+
+def compare(results, baseline, tolerance):
+    """Stages that took more than ``tolerance`` times their baseline time."""
+    regressions = []
+    for key, stages in results.items():
+        for stage, seconds in stages["timings"].items():
+            previous = baseline.get(key, {}).get("timings", {}).get(stage)
+            if previous and seconds > previous * tolerance:
+                regressions.append(f"{key} {stage}: {previous:.2f}s -> {seconds:.2f}s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--tasks", nargs="+", choices=TASKS, default=list(TASKS))
+    parser.add_argument("--malformed-rate", type=float, default=0.02)
+    parser.add_argument("--workers", type=int, default=None, help="Extraction worker processes")
+    parser.add_argument("--workdir", default=None, help="Keep the generated files here (default: a temp folder)")
+    parser.add_argument("--save", help="Write the timings to this JSON file")
+    parser.add_argument("--baseline", help="JSON file from an earlier --save to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.5,
+                        help="Fail when a stage takes more than this multiple of its baseline time")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'task':<15} {'records':>9} {'requests':>9} {'stage':<9} {'seconds':>9} {'records/s':>11}")
+    for task in args.tasks:
+        for records in args.records:
+            workdir = args.workdir and os.path.join(args.workdir, f"{task}-{records}")
+            workdir = workdir or tempfile.mkdtemp(prefix=f"akasapulse-bench-{task}-")
+            try:
+                requests, timings = run_pipeline(task, records, workdir, args.malformed_rate, args.workers)
+            finally:
+                if not args.workdir:
+                    shutil.rmtree(workdir, ignore_errors=True)
+            results[f"{task}/{records}"] = {"requests": requests, "timings": timings}
+            for stage, seconds in timings.items():
+                print(f"{task:<15} {records:>9} {requests:>9} {stage:<9} {seconds:>9.2f} {records / seconds:>11,.0f}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
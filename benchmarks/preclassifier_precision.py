@@ -0,0 +1,132 @@
+"""
+Precision and coverage of the local pre-classifier (akasapulse.preclassify).
+
+With ``--feedback`` and ``--labels`` it compares the pre-classifier with the
+answers the model gave for an earlier month: the input sheet (Respondent_ID,
+Feedback; .xlsx or .parquet) against Sentiment_Analysis_Output.parquet /
+Categorization_Model_Output.parquet. The report gives, per rule, the share
+of requests it would save and how often its answer equals the model's.
+
+Without them it runs a regression check on synthetic feedbacks with known
+answers (blank, generic praise, short single-topic remarks and long mixed
+verbatims that must reach the model), then times ``filter_rows``.
+
+Run from the repository root:
+    python benchmarks/preclassifier_precision.py --task categorization \
+        --feedback feedback_batch_processing.xlsx --labels Categorization_Model_Output.parquet \
+        --min-confidence 0.85
+    python benchmarks/preclassifier_precision.py --records 100000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from akasapulse.preclassify import TASKS, PreClassifier, precision_report  # noqa: E402
+
+# (feedback, sentiment answer, categorization answer); None: the model must answer
+SAMPLES = [
+    ("NA", "Sentiment: Neutral", {"0": "0"}),
+    ("  n.a. ", "Sentiment: Neutral", {"0": "0"}),
+    ("Nothing", "Sentiment: Neutral", {"0": "0"}),
+    ("No comments.", "Sentiment: Neutral", {"0": "0"}),
+    ("", "Sentiment: Neutral", {"0": "0"}),
+    ("Good", "Sentiment: Positive", {"0": "1"}),
+    ("All good!!", "Sentiment: Positive", {"0": "1"}),
+    ("EXCELLENT", "Sentiment: Positive", {"0": "1"}),
+    ("Great place to work", "Sentiment: Positive", {"0": "1"}),
+    ("Salary is very low", "Sentiment: Negative", {"1": "-1"}),
+    ("Salary should be revised", None, {"1": "0"}),
+    ("My manager is very supportive", "Sentiment: Positive", {"10": "1"}),
+    ("Need more trainings", None, {"5": "0"}),
+    ("Cab is always late", "Sentiment: Negative", {"2": "-1"}),
+    ("Team is good but salary is low", None, None),
+    ("Manager is not supportive", None, None),
+    ("Good salary and good team", "Sentiment: Positive", None),
+    ("The rostering changes every week and there is no work life balance at all, "
+     "please fix the patterns", None, None),
+    ("I feel proud to be part of Akasa Air and the culture here", None, None),
+]
+
+
+def expected_answer(sample, task):
+    answer = sample[1] if task == "sentiment" else sample[2]
+    if answer is not None and task == "combined":
+        sentiment = {"1": "Positive", "0": "Neutral", "-1": "Negative"}[next(iter(answer.values()))]
+        answer = {"sentiment": sentiment, "categories": answer}
+    if isinstance(answer, dict):
+        return json.dumps(answer)
+    return answer
+
+
+def regression_check(records):
+    for task in TASKS:
+        classifier = PreClassifier(task, min_confidence=0.85)
+        for sample in SAMPLES:
+            result = classifier.classify(sample[0])
+            expected = expected_answer(sample, task)
+            actual = result[0] if result else None
+            assert actual == expected, f"{task}: {sample[0]!r} -> {actual!r}, expected {expected!r}"
+        # The keyword rule is off at the default threshold
+        assert PreClassifier(task).classify("Salary is very low") is None
+
+    rng = random.Random(11)
+    df = pd.DataFrame({
+        "Respondent_ID": range(records),
+        "Feedback": [rng.choice(SAMPLES)[0] for _ in range(records)],
+    })
+    print(f"{'task':<15} {'records':>9} {'answered':>9} {'sent':>9} {'seconds':>9} {'rows/s':>10}")
+    for task in TASKS:
+        classifier = PreClassifier(task, min_confidence=0.85)
+        labels = pd.DataFrame({
+            "Respondent_ID": df["Respondent_ID"],
+            "Model_Output": [expected_answer(next(s for s in SAMPLES if s[0] == text), task) or "unknown"
+                             for text in df["Feedback"]],
+        })
+        with tempfile.TemporaryDirectory(prefix="akasapulse-preclassify-") as workdir:
+            output_path = os.path.join(workdir, "preclassified.jsonl.out")
+            start = time.perf_counter()
+            sent = sum(1 for _ in classifier.filter_rows(zip(df["Respondent_ID"], df["Feedback"]), output_path))
+            seconds = time.perf_counter() - start
+            with open(output_path, encoding="utf-8") as f:
+                answered = sum(1 for _ in f)
+        assert answered + sent == records
+        print(f"{task:<15} {records:>9} {answered:>9} {sent:>9} {seconds:>9.3f} {records / seconds:>10.0f}")
+
+        report = precision_report(classifier, df, labels)
+        total = report[report["rule"] == "total"].iloc[0]
+        assert total["answered"] == answered and total["precision"] == 1.0, report
+    print("Regression check passed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--task", choices=TASKS, default="sentiment")
+    parser.add_argument("--feedback", help="Input sheet of an earlier month (.xlsx or .parquet)")
+    parser.add_argument("--labels", help="Model answers of that month (extraction output parquet)")
+    parser.add_argument("--min-confidence", type=float, default=0.9)
+    parser.add_argument("--max-words", type=int, default=8)
+    parser.add_argument("--records", type=int, default=100_000, help="Synthetic records for the regression check")
+    args = parser.parse_args()
+
+    if not (args.feedback and args.labels):
+        regression_check(args.records)
+        return
+
+    read = pd.read_parquet if args.feedback.endswith(".parquet") else pd.read_excel
+    df = read(args.feedback)
+    labels = pd.read_parquet(args.labels)
+    classifier = PreClassifier(args.task, min_confidence=args.min_confidence, max_words=args.max_words)
+    report = precision_report(classifier, df, labels)
+    print(report.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark and regression check: idempotent warehouse load (akasapulse.loader).
+
+Builds the three final tables from synthetic answers (the Sentiments output,
+``expand_categorization`` and ``expand_generalization``), loads each into a
+SQLite file and checks that
+
+* a second load of the same rows leaves the table unchanged (re-run safety),
+* after some answers change, a replace-partition load leaves exactly the new
+  rows of those partitions (categories that disappeared are deleted),
+
+then prints rows/s for each load.
+
+Run from the repository root:
+    python benchmarks/warehouse_load.py --records 10000 100000
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+from functools import partial
+
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from akasapulse.loader import TABLES, load_task_output, warehouse_frame  # noqa: E402
+from akasapulse.reshape import expand_categorization, expand_generalization  # noqa: E402
+from extraction_reshape import synthetic_categorization, synthetic_generalization  # noqa: E402
+
+SENTIMENTS = ["Positive", "Negative", "Neutral"]
+
+
+def synthetic_sentiment(records, seed=7):
+    rng = random.Random(seed)
+    return pd.DataFrame({
+        "Respondent_ID": [f"R{i:07d}" for i in range(records)],
+        "Sentiment": [rng.choice(SENTIMENTS) for _ in range(records)],
+        "Prompt_Version": "sentiment-v1",
+    })
+
+
+def final_tables(records, seed=0):
+    """Final table of every task; ``seed`` changes the answers."""
+    categorization, _ = expand_categorization(synthetic_categorization(records, seed=3 + seed))
+    generalization, _ = expand_generalization(synthetic_generalization(records // 10, seed=5 + seed))
+    return {
+        "sentiment": synthetic_sentiment(records, seed=7 + seed),
+        "categorization": categorization,
+        "generalization": generalization,
+    }
+
+
+def read_table(path, table, df):
+    """Table contents in a canonical order with ``df``'s dtypes, for comparison."""
+    with sqlite3.connect(path) as connection:
+        stored = pd.read_sql_query(f"SELECT * FROM {table}", connection)
+    columns = list(df.columns)
+    stored = stored.astype({column: df[column].dtype for column in columns if df[column].dtype.kind in "iuf"})
+    return stored.sort_values(columns, ignore_index=True, na_position="first")
+
+
+def canonical(df):
+    df = df.astype(object).where(df.notna(), None)
+    return df.sort_values(list(df.columns), ignore_index=True, na_position="first", key=lambda c: c.astype(str))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    print(f"{'task':<15} {'records':>9} {'rows':>9} {'load':<9} {'seconds':>9} {'rows/s':>10}")
+    for records in args.records:
+        workdir = tempfile.mkdtemp(prefix="akasapulse-load-")
+        path = os.path.join(workdir, "warehouse.sqlite")
+        connect = partial(sqlite3.connect, path)
+        try:
+            first, changed = final_tables(records), final_tables(records, seed=1)
+            for task, df in first.items():
+                table = f"{task}_final"
+                key_columns = TABLES[task]["key_columns"]
+                # Only part of the month is re-answered in the second run
+                subset = changed[task][changed[task][key_columns[0]].isin(df[key_columns[0]].drop_duplicates()[::3])]
+                expected = pd.concat([df[~df[key_columns[0]].isin(subset[key_columns[0]])], subset])
+
+                for load, rows in (("initial", df), ("rerun", df), ("changed", subset)):
+                    report = load_task_output(connect, task, table, rows, dialect="sqlite",
+                                              chunk_size=args.chunk_size, create=True)
+                    print(f"{task:<15} {records:>9} {report['rows']:>9} {load:<9} "
+                          f"{report['seconds']:>9.2f} {report['rows_per_second']:>10,}")
+                    if load == "rerun":
+                        # Stored with the warehouse's column names and values (see TABLES)
+                        written = warehouse_frame(task, df)
+                        stored = read_table(path, table, written)
+                        assert_frame_equal(canonical(stored), canonical(written), check_dtype=False)
+                expected = warehouse_frame(task, expected)
+                stored = read_table(path, table, expected)
+                assert_frame_equal(canonical(stored), canonical(expected), check_dtype=False)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import json
+
+from akasapulse.cache import ResultCache
+
+ROWS = [("R1", "Salary is low!"), ("R2", "late cab")]
+
+
+def _send(cache, job_id, prompt_version, hits_path, rows=ROWS):
+    return list(cache.filter_rows(rows, prompt_version, "model", job_id, str(hits_path)))
+
+
+def test_answers_are_reused_for_the_same_prompt_version_only(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.sqlite"))
+
+    assert _send(cache, "job-1", "v1", tmp_path / "job-1-cached.jsonl.out") == ROWS
+    stored = cache.resolve_pending("job-1", [{"Respondent_ID": "R1", "Model_Output": '{"1": "-1"}'},
+                                             {"Respondent_ID": "R2", "Model_Output": '{"8": "-1"}'}])
+    assert stored == 2
+
+    # Same normalised feedback and prompt version: answered from the cache, in the .jsonl.out shape
+    sent = _send(cache, "job-2", "v1", tmp_path / "job-2-cached.jsonl.out", [("R7", "salary is low"), ("R8", "new")])
+    assert sent == [("R8", "new")]
+    hits = [json.loads(line) for line in (tmp_path / "job-2-cached.jsonl.out").read_text().splitlines()]
+    assert [(hit["recordId"], hit["modelOutput"]["output"]["message"]["content"][0]["text"]) for hit in hits] == [
+        ("R7", '{"1": "-1"}')
+    ]
+
+    # A new prompt version misses every entry
+    assert _send(cache, "job-3", "v2", tmp_path / "job-3-cached.jsonl.out") == ROWS
+    stats = cache.stats()
+    assert (stats["session_hits"], stats["session_misses"], stats["entries"]) == (1, 5, 2)
+    cache.close()
+
+
+def test_invalid_answers_are_not_cached(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.sqlite"))
+    _send(cache, "job-1", "v1", tmp_path / "job-1-cached.jsonl.out")
+
+    stored = cache.resolve_pending("job-1", [{"Respondent_ID": "R1", "Model_Output": "not json"},
+                                             {"Respondent_ID": "R2", "Model_Output": '{"8": "-1"}'}],
+                                   is_valid=lambda output: output.startswith("{"))
+
+    assert stored == 1
+    assert _send(cache, "job-2", "v1", tmp_path / "job-2-cached.jsonl.out") == [ROWS[0]]
+    cache.close()
@@ -0,0 +1,81 @@
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+from akasapulse import cli
+from akasapulse.fakes import FakeBedrockClient, FakeS3Client
+from akasapulse.orchestrator import BatchJobRunner
+from akasapulse.simulator import SimulatedModel, simulate_job
+from akasapulse.tasks import task_settings
+
+
+@pytest.fixture
+def sheet(tmp_path):
+    path = tmp_path / "feedback.csv"
+    pd.DataFrame({"Respondent_ID": [f"R{i}" for i in range(6)],
+                  "Feedback": ["late cab", "rude driver", "good food", "salary is low", "nil", "need more trainings"]}
+                 ).to_csv(path, index=False)
+    return str(path)
+
+
+def _fake_runner(monkeypatch, task):
+    def runner(args, clients=None):
+        s3 = FakeS3Client()
+        bedrock = FakeBedrockClient(s3, model=SimulatedModel(task))
+        return BatchJobRunner(bedrock, s3, args.role_arn, args.model_id, sleep=lambda seconds: None)
+
+    monkeypatch.setattr(cli, "_runner", runner)
+
+
+def test_help_does_not_import_the_pipeline():
+    code = ("import sys; from akasapulse import cli; cli.build_parser().format_help(); "
+            "print(sorted(m for m in ('pandas', 'numpy', 'pyarrow', 'boto3') if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
+
+    result = subprocess.run([sys.executable, "-m", "akasapulse", "categorization", "run", "--help"],
+                            capture_output=True, text=True)
+    assert result.returncode == 0
+    assert "--pack-size" in result.stdout
+
+
+def test_run_uploads_and_extracts_in_one_process(tmp_path, monkeypatch, sheet):
+    _fake_runner(monkeypatch, "sentiment")
+    results_dir = tmp_path / "results"
+
+    assert cli.main(["sentiment", "run", "--input", sheet, "--output-dir", str(tmp_path / "batch"),
+                     "--extracted-dir", str(tmp_path / "extracted"), "--results-dir", str(results_dir),
+                     "--preclassify", "--metrics-file", str(tmp_path / "metrics.sqlite")]) == 0
+
+    output = pd.read_parquet(results_dir / task_settings("sentiment")["output_file"])
+    assert sorted(output["Respondent_ID"]) == [f"R{i}" for i in range(6)]
+    assert output["Model_Output"].str.startswith("Sentiment: ").all()
+
+
+def test_prepared_input_is_extracted_by_the_extract_stage(tmp_path, monkeypatch, sheet, capsys):
+    _fake_runner(monkeypatch, "categorization")
+    batch_dir = tmp_path / "batch"
+
+    assert cli.main(["categorization", "upload", "--input", sheet, "--output-dir", str(batch_dir), "--pack-size", "4",
+                     "--no-submit"]) == 0
+    assert "Input ready for `python -m akasapulse jobs run`" in capsys.readouterr().out
+    (manifest_file,) = batch_dir.glob("*.manifest.json")
+    simulate_job(str(manifest_file))
+
+    assert cli.main(["categorization", "extract", "--manifest", str(manifest_file),
+                     "--extracted-dir", str(tmp_path / "extracted"), "--results-dir", str(tmp_path)]) == 0
+    final = pd.read_parquet(tmp_path / task_settings("categorization")["final_file"])
+    assert set(final["Respondent_ID"]) == {f"R{i}" for i in range(6)}
+
+
+@pytest.mark.parametrize("argv,message", [
+    (["sentiment", "run", "--input", "x.csv", "--no-submit"], "use upload --no-submit"),
+    (["sentiment", "extract", "--incremental-state", "state.sqlite"], "requires --period"),
+    (["sentiment", "extract"], "--manifest or --output-files is required"),
+])
+def test_invalid_combinations_exit_with_a_message(tmp_path, monkeypatch, argv, message):
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(SystemExit, match=message):
+        cli.main(argv)
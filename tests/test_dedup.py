@@ -0,0 +1,65 @@
+import numpy as np
+
+from akasapulse.dedup import _MERSENNE_PRIME, _shingles, collapse_duplicates, minhash_signatures
+
+
+def test_negated_feedback_is_not_merged():
+    rows = [
+        ("1", "Salary is good and the work life balance is fine for me"),
+        ("2", "Salary is not good and the work life balance is fine for me"),
+    ]
+    representatives, clusters, report = collapse_duplicates(rows, threshold=0.85)
+    assert clusters == {}
+    assert [rid for rid, _ in representatives] == ["1", "2"]
+    assert report["near_duplicates"] == 0
+
+
+def test_contrast_word_blocks_merge():
+    rows = [
+        ("1", "crew was friendly and boarding was smooth today"),
+        ("2", "crew was friendly but boarding was smooth today"),
+    ]
+    assert collapse_duplicates(rows, threshold=0.8)[1] == {}
+
+
+def test_exact_and_reordered_duplicates_are_merged():
+    rows = [
+        ("1", "Very good!"),
+        ("2", "good"),
+        ("3", "the cab is always late and the driver is rude"),
+        ("4", "the driver is rude and the cab is always late"),
+    ]
+    _, clusters, report = collapse_duplicates(rows, threshold=0.5)
+    assert clusters == {"1": ["1", "2"], "3": ["3", "4"]}
+    assert report["exact_duplicates"] == 1 and report["near_duplicates"] == 1
+
+
+
+def test_spelling_and_spacing_variants_are_merged():
+    rows = [
+        ("1", "Management needs revision of policies"),
+        ("2", "Management need revision of policies"),
+        ("3", "the workplace is not clean"),
+        ("4", "the work place is not clean"),
+    ]
+    _, clusters, report = collapse_duplicates(rows, threshold=0.7)
+    assert clusters == {"1": ["1", "2"], "3": ["3", "4"]}
+    assert report["near_duplicates"] == 2
+
+
+def test_negation_blocks_merge_of_similar_keys():
+    # 4-gram similarity alone would merge the second pair at this threshold
+    for rows in ([("1", "good"), ("2", "not good")], [("1", "food is good"), ("2", "food is not good")]):
+        assert collapse_duplicates(rows, threshold=0.3)[1] == {}
+
+def test_minhash_matches_exact_universal_hash():
+    keys = ["salary is low", "need more trainings"]
+    signatures = minhash_signatures(keys, num_perm=16, seed=3)
+    rng = np.random.default_rng(3)
+    a = [int(v) for v in rng.integers(1, 1 << 32, size=16, dtype=np.uint64)]
+    b = [int(v) for v in rng.integers(0, 1 << 32, size=16, dtype=np.uint64)]
+    p = int(_MERSENNE_PRIME)
+    for row, key in zip(signatures, keys):
+        shingles = [int(x) for x in _shingles(key)]
+        expected = [min((a_i * x + b_i) % p for x in shingles) for a_i, b_i in zip(a, b)]
+        assert [int(v) for v in row] == expected
@@ -0,0 +1,61 @@
+import json
+
+import pandas as pd
+
+from akasapulse import generalization
+from akasapulse.generalization import CHECKPOINT_FINGERPRINT, aggregate_feedback
+
+
+def _sheet(sentiment=1):
+    return pd.DataFrame({
+        "Unique_ID": ["A", "A", "B"],
+        "Feedback": ["late cab", "late cab", "rude driver"],
+        "Category_ID": [3, 5, 7],
+        "Sentiments": [-1, sentiment, -1],
+    })
+
+
+def _count_builds(monkeypatch):
+    calls = []
+    build_pairs = generalization.build_pairs
+
+    def counted(*args, **kwargs):
+        calls.append(1)
+        return build_pairs(*args, **kwargs)
+
+    monkeypatch.setattr(generalization, "build_pairs", counted)
+    return calls
+
+
+def test_checkpoint_is_reused_for_the_same_input(tmp_path, monkeypatch):
+    calls = _count_builds(monkeypatch)
+    first = aggregate_feedback(_sheet(), checkpoint_dir=str(tmp_path), period="2026-01")
+    second = aggregate_feedback(_sheet(), checkpoint_dir=str(tmp_path), period="2026-01")
+
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(first, second)
+    fingerprint = json.loads((tmp_path / CHECKPOINT_FINGERPRINT).read_text(encoding="utf-8"))
+    assert fingerprint["period"] == "2026-01"
+    assert fingerprint["rows"] == 3
+
+
+def test_checkpoint_is_rebuilt_when_the_input_changes(tmp_path, monkeypatch):
+    calls = _count_builds(monkeypatch)
+    aggregate_feedback(_sheet(), checkpoint_dir=str(tmp_path), period="2026-01")
+    changed = aggregate_feedback(_sheet(sentiment=-1), checkpoint_dir=str(tmp_path), period="2026-01")
+    other_month = aggregate_feedback(_sheet(sentiment=-1), checkpoint_dir=str(tmp_path), period="2026-02")
+
+    assert len(calls) == 3
+    assert changed.set_index("Unique_ID").loc["A", "Feedback_Output"] == {"late cab": {3: -1, 5: -1}}
+    pd.testing.assert_frame_equal(changed, other_month)
+
+
+def test_checkpoint_without_fingerprint_is_rebuilt(tmp_path, monkeypatch):
+    aggregate_feedback(_sheet(), checkpoint_dir=str(tmp_path), period="2026-01")
+    (tmp_path / CHECKPOINT_FINGERPRINT).unlink()
+    calls = _count_builds(monkeypatch)
+
+    aggregate_feedback(_sheet(), checkpoint_dir=str(tmp_path), period="2026-01")
+
+    assert len(calls) == 1
+    assert (tmp_path / CHECKPOINT_FINGERPRINT).exists()
@@ -0,0 +1,51 @@
+import pandas as pd
+
+from akasapulse.incremental import IncrementalState
+
+
+def _month(*extra):
+    rows = [(1, "late cab"), (2, "rude driver"), (10, "good food"), *extra]
+    return pd.DataFrame(rows, columns=["Respondent_ID", "Feedback"])
+
+
+def _select(state, df, task="sentiment", period="2026-01", id_column="Respondent_ID", columns=("Feedback",)):
+    return state.select_changes(df, task, period, id_column, list(columns))
+
+
+def test_only_new_changed_or_unanswered_records_are_sent_again(tmp_path):
+    state = IncrementalState(str(tmp_path / "state.sqlite"))
+    assert _select(state, _month())["Respondent_ID"].tolist() == [1, 2, 10]
+    # Respondent 2 got no usable answer
+    assert state.mark_done("sentiment", "2026-01", ["1", "10"]) == 2
+    assert state.watermark("sentiment", "2026-01") == "10"
+
+    late = _month((11, "salary is low"))
+    late.loc[late["Respondent_ID"] == 10, "Feedback"] = "food is cold"
+    assert _select(state, late)["Respondent_ID"].tolist() == [2, 10, 11]
+    assert state.stats("sentiment", "2026-01")["pending"] == 3
+
+    # Other tasks and periods keep their own records
+    assert len(_select(state, late, period="2026-02")) == 4
+    assert state.watermark("categorization", "2026-01") is None
+    state.close()
+
+
+def test_generalization_group_is_resent_only_when_its_set_changes(tmp_path):
+    state = IncrementalState(str(tmp_path / "state.sqlite"))
+    sheet = pd.DataFrame({
+        "Unique_ID": ["A", "A", "B"],
+        "Feedback": ["late cab", "rude driver", "good food"],
+        "Category_Name": ["Operational Effectiveness", "Team", "Work Place Amenities"],
+        "Sentiments": [-1, -1, 1],
+    })
+    columns = ["Feedback", "Category_Name", "Sentiments"]
+    _select(state, sheet, "generalization", id_column="Unique_ID", columns=columns)
+    state.mark_done("generalization", "2026-01", ["A", "B"])
+
+    # Row order does not matter; a late response in group B does
+    reordered = sheet.iloc[::-1]
+    late_response = pd.DataFrame([["B", "no parking", "Work Place Amenities", -1]], columns=sheet.columns)
+    late = pd.concat([reordered, late_response])
+    selected = _select(state, late, "generalization", id_column="Unique_ID", columns=columns)
+    assert selected["Unique_ID"].tolist() == ["B", "B"]
+    state.close()
@@ -0,0 +1,145 @@
+import sqlite3
+from functools import partial
+
+import pandas as pd
+import pytest
+
+from akasapulse.loader import LoadError, load_dataframe, load_task_output
+
+
+class _FailingConnection:
+    """sqlite3 connection whose ``fail_on``-th INSERT (counted across connections) raises once."""
+
+    def __init__(self, connection, counter, fail_on):
+        self._connection = connection
+        self._counter = counter
+        self._fail_on = fail_on
+
+    def cursor(self):
+        cursor = self._connection.cursor()
+        counter, fail_on = self._counter, self._fail_on
+
+        class _Cursor:
+            def execute(self, sql, params=()):
+                if sql.startswith("INSERT"):
+                    counter.append(sql)
+                    if len(counter) == fail_on:
+                        raise sqlite3.OperationalError("injected failure")
+                return cursor.execute(sql, params)
+
+        return _Cursor()
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+def _failing_connect(path, fail_on):
+    counter = []
+    return lambda: _FailingConnection(sqlite3.connect(path), counter, fail_on)
+
+
+def _rows(path, table, order_by):
+    with sqlite3.connect(path) as connection:
+        return connection.execute(f"SELECT * FROM {table} ORDER BY {order_by}").fetchall()
+
+
+def _sentiments(label="Positive"):
+    return pd.DataFrame({
+        "Respondent_ID": [f"R{i}" for i in range(10)],
+        "Sentiment": [label] * 10,
+        "Score": [float(i) for i in range(10)],
+    })
+
+
+def _categories(sentiment="Positive", categories=(1, 2)):
+    return pd.DataFrame(
+        [(f"R{i}", category, sentiment) for i in range(6) for category in categories],
+        columns=["Respondent_ID", "Category_ID", "Sentiment"],
+    )
+
+
+OPTIONS = {"dialect": "sqlite", "chunk_size": 4, "rows_per_statement": 2}
+
+
+def test_upsert_twice_keeps_row_counts(tmp_path):
+    path = str(tmp_path / "warehouse.sqlite")
+    connect = partial(sqlite3.connect, path)
+
+    first = load_task_output(connect, "sentiment", "Feedback_Sentiment", _sentiments(), create=True, **OPTIONS)
+    second = load_task_output(connect, "sentiment", "Feedback_Sentiment", _sentiments("Negative"), create=True,
+                              **OPTIONS)
+
+    assert first["rows"] == second["rows"] == 10
+    assert first["chunks"] == 3
+    rows = _rows(path, "Feedback_Sentiment", "Respondent_ID")
+    assert len(rows) == 10
+    assert {row[1] for row in rows} == {"Negative"}
+
+
+def test_replace_partition_twice_keeps_row_counts(tmp_path):
+    path = str(tmp_path / "warehouse.sqlite")
+    connect = partial(sqlite3.connect, path)
+
+    load_task_output(connect, "categorization", "Category_Sentiment", _categories(), create=True, **OPTIONS)
+    report = load_task_output(connect, "categorization", "Category_Sentiment", _categories(), create=True, **OPTIONS)
+    assert report["chunks"] == 3
+    assert len(_rows(path, "Category_Sentiment", "Respondent_ID, Category_Name")) == 12
+
+    # A category that disappeared from an answer disappears from the table
+    load_task_output(connect, "categorization", "Category_Sentiment", _categories("Negative", (2,)), **OPTIONS)
+    rows = _rows(path, "Category_Sentiment", "Respondent_ID, Category_Name")
+    assert rows == [(f"R{i}", "Employee Policies & Benefits", "Negative") for i in range(6)]
+
+
+def test_categorization_is_written_with_the_warehouse_columns(tmp_path):
+    path = str(tmp_path / "warehouse.sqlite")
+    with sqlite3.connect(path) as connection:
+        connection.execute("CREATE TABLE Category_Sentiment (Respondent_ID TEXT, Category_Name TEXT, Sentiments TEXT)")
+    connect = partial(sqlite3.connect, path)
+
+    report = load_task_output(connect, "categorization", "Category_Sentiment", _categories("-1", (0, 1, 13)),
+                              **OPTIONS)
+
+    assert report["rows"] == 18
+    rows = _rows(path, "Category_Sentiment", "Respondent_ID, Category_Name")
+    assert rows[:3] == [
+        ("R0", "Compensation", "-1"), ("R0", "Others", "-1"), ("R0", "Pride and Brand association", "-1")
+    ]
+    with pytest.raises(ValueError, match=r"Category_ID values \[99\]"):
+        load_task_output(connect, "categorization", "Category_Sentiment", _categories("-1", (1, 99)), **OPTIONS)
+
+
+def test_failed_upsert_chunk_can_be_rerun(tmp_path):
+    path = str(tmp_path / "warehouse.sqlite")
+    df = _sentiments()
+
+    # Third INSERT = first statement of the second chunk
+    with pytest.raises(LoadError, match="Chunk 2/3"):
+        load_dataframe(_failing_connect(path, fail_on=3), "Feedback_Sentiment", df, ["Respondent_ID"],
+                       create=True, **OPTIONS)
+    assert [row[0] for row in _rows(path, "Feedback_Sentiment", "Respondent_ID")] == ["R0", "R1", "R2", "R3"]
+
+    report = load_dataframe(partial(sqlite3.connect, path), "Feedback_Sentiment", df, ["Respondent_ID"], **OPTIONS)
+    assert report["rows"] == 10
+    assert len(_rows(path, "Feedback_Sentiment", "Respondent_ID")) == 10
+
+
+def test_failed_replace_partition_chunk_is_rolled_back_and_rerun(tmp_path):
+    path = str(tmp_path / "warehouse.sqlite")
+    load_dataframe(partial(sqlite3.connect, path), "Category_Sentiment", _categories(), ["Respondent_ID"],
+                   mode="replace-partition", create=True, **OPTIONS)
+    new = _categories("Negative")
+
+    # Fourth INSERT = second statement of the second chunk, after its DELETE and first INSERT
+    with pytest.raises(LoadError, match="Chunk 2/3"):
+        load_dataframe(_failing_connect(path, fail_on=4), "Category_Sentiment", new, ["Respondent_ID"],
+                       mode="replace-partition", **OPTIONS)
+    rows = _rows(path, "Category_Sentiment", "Respondent_ID, Category_ID")
+    assert len(rows) == 12
+    assert {row[0] for row in rows if row[2] == "Negative"} == {"R0", "R1"}
+
+    load_dataframe(partial(sqlite3.connect, path), "Category_Sentiment", new, ["Respondent_ID"],
+                   mode="replace-partition", **OPTIONS)
+    rows = _rows(path, "Category_Sentiment", "Respondent_ID, Category_ID")
+    assert len(rows) == 12
+    assert {row[2] for row in rows} == {"Negative"}
@@ -0,0 +1,74 @@
+import json
+
+import pandas as pd
+
+from akasapulse.batch_io import read_input_manifest, write_input_manifest
+from akasapulse.mapreduce import MAP_MAX_TOKENS, iter_map_requests, write_reduce_batch
+
+
+def _payload(count, prefix):
+    return {f"{prefix} feedback {i}": {"3": -1} for i in range(count)}
+
+
+def _summary(issue):
+    return json.dumps({"3": {"-1": [issue]}})
+
+
+def _map_job(tmp_path, max_feedbacks=3):
+    partials, group_sizes = {}, {}
+    requests = [json.loads(request) for request in iter_map_requests(
+        [("A", _payload(2, "a")), ("B", _payload(7, "b"))], partials=partials, max_feedbacks=max_feedbacks,
+        group_sizes=group_sizes
+    )]
+    manifest_file = write_input_manifest(str(tmp_path / "map.jsonl"), task="generalization", partials=partials)
+    return requests, partials, group_sizes, manifest_file
+
+
+def _record_ids(manifest_file):
+    manifest = read_input_manifest(manifest_file)
+    return [record_id for shard in manifest["shards"] for record_id in shard["record_ids"]]
+
+
+def test_large_groups_are_mapped_in_bounded_chunks(tmp_path):
+    requests, partials, group_sizes, _ = _map_job(tmp_path)
+
+    assert [request["recordId"] for request in requests] == ["A", "B::map-0001", "B::map-0002", "B::map-0003"]
+    assert group_sizes == {"A": 2, "B::map-0001": 3, "B::map-0002": 3, "B::map-0003": 1}
+    assert partials["B::map-0003"] == {"unique_id": "B", "feedbacks": 1, "level": 0}
+    assert "A" not in partials
+    assert {request["modelInput"]["inferenceConfig"]["maxTokens"] for request in requests} == {MAP_MAX_TOKENS}
+
+
+def test_partials_are_reduced_level_by_level(tmp_path):
+    _, partials, _, manifest_file = _map_job(tmp_path)
+    outputs = pd.DataFrame({"Unique_ID": ["A", *partials], "Model_Output": [_summary(f"issue {i}") for i in range(4)]})
+
+    # Three chunk answers, two per reduce request: one intermediate level first
+    final_df, reduce_manifest = write_reduce_batch(manifest_file, outputs, max_partials=2, output_dir=str(tmp_path))
+    assert final_df["Unique_ID"].tolist() == ["A"]
+    assert _record_ids(reduce_manifest) == ["B::reduce1-0001", "B::reduce1-0002"]
+    assert read_input_manifest(reduce_manifest)["partials"]["B::reduce1-0001"]["feedbacks"] == 6
+
+    reduced = pd.DataFrame({"Unique_ID": ["B::reduce1-0001", "B::reduce1-0002"],
+                            "Model_Output": [_summary("late cab"), _summary("rude driver")]})
+    outputs = pd.concat([outputs, reduced], ignore_index=True)
+    _, last_manifest = write_reduce_batch(reduce_manifest, outputs, max_partials=2, output_dir=str(tmp_path))
+    # The last level answers under the Unique_ID itself
+    assert _record_ids(last_manifest) == ["B"]
+
+    outputs = pd.concat([outputs, pd.DataFrame({"Unique_ID": ["B"], "Model_Output": [_summary("late cab")]})])
+    final_df, reduce_manifest = write_reduce_batch(last_manifest, outputs, max_partials=2, output_dir=str(tmp_path))
+    assert final_df["Unique_ID"].tolist() == ["A", "B"]
+    assert reduce_manifest is None
+
+
+def test_group_with_missing_partials_waits_for_the_retry(tmp_path):
+    _, partials, _, manifest_file = _map_job(tmp_path)
+    answered = list(partials)[:2]
+    outputs = pd.DataFrame({"Unique_ID": answered, "Model_Output": [_summary("late cab")] * 2})
+
+    final_df, reduce_manifest = write_reduce_batch(manifest_file, outputs, output_dir=str(tmp_path))
+    assert final_df.empty and reduce_manifest is None
+
+    _, reduce_manifest = write_reduce_batch(manifest_file, outputs, output_dir=str(tmp_path), allow_incomplete=True)
+    assert _record_ids(reduce_manifest) == ["B"]
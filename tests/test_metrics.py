@@ -0,0 +1,66 @@
+import pandas as pd
+
+from akasapulse.extract import read_usage
+from akasapulse.metrics import MAX_OUTPUT_TOKENS, MaxTokensPolicy, MetricsStore
+from akasapulse.prompts import encode_batch_request
+from akasapulse.tasks import default_max_tokens, task_settings
+from akasapulse.upload import adaptive_max_tokens_policy
+
+
+def _history(store, task, sizes, tokens_per_feedback=10):
+    """One job of ``task`` whose answers used ``tokens_per_feedback`` output tokens per feedback."""
+    store.register_job("job-1", task)
+    record_ids = [f"r{i}" for i in range(len(sizes))]
+    requests = [encode_batch_request(record_id, "{}", max_tokens=100) for record_id in record_ids]
+    list(store.record_requests(requests, "job-1", group_sizes=dict(zip(record_ids, sizes))))
+    store.record_outputs("job-1", pd.DataFrame({
+        "Respondent_ID": record_ids,
+        "Input_Tokens": [50] * len(sizes),
+        "Output_Tokens": [size * tokens_per_feedback for size in sizes],
+        "Output_Chars": [size * 40 for size in sizes],
+        "Stop_Reason": ["end_turn"] * len(sizes),
+    }))
+
+
+def test_calibrated_max_tokens_scale_with_the_group_size(tmp_path):
+    store = MetricsStore(str(tmp_path / "metrics.sqlite"))
+    _history(store, "categorization", [8, 9, 12, 15] * 60)
+    policy = store.max_tokens_policy("categorization", default=None)
+    store.close()
+
+    # 8 and 15 share the bucket 8-15 but not the reservation
+    assert policy(8) == 100
+    assert policy(15) == 188
+    assert policy(15) >= 15 * 10
+    assert policy(4) is None
+
+
+def test_policy_keeps_its_floor_and_ceiling():
+    policy = MaxTokensPolicy({1: 2.0, 256: 40.0}, default=100)
+
+    assert policy(1) == 16
+    assert policy(300) == MAX_OUTPUT_TOKENS
+    assert policy(2) == 100
+
+
+def test_upload_entry_points_share_the_default(tmp_path):
+    store = MetricsStore(str(tmp_path / "metrics.sqlite"))
+    sentiment = adaptive_max_tokens_policy(store, task_settings("sentiment")["prompt"].compile(), "sentiment")
+    generalization_prompt = task_settings("generalization")["prompt"].compile()
+    generalization = adaptive_max_tokens_policy(store, generalization_prompt, "generalization")
+    store.close()
+
+    # Without history: the request builders' own reservation for single and packed requests,
+    # the fixed Feedback_Count rule for Generalization
+    assert sentiment(1) is None
+    assert sentiment(10) is None
+    assert generalization(400) == default_max_tokens(400)
+
+
+def test_job_without_output_files_records_no_usage(tmp_path):
+    usage = read_usage([], id_column="Unique_ID")
+    assert list(usage.columns) == ["Unique_ID", "Input_Tokens", "Output_Tokens", "Output_Chars", "Stop_Reason"]
+
+    store = MetricsStore(str(tmp_path / "metrics.sqlite"))
+    store.register_job("job-1", "generalization")
+    assert store.record_outputs("job-1", usage, id_column="Unique_ID") == 0
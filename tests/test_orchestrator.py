@@ -0,0 +1,103 @@
+import json
+import os
+
+import pytest
+from botocore.exceptions import EndpointConnectionError
+
+from akasapulse.fakes import FakeBedrockClient, FakeS3Client, _client_error
+from akasapulse.orchestrator import BatchJobError, BatchJobRunner, JobState, job_spec, run_batch_jobs
+
+
+def _throttled():
+    return _client_error("ThrottlingException", "Rate exceeded", "GetModelInvocationJob")
+
+
+def _spec(tmp_path, name="job-1"):
+    input_file = tmp_path / f"{name}.jsonl"
+    records = [
+        {"recordId": str(i), "modelInput": {"messages": [{"role": "user", "content": [{"text": f"feedback {i}"}]}]}}
+        for i in range(3)
+    ]
+    input_file.write_text("\n".join(json.dumps(record) for record in records) + "\n", encoding="utf-8")
+    return job_spec(name, "bucket", "temp-batch-inference", str(tmp_path / "out"), input_files=[str(input_file)])
+
+
+def _runner(bedrock, s3, state, **kwargs):
+    return BatchJobRunner(bedrock, s3, "arn:aws:iam::000000000000:role/test", "model", state=state,
+                          sleep=lambda seconds: None, **kwargs)
+
+
+def test_transient_poll_errors_are_retried(tmp_path):
+    s3 = FakeS3Client()
+    bedrock = FakeBedrockClient(s3, poll_errors=[_throttled(), EndpointConnectionError(endpoint_url="https://bedrock"),
+                                                 _throttled()])
+    entry = _runner(bedrock, s3, JobState(path=None), max_poll_errors=3).run(_spec(tmp_path))
+
+    assert entry["stage"] == "done"
+    assert entry["status"] == "Completed"
+    assert [os.path.basename(path) for path in entry["output_files"]] == ["job-1.jsonl.out"]
+    assert bedrock.poll_errors == []
+
+
+def test_persistent_poll_errors_stop_the_job_and_resume_continues(tmp_path):
+    s3 = FakeS3Client()
+    state = JobState(path=str(tmp_path / "state.json"))
+    spec = _spec(tmp_path)
+    bedrock = FakeBedrockClient(s3, poll_errors=[_throttled() for _ in range(4)])
+
+    with pytest.raises(BatchJobError, match="interrupted at stage submitted"):
+        _runner(bedrock, s3, state, max_poll_errors=3).run(spec)
+    # The stage and the error are on disk, so a new process resumes from them
+    entry = JobState(path=str(tmp_path / "state.json")).get("job-1")
+    assert entry["stage"] == "submitted"
+    assert "ThrottlingException" in entry["last_error"]
+
+    bedrock.poll_errors.clear()
+    results = run_batch_jobs(_runner(bedrock, s3, JobState(path=str(tmp_path / "state.json"))), [spec])
+
+    assert results["job-1"]["stage"] == "done"
+    assert results["job-1"]["last_error"] is None
+    assert bedrock.created == 1
+
+
+def test_connection_errors_are_wrapped_with_the_state_saved(tmp_path):
+    s3 = FakeS3Client()
+    state = JobState(path=None)
+    bedrock = FakeBedrockClient(s3, poll_errors=[EndpointConnectionError(endpoint_url="https://bedrock")] * 2)
+
+    results = run_batch_jobs(_runner(bedrock, s3, state, max_poll_errors=1), [_spec(tmp_path)])
+
+    assert isinstance(results["job-1"], BatchJobError)
+    assert state.get("job-1")["stage"] == "submitted"
+    assert "EndpointConnectionError" in state.get("job-1")["last_error"]
+    assert [entry["name"] for entry in state.unfinished()] == ["job-1"]
+
+
+def test_permanent_errors_are_not_retried(tmp_path):
+    s3 = FakeS3Client()
+    denied = _client_error("AccessDeniedException", "Not allowed", "GetModelInvocationJob")
+    bedrock = FakeBedrockClient(s3, poll_errors=[denied, _throttled()])
+
+    with pytest.raises(BatchJobError, match="Not allowed"):
+        _runner(bedrock, s3, JobState(path=None)).run(_spec(tmp_path))
+    assert len(bedrock.poll_errors) == 1
+
+
+def test_failed_upload_resumes_from_pending(tmp_path):
+    spec = _spec(tmp_path)
+    s3 = FakeS3Client(fail_keys={"temp-batch-inference/job-1/job-1.jsonl"})
+    bedrock = FakeBedrockClient(s3)
+    state = JobState(path=None)
+
+    with pytest.raises(BatchJobError):
+        _runner(bedrock, s3, state).run(spec)
+    assert state.get("job-1")["stage"] == "pending"
+    assert bedrock.created == 0
+
+    s3.fail_keys.clear()
+    entry = _runner(bedrock, s3, state).run(spec)
+
+    assert entry["stage"] == "done"
+    assert bedrock.created == 1
+    # Cleanup removed the job's input and output objects
+    assert s3.objects == {}
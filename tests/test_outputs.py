@@ -0,0 +1,67 @@
+import os
+
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from akasapulse.batch_io import manifest_path
+from akasapulse.outputs import extract_task
+from akasapulse.simulator import simulate_job
+from akasapulse.tasks import task_settings
+from akasapulse.upload import create_local_batch_input_shards
+
+WORDS = ["late", "cab", "rude", "driver", "good", "salary", "food", "bad"]
+
+
+def _feedback(records=60):
+    feedback = [" ".join(WORDS[(i + k) % len(WORDS)] for k in range(1 + i % 5)) for i in range(records)]
+    # Exact repeats, collapsed by dedup and fanned out again at extraction
+    feedback += feedback[:10]
+    return pd.DataFrame({"Respondent_ID": [f"R{i}" for i in range(len(feedback))], "Feedback": feedback})
+
+
+@pytest.mark.parametrize("task,pack_size", [("categorization", 4), ("sentiment", None), ("combined", None)])
+def test_batched_extraction_matches_single_batch(tmp_path, task, pack_size):
+    create_local_batch_input_shards(_feedback(), task, output_dir=str(tmp_path), pack_size=pack_size,
+                                    dedup_threshold=0.9, base_name="input.jsonl", max_records=25)
+    manifest_file = manifest_path(os.path.join(str(tmp_path), "input.jsonl"))
+    simulate_job(manifest_file, malformed_rate=0.1)
+
+    results = {}
+    for batch_size in (3, 10_000):
+        results_dir = str(tmp_path / f"results-{batch_size}")
+        results[batch_size] = extract_task(task, manifest_file=manifest_file, extracted_dir=str(tmp_path / "extracted"),
+                                           results_dir=results_dir, batch_size=batch_size)
+        assert not os.path.exists(tmp_path / "extracted" / f"{task}.answers.parquet")
+
+    small, whole = results[3], results[10_000]
+    for name in ("output", "failed", "final", "sentiment"):
+        if name in whole:
+            assert_frame_equal(small[name], whole[name])
+    # A collapsed repeat gets its representative's answer
+    answers = whole["output"].set_index("Respondent_ID")["Model_Output"]
+    assert whole["output"]["Respondent_ID"].is_unique
+    assert answers.get("R60") == answers.get("R0")
+    written = pd.read_parquet(tmp_path / "results-3" / task_settings(task)["output_file"])
+    assert_frame_equal(written, whole["output"])
+
+
+def test_combined_job_writes_both_single_task_outputs(tmp_path):
+    create_local_batch_input_shards(_feedback(20), "combined", output_dir=str(tmp_path), pack_size=4,
+                                    base_name="input.jsonl")
+    manifest_file = manifest_path(os.path.join(str(tmp_path), "input.jsonl"))
+    simulate_job(manifest_file)
+
+    result = extract_task("categorization", manifest_file=manifest_file, extracted_dir=str(tmp_path / "extracted"),
+                          results_dir=str(tmp_path))
+
+    # The manifest's task wins over the one passed in
+    assert set(result) >= {"output", "sentiment", "final"}
+    respondents = sorted(result["output"]["Respondent_ID"])
+    assert sorted(result["sentiment"]["Respondent_ID"]) == respondents
+    assert result["sentiment"]["Model_Output"].str.match(r"Sentiment: (Positive|Negative|Neutral)$").all()
+    assert set(result["final"]["Respondent_ID"]) == set(respondents)
+    for task in ("sentiment", "categorization"):
+        written = pd.read_parquet(tmp_path / task_settings(task)["output_file"])
+        assert sorted(written["Respondent_ID"]) == respondents
+    assert_frame_equal(pd.read_parquet(tmp_path / task_settings("categorization")["final_file"]), result["final"])
@@ -0,0 +1,46 @@
+import json
+
+from akasapulse.packing import RequestPacker, unpack_records
+from akasapulse.tasks import task_settings
+
+ROWS = [("R1", "late cab"), ("R2", 'rude "driver"'), ("R3", "good food"), ("R4", "salary is low"), ("R5", "ok")]
+
+
+def _pack(task, rows=ROWS, max_feedbacks=2):
+    packer = RequestPacker(rows, task_settings(task)["packed_prompt"].compile(), task, max_feedbacks=max_feedbacks)
+    return [json.loads(request) for request in packer], packer.packs
+
+
+def test_packs_round_trip_through_unpack_records():
+    requests, packs = _pack("categorization")
+    assert packs == {"pack-000001": ["R1", "R2"], "pack-000002": ["R3", "R4"], "pack-000003": ["R5"]}
+    assert [request["recordId"] for request in requests] == list(packs)
+    prompt = requests[0]["modelInput"]["messages"][0]["content"][0]["text"]
+    assert json.dumps({"R1": "late cab", "R2": 'rude "driver"'}, indent=1) in prompt
+
+    records = [
+        # Fenced answers are read; a respondent left out of its pack is re-queued
+        {"Respondent_ID": "pack-000001", "Model_Output": '```json\n{"R1": {"1": "-1"}, "R2": {"11": "-1"}}\n```'},
+        {"Respondent_ID": "pack-000002", "Model_Output": '{"R3": {"6": "1"}}'},
+        {"Respondent_ID": "R9", "Model_Output": '{"0": "0"}'},
+    ]
+    unpacked, missing = unpack_records(records, packs, task="categorization")
+
+    assert unpacked == [
+        {"Respondent_ID": "R1", "Model_Output": '{"1": "-1"}'},
+        {"Respondent_ID": "R2", "Model_Output": '{"11": "-1"}'},
+        {"Respondent_ID": "R3", "Model_Output": '{"6": "1"}'},
+        {"Respondent_ID": "R9", "Model_Output": '{"0": "0"}'},
+    ]
+    # R4 had no answer in its pack, R5's pack had no output line at all
+    assert missing == ["R4", "R5"]
+
+
+def test_sentiment_answers_unpack_to_the_single_request_shape():
+    _, packs = _pack("sentiment", ROWS[:2])
+    records = [{"Respondent_ID": "pack-000001", "Model_Output": '{"R1": "Negative", "R2": "Negative"}'}]
+
+    unpacked, missing = unpack_records(records, packs, task="sentiment")
+
+    assert [record["Model_Output"] for record in unpacked] == ["Sentiment: Negative"] * 2
+    assert missing == []
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from akasapulse.preclassify import PreClassifier
+from akasapulse.repair import repair_output
+
+FEEDBACK = [float("nan"), "No comments.", "Good!", "salary is low", "need more trainings"]
+ANSWERS = {
+    "sentiment": ["Sentiment: Neutral", "Sentiment: Neutral", "Sentiment: Positive", "Sentiment: Negative", None],
+    "categorization": ['{"0": "0"}', '{"0": "0"}', '{"0": "1"}', '{"1": "-1"}', '{"5": "0"}'],
+    "combined": [
+        '{"sentiment": "Neutral", "categories": {"0": "0"}}',
+        '{"sentiment": "Neutral", "categories": {"0": "0"}}',
+        '{"sentiment": "Positive", "categories": {"0": "1"}}',
+        '{"sentiment": "Negative", "categories": {"1": "-1"}}',
+        '{"sentiment": "Neutral", "categories": {"5": "0"}}',
+    ],
+}
+RULES = ["blank", "blank", "praise", "keyword", "keyword"]
+
+
+@pytest.mark.parametrize("task", sorted(ANSWERS))
+def test_every_rule_answers_in_the_task_format(task):
+    preclassifier = PreClassifier(task, min_confidence=0.8)
+
+    for feedback, expected, rule in zip(FEEDBACK, ANSWERS[task], RULES):
+        result = preclassifier.classify(feedback)
+        if expected is None:
+            # A suggestion has no polarity to answer a Sentiments request with
+            assert result is None
+            continue
+        answer, matched_rule, _ = result
+        assert (answer, matched_rule) == (expected, rule)
+        # Local answers pass the same validation as the model's
+        assert repair_output(answer, task) == (answer if task == "sentiment" else json.dumps(json.loads(answer)))
+
+
+@pytest.mark.parametrize("feedback", ["salary is not low", "salary is low but cab is good", "salary and cab are bad",
+                                      "the salary is low compared to the market rate in this city"])
+def test_ambiguous_feedback_goes_to_the_model(feedback):
+    assert PreClassifier("categorization", min_confidence=0.8).classify(feedback) is None
+
+
+def test_keyword_rule_stays_off_at_the_default_confidence(tmp_path):
+    preclassifier = PreClassifier("categorization")
+    assert preclassifier.classify("salary is low") is None
+
+    output = tmp_path / "preclassified.jsonl.out"
+    sent = list(preclassifier.filter_rows([("R1", "nil"), ("R2", "salary is low"), ("R3", "great place to work")],
+                                          str(output)))
+
+    assert sent == [("R2", "salary is low")]
+    records = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert [(record["recordId"], record["preclassified"]) for record in records] == [("R1", "blank"), ("R3", "praise")]
+    assert preclassifier.stats == {"rows": 3, "blank": 1, "praise": 1, "keyword": 0}
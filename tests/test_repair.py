@@ -0,0 +1,48 @@
+import json
+
+import pandas as pd
+import pytest
+
+from akasapulse.repair import RepairError, merge_retry_results, repair_output, repair_outputs
+
+
+@pytest.mark.parametrize("text,expected", [
+    ('```json\n{"3": "-1", "7": "Positive",}\n```\nThe feedback mentions growth.', {"3": "-1", "7": "1"}),
+    ("{'1': '-1'}", {"1": "-1"}),
+    ('{"0": 0}', {"0": "0"}),
+])
+def test_categorization_answers_are_repaired(text, expected):
+    assert json.loads(repair_output(text, "categorization")) == expected
+
+
+@pytest.mark.parametrize("text,error", [
+    ('{"3": "-1", "7": "1"', "truncated"),
+    ('```json\n{"3": {"-1": ["late cab", "rude dri', "truncated"),
+    ('{"15": "1"}', "Unknown category ID 15"),
+    ('{"3": "2"}', "Unknown sentiment ID 2"),
+    ("No categories apply.", "No JSON object"),
+])
+def test_unrepairable_categorization_answers_raise(text, error):
+    with pytest.raises(RepairError, match=error):
+        repair_output(text, "categorization")
+
+
+def test_repeated_generalization_keys_are_merged():
+    text = '{"3": {"-1": ["late cab"]}, "3": {"-1": ["rude driver"], "0": "ok"}}'
+    assert json.loads(repair_output(text, "generalization")) == {"3": {"-1": ["late cab", "rude driver"], "0": ["ok"]}}
+
+
+def test_only_failures_are_queued_and_retried_answers_replace_them():
+    df = pd.DataFrame({"Respondent_ID": ["R1", "R2", "R3"],
+                       "Model_Output": ["sentiment: negative.", '{"3": "-1"', " positive\n"]})
+    repaired, failed = repair_outputs(df, task="sentiment")
+
+    assert repaired["Model_Output"].tolist() == ["Sentiment: Negative", "Sentiment: Positive"]
+    assert failed["Respondent_ID"].tolist() == ["R2"]
+    assert list(failed.columns) == ["Respondent_ID", "Raw_Output", "Error"]
+
+    retry = pd.DataFrame({"Respondent_ID": ["R2"], "Model_Output": ["Sentiment: Neutral"]})
+    merged = merge_retry_results(repaired, retry)
+    assert merged.set_index("Respondent_ID")["Model_Output"].to_dict() == {
+        "R1": "Sentiment: Negative", "R3": "Sentiment: Positive", "R2": "Sentiment: Neutral"
+    }
@@ -0,0 +1,120 @@
+import json
+
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from akasapulse.reshape import expand_categorization, expand_generalization, split_combined
+from benchmarks.extraction_reshape import (
+    legacy_categorization, legacy_generalization, synthetic_categorization, synthetic_generalization
+)
+
+CATEGORIZATION_ANSWERS = [
+    ("R1", json.dumps({"3": "Positive", "7": "Negative"})),
+    ("R2", "{}"),
+    ("R3", ""),
+    ("R4", "```json\n" + json.dumps({"1": "Neutral"})),
+    ("R5", json.dumps(["3", "7"])),
+    # The legacy loop kept the categories before the bad key and reported the error
+    ("R6", json.dumps({"2": "Positive", "x": "Negative", "5": "Neutral"})),
+    ("R7", "null"),
+    ("R8", json.dumps({"12": "Neutral"})),
+]
+
+GENERALIZATION_ANSWERS = [
+    (1, json.dumps({"3": {"1": ["late cab", "rude driver"], "-1": ["no water"]}, "14": {"0": ["ok"]}})),
+    (2, "{}"),
+    (3, str({"5": {"0": ["seat"], "1": []}})),
+    (4, json.dumps({"7": {"-1": []}})),
+]
+
+
+@pytest.mark.parametrize("records", [CATEGORIZATION_ANSWERS, CATEGORIZATION_ANSWERS[:3] + CATEGORIZATION_ANSWERS[7:]])
+def test_categorization_matches_legacy_loop(records):
+    df = pd.DataFrame(records, columns=["Respondent_ID", "Model_Output"])
+    final_df, error_df = expand_categorization(df)
+    legacy_final, legacy_errors = legacy_categorization(df)
+
+    assert_frame_equal(final_df, legacy_final)
+    assert_frame_equal(error_df, legacy_errors)
+
+
+def test_categorization_matches_legacy_loop_on_synthetic_answers():
+    df = synthetic_categorization(500)
+    final_df, error_df = expand_categorization(df)
+    legacy_final, legacy_errors = legacy_categorization(df)
+
+    assert_frame_equal(final_df, legacy_final)
+    assert_frame_equal(error_df, legacy_errors)
+    assert not error_df.empty
+
+
+def test_categorization_of_empty_answers_keeps_the_schema():
+    df = pd.DataFrame([("R1", "{}"), ("R2", "{}")], columns=["Respondent_ID", "Model_Output"])
+    final_df, error_df = expand_categorization(df)
+
+    # The legacy loop returned a frame without columns here
+    assert legacy_categorization(df)[0].empty
+    assert final_df.empty
+    assert list(final_df.columns) == ["Respondent_ID", "Category_ID", "Sentiment"]
+    assert error_df.empty
+
+
+def test_generalization_matches_legacy_loop():
+    df = pd.DataFrame(GENERALIZATION_ANSWERS, columns=["Unique_ID", "Model_Output"])
+    final_df, error_df = expand_generalization(df)
+
+    assert_frame_equal(final_df, legacy_generalization(df))
+    assert error_df.empty
+    # An empty answer still gets one row per category
+    assert (final_df["Unique_ID"] == 2).sum() == 14
+
+
+def test_generalization_matches_legacy_loop_on_synthetic_answers():
+    df = synthetic_generalization(300)
+    final_df, error_df = expand_generalization(df)
+
+    assert_frame_equal(final_df, legacy_generalization(df))
+    assert error_df.empty
+
+
+def test_malformed_generalization_answers_are_reported():
+    malformed = [(5, "not json"), (6, json.dumps(["x"])), (7, "")]
+    df = pd.DataFrame(GENERALIZATION_ANSWERS + malformed, columns=["Unique_ID", "Model_Output"])
+    final_df, error_df = expand_generalization(df)
+
+    # The legacy loop raised on these; the valid answers are reshaped as before
+    assert error_df["Unique_ID"].tolist() == [5, 6, 7]
+    assert list(error_df.columns) == ["Unique_ID", "Raw_Data", "Error"]
+    valid = df[~df["Unique_ID"].isin(error_df["Unique_ID"])]
+    assert_frame_equal(final_df, legacy_generalization(valid))
+
+
+def test_combined_answers_split_into_both_single_task_outputs():
+    answers = [
+        {"sentiment": "Negative", "categories": {"1": "-1", "7": "1"}},
+        {"sentiment": "Positive", "categories": {"0": "1"}},
+        # The overall label disagrees with the only category sentiment; it is kept and counted
+        {"sentiment": "Positive", "categories": {"8": "-1"}},
+    ]
+    df = pd.DataFrame({"Respondent_ID": ["R1", "R2", "R3"], "Model_Output": [json.dumps(a) for a in answers],
+                       "Prompt_Version": "combined-v1"})
+
+    sentiment_df, categorization_df, inconsistent = split_combined(df)
+
+    assert sentiment_df["Model_Output"].tolist() == [
+        "Sentiment: Negative", "Sentiment: Positive", "Sentiment: Positive"
+    ]
+    assert inconsistent == 1
+    assert list(categorization_df.columns) == ["Respondent_ID", "Model_Output", "Prompt_Version"]
+    final_df, error_df = expand_categorization(categorization_df)
+    assert list(final_df.itertuples(index=False, name=None)) == [
+        ("R1", 1, "-1"), ("R1", 7, "1"), ("R2", 0, "1"), ("R3", 8, "-1")
+    ]
+    assert error_df.empty
+
+
+def test_unrepaired_combined_answers_are_rejected():
+    df = pd.DataFrame({"Respondent_ID": ["R1"], "Model_Output": ['{"sentiment": "Negative", "categories": {']})
+    with pytest.raises(ValueError, match="repair them first"):
+        split_combined(df)
@@ -0,0 +1,39 @@
+import pandas as pd
+import pytest
+
+from akasapulse.batch_io import read_input_manifest
+from akasapulse.fakes import FakeBedrockClient, FakeS3Client
+from akasapulse.orchestrator import BatchJobRunner
+from akasapulse.outputs import extract_job
+from akasapulse.simulator import SimulatedModel
+from akasapulse.upload import process_feedback_batch_local
+
+
+def _runner(task):
+    s3 = FakeS3Client()
+    bedrock = FakeBedrockClient(s3, model=SimulatedModel(task))
+    return BatchJobRunner(bedrock, s3, "arn:aws:iam::000000000000:role/test", "model", sleep=lambda seconds: None)
+
+
+def _feedback():
+    return pd.DataFrame({"Respondent_ID": [f"R{i}" for i in range(5)],
+                         "Feedback": ["late cab", "rude driver", "good food", "salary is good", "ok"]})
+
+
+@pytest.mark.parametrize("option", [{"pack_size": 4}, {"dedup_threshold": 0.9}, {"map_reduce": True}])
+def test_stream_upload_rejects_local_only_options(tmp_path, option):
+    with pytest.raises(ValueError, match=f"stream_upload cannot be combined with {next(iter(option))}"):
+        process_feedback_batch_local(_feedback(), "sentiment", "bucket", "role", runner=_runner("sentiment"),
+                                     stream_upload=True, output_dir=str(tmp_path), **option)
+
+
+def test_streamed_job_has_a_manifest_for_extraction(tmp_path):
+    job = process_feedback_batch_local(_feedback(), "sentiment", "bucket", "role", runner=_runner("sentiment"),
+                                       stream_upload=True, output_dir=str(tmp_path))
+
+    manifest = read_input_manifest(job["manifest_file"])
+    assert manifest["task"] == "sentiment"
+    assert manifest["records"] == 5
+    result = extract_job(job, extracted_dir=str(tmp_path / "extracted"), results_dir=str(tmp_path))
+    assert sorted(result["output"]["Respondent_ID"]) == [f"R{i}" for i in range(5)]
+    assert set(result["output"]["Prompt_Version"]) == {manifest["prompt_version"]}